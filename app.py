@@ -5,7 +5,9 @@ import tempfile
 import shutil
 import json
 from importlib import import_module
-from llmWrapper.offline_translation import populate_sum_model
+from llmWrapper.offline_translation import start_local_model_discovery, get_local_models, local_model_discovery_running
+from llmWrapper.model_config import list_online_models
+from textProcessing.calculation_tokens import warm_up_encoder
 from typing import List, Tuple
 from config.log_config import app_logger
 import socket
@@ -44,6 +46,9 @@ TRANSLATOR_MODULES = {
 EXCEL_TRANSLATOR_MODE_2 = "translator.excel_translator_test.ExcelTranslator"
 WORD_TRANSLATOR_BILINGUAL = "translator.word_translator_bilingual.WordTranslator"
 
+# Seconds between local model list updates while discovery is running
+LOCAL_DISCOVERY_POLL = 2
+
 # Global task queue and counter
 task_queue = queue.Queue()
 active_tasks = 0
@@ -698,19 +703,51 @@ def update_model_list_and_api_input(use_online):
         return (
             gr.update(choices=online_models, value=default_online_value),
             gr.update(visible=True, value=""),
-            gr.update(value=thread_count)
+            gr.update(value=thread_count),
+            refresh_button_update(use_online),
+            gr.update(active=False)
         )
     else:
-        if default_local_model and default_local_model in local_models:
-            default_local_value = default_local_model
-        else:
-            default_local_value = local_models[0] if local_models else None
         return (
-            gr.update(choices=local_models, value=default_local_value),
+            local_model_update(get_local_models()),
             gr.update(visible=False, value=""),
-            gr.update(value=thread_count)
+            gr.update(value=thread_count),
+            refresh_button_update(use_online),
+            gr.update(active=local_model_discovery_running())
         )
 
+def local_model_update(local_models, current_model=None):
+    """Dropdown update for the local model list, keeping the current choice if it is still there"""
+    if current_model and current_model in local_models:
+        value = current_model
+    elif default_local_model and default_local_model in local_models:
+        value = default_local_model
+    else:
+        value = local_models[0] if local_models else None
+    return gr.update(choices=local_models, value=value)
+
+def refresh_button_update(use_online):
+    """The refresh button only applies to local models"""
+    return gr.update(visible=not use_online and read_system_config().get("show_model_selection", True))
+
+def fill_local_models(use_online, current_model):
+    """
+    Fill the local model list from the cached discovery without waiting for it;
+    the timer keeps polling while discovery is still running
+    """
+    if use_online:
+        return gr.update(), gr.update(active=False), refresh_button_update(use_online)
+    return (
+        local_model_update(get_local_models(), current_model),
+        gr.update(active=local_model_discovery_running()),
+        refresh_button_update(use_online)
+    )
+
+def refresh_local_models(use_online, current_model):
+    """Re-discover local models, e.g. after starting Ollama or LM Studio"""
+    start_local_model_discovery(force=True)
+    return fill_local_models(use_online, current_model)
+
 def init_ui(request: gr.Request):
     """Set user language and update labels on page load"""
     user_lang = get_user_lang(request)
@@ -747,11 +784,11 @@ def init_ui(request: gr.Request):
         else:
             model_value = online_models[0] if online_models else None
     else:
-        model_choices = local_models
-        if default_local_model and default_local_model in local_models:
+        model_choices = get_local_models()
+        if default_local_model and default_local_model in model_choices:
             model_value = default_local_model
         else:
-            model_value = local_models[0] if local_models else None
+            model_value = model_choices[0] if model_choices else None
     
     label_updates = set_labels(user_lang)
     
@@ -1049,15 +1086,11 @@ def process_multiple_files(
 # Main Application Initialization
 #-------------------------------------------------------------------------
 
-# Load local and online models
-local_models = populate_sum_model() or []
+# Discover local models in the background; the dropdown is filled when discovery finishes
+start_local_model_discovery()
 CUSTOM_LABEL = "+ Add Custom…"
 dropdown_choices = get_available_languages() + [CUSTOM_LABEL]
-config_dir = "config/api_config"
-online_models = [
-    os.path.splitext(f)[0] for f in os.listdir(config_dir) 
-    if f.endswith(".json") and f != "Custom.json"
-]
+online_models = list_online_models()
 
 # Read initial configuration
 config = read_system_config()
@@ -1131,20 +1164,35 @@ with gr.Blocks(
      thread_count_slider, excel_mode_checkbox, word_bilingual_checkbox) = create_settings_section(config)
 
     # Create model and glossary section
-    (model_choice, glossary_choice, glossary_upload_row, 
+    (model_choice, refresh_models_button, glossary_choice, glossary_upload_row, 
      glossary_upload_file, glossary_upload_button) = create_model_glossary_section(
-        config, local_models, online_models, get_glossary_files, get_default_glossary
+        config, get_local_models(), online_models, get_glossary_files, get_default_glossary
     )
 
     # Create main interface
     (api_key_input, file_input, output_file, status_message, 
      translate_button, continue_button, stop_button) = create_main_interface(config)
 
+    # Polls the local model list while background discovery runs
+    local_models_timer = gr.Timer(LOCAL_DISCOVERY_POLL, active=False)
+
     # Event handlers
     use_online_model.change(
         update_model_list_and_api_input,
         inputs=use_online_model,
-        outputs=[model_choice, api_key_input, thread_count_slider]
+        outputs=[model_choice, api_key_input, thread_count_slider, refresh_models_button, local_models_timer]
+    )
+
+    refresh_models_button.click(
+        refresh_local_models,
+        inputs=[use_online_model, model_choice],
+        outputs=[model_choice, local_models_timer, refresh_models_button]
+    )
+
+    local_models_timer.tick(
+        fill_local_models,
+        inputs=[use_online_model, model_choice],
+        outputs=[model_choice, local_models_timer, refresh_models_button]
     )
     
     # Add LAN mode
@@ -1349,12 +1397,19 @@ with gr.Blocks(
             api_key_input, file_input, output_file, status_message, translate_button,
             continue_button, excel_mode_checkbox, word_bilingual_checkbox, stop_button, glossary_upload_button
         ]
+    ).then(
+        fill_local_models,
+        inputs=[use_online_model, model_choice],
+        outputs=[model_choice, local_models_timer, refresh_models_button]
     )
 
 #-------------------------------------------------------------------------
 # Application Launch
 #-------------------------------------------------------------------------
 
+# Load the tokenizer while the UI starts
+warm_up_encoder()
+
 available_port = find_available_port(start_port=9980)
 
 # Enable queue for progress tracking
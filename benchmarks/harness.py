@@ -0,0 +1,104 @@
+"""
+Shared pieces of the benchmarks: a keep-alive stub HTTP server, timers and
+quiet logging. Run benchmarks from the repository root, e.g.
+
+    python -m benchmarks.token_counting
+"""
+import io
+import time
+import socket
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from rich.console import Console
+from config.log_config import app_logger
+
+@contextmanager
+def stub_server(respond):
+    """
+    Serve POST requests on a free local port for the duration of the block.
+    respond(path, body) returns the JSON bytes to send back; yields the base URL.
+    """
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Avoid Nagle/delayed-ACK stalls on keep-alive connections
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            response = respond(self.path, body)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def ms_per_call(label, func, count):
+    """Time count sequential calls after one warm-up call; prints and returns ms per call"""
+    func()
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    per_call = (time.perf_counter() - start) / count * 1000
+    print(f"{label:<36} {per_call:7.3f} ms/call")
+    return per_call
+
+def print_saving(before, after, unit="s"):
+    print(f"Saved {before - after:.3f}{unit} ({(before - after) / before:.0%}, {before / after:.1f}x)")
+
+class CallTimer:
+    """Total time spent inside the callables it wraps"""
+
+    def __init__(self):
+        self.total = 0.0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - start
+        return timed
+
+@contextmanager
+def quiet_logs():
+    """Keep info logging and translation_checker's result tables out of the benchmark output"""
+    from textProcessing import translation_checker
+
+    level = app_logger.level
+    console = translation_checker.CONSOLE
+    app_logger.setLevel(logging.WARNING)
+    translation_checker.CONSOLE = Console(file=io.StringIO())
+    try:
+        yield
+    finally:
+        app_logger.setLevel(level)
+        translation_checker.CONSOLE = console
+
+@contextmanager
+def work_dir():
+    """A temporary directory, removed afterwards"""
+    path = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
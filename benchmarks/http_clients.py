@@ -0,0 +1,47 @@
+"""
+Per-request overhead of fresh vs pooled HTTP clients against a local keep-alive stub server.
+
+    python -m benchmarks.http_clients
+"""
+import json
+import requests
+from openai import OpenAI
+from llmWrapper.http_clients import openai_client, http_session
+from benchmarks.harness import stub_server, ms_per_call, print_saving
+
+REQUEST_COUNT = 300
+RESPONSE = json.dumps({
+    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "{\"1\": \"ok\"}"}}],
+}).encode("utf-8")
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def main():
+    with stub_server(lambda path, body: RESPONSE) as server_url:
+        base_url = f"{server_url}/v1"
+
+        def fresh_client():
+            OpenAI(api_key="x", base_url=base_url).chat.completions.create(model="stub", messages=MESSAGES)
+
+        def pooled_client():
+            with openai_client(base_url, "x") as client:
+                client.chat.completions.create(model="stub", messages=MESSAGES)
+
+        def bare_post():
+            requests.post(f"{base_url}/chat/completions", json={"messages": MESSAGES}, timeout=10)
+
+        def pooled_session():
+            with http_session(base_url) as session:
+                session.post(f"{base_url}/chat/completions", json={"messages": MESSAGES}, timeout=10)
+
+        print(f"{REQUEST_COUNT} sequential requests against {base_url}")
+        fresh = ms_per_call("OpenAI client per request", fresh_client, REQUEST_COUNT)
+        pooled = ms_per_call("pooled OpenAI client", pooled_client, REQUEST_COUNT)
+        print_saving(fresh, pooled, " ms/request")
+        bare = ms_per_call("requests.post", bare_post, REQUEST_COUNT)
+        session = ms_per_call("pooled requests.Session", pooled_session, REQUEST_COUNT)
+        print_saving(bare, session, " ms/request")
+
+if __name__ == "__main__":
+    main()
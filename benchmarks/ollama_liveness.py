@@ -0,0 +1,36 @@
+"""
+Local request overhead: a TCP probe before every request vs cached liveness,
+against a stub Ollama server.
+
+    python -m benchmarks.ollama_liveness
+"""
+import json
+from unittest import mock
+from llmWrapper import offline_translation
+from llmWrapper.offline_translation import translate_offline, _port_open
+from benchmarks.harness import stub_server, ms_per_call, print_saving
+
+REQUEST_COUNT = 500
+RESPONSE = json.dumps({"message": {"role": "assistant", "content": "{\"1\": \"ok\"}"}}).encode("utf-8")
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def translate():
+    result, success = translate_offline(MESSAGES, "(Ollama) stub")
+    assert success, result
+
+def probe_then_translate():
+    # The old hot path: a separate TCP connect before every request
+    assert _port_open(offline_translation.OLLAMA_HOST, offline_translation.OLLAMA_PORT), "stub not reachable"
+    translate()
+
+def main():
+    with stub_server(lambda path, body: RESPONSE) as base_url:
+        host, port = base_url.removeprefix("http://").split(":")
+        with mock.patch.multiple(offline_translation, OLLAMA_HOST=host, OLLAMA_PORT=port):
+            print(f"{REQUEST_COUNT} sequential requests against {base_url}")
+            probed = ms_per_call("probe before every request", probe_then_translate, REQUEST_COUNT)
+            cached = ms_per_call("cached liveness", translate, REQUEST_COUNT)
+            print_saving(probed, cached, " ms/request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Ollama request options against a stub server that simulates model loading:
+fixed num_ctx and no keep_alive, as sent before, vs job-sized num_ctx,
+keep_alive, warm-up and threads capped at the server's slots.
+
+    python -m benchmarks.ollama_options
+"""
+import json
+import time
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from llmWrapper import offline_translation
+from llmWrapper.offline_translation import translate_offline, warm_up_local_model, DEFAULT_CONTEXT_WINDOW
+from llmWrapper.http_clients import http_session
+from llmWrapper.ollama_options import context_window_for
+from llmWrapper.output_budget import OutputBudget
+from benchmarks.harness import stub_server
+
+SLOTS = 2
+DOCUMENTS, SEGMENTS_PER_DOCUMENT = 3, 16
+EXTRACTION_TIME, PAUSE_BETWEEN_DOCUMENTS = 0.5, 1.5
+RESPONSE = json.dumps({"message": {"role": "assistant", "content": "{\"1\": \"ok\"}"}}).encode("utf-8")
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+class StubOllama:
+    """
+    Single-model stand-in for an Ollama server. Loading takes LOAD_TIME and
+    blocks every request; an idle model unloads after keep_alive (default
+    DEFAULT_KEEP_ALIVE, standing in for Ollama's 5 minutes) and a different
+    num_ctx reloads it. At most `slots` requests run at once, and a request
+    takes longer the larger its context.
+    """
+    LOAD_TIME = 1.5
+    DEFAULT_KEEP_ALIVE = 1.0
+    BASE_TIME = 0.02
+    TIME_PER_CONTEXT_TOKEN = 2e-5
+
+    def __init__(self, slots):
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(slots)
+        self.loaded_ctx = None
+        self.expires = 0.0
+        self.loads = 0
+
+    @staticmethod
+    def keep_alive_seconds(value):
+        if value is None:
+            return StubOllama.DEFAULT_KEEP_ALIVE
+        if isinstance(value, str) and value[-1] in "smh":
+            return float(value[:-1]) * {"s": 1, "m": 60, "h": 3600}[value[-1]]
+        return float(value)
+
+    def respond(self, path, body):
+        payload = json.loads(body)
+        num_ctx = payload.get("options", {}).get("num_ctx", 2048)
+        keep_alive = self.keep_alive_seconds(payload.get("keep_alive"))
+        with self.lock:
+            if self.loaded_ctx != num_ctx or time.monotonic() > self.expires:
+                time.sleep(self.LOAD_TIME)
+                self.loads += 1
+                self.loaded_ctx = num_ctx
+            self.expires = float("inf")
+        if "messages" in payload:
+            with self.slots:
+                time.sleep(self.BASE_TIME + num_ctx * self.TIME_PER_CONTEXT_TOKEN)
+        with self.lock:
+            self.expires = time.monotonic() + keep_alive
+        return RESPONSE
+
+def run_jobs(label, send, threads, warm_up, context_window):
+    stub = StubOllama(SLOTS)
+    with stub_server(stub.respond) as base_url:
+        host, port = base_url.removeprefix("http://").split(":")
+        with mock.patch.multiple(offline_translation, OLLAMA_HOST=host, OLLAMA_PORT=port):
+            busy = 0.0
+            for _ in range(DOCUMENTS):
+                start = time.perf_counter()
+                if warm_up:
+                    warm_up_local_model("(Ollama) stub", context_window)
+                time.sleep(EXTRACTION_TIME)
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    list(executor.map(lambda _: send(base_url), range(SEGMENTS_PER_DOCUMENT)))
+                busy += time.perf_counter() - start
+                time.sleep(PAUSE_BETWEEN_DOCUMENTS)  # idle until the next document
+    print(f"{label:<52} {busy:6.2f}s for {DOCUMENTS} documents, {stub.loads} model loads")
+    return busy
+
+def main():
+    context_window = context_window_for(768, OutputBudget("en", "zh").limit(468))
+
+    def legacy_request(base_url):
+        # Fixed num_ctx, no keep_alive, as sent before
+        payload = {"model": "stub", "messages": MESSAGES,
+                   "options": {"num_ctx": DEFAULT_CONTEXT_WINDOW, "num_predict": -1}, "stream": False}
+        with http_session(base_url) as session:
+            session.post(f"{base_url}/api/chat", json=payload, timeout=120).raise_for_status()
+
+    def tuned_request(base_url):
+        result, success = translate_offline(list(MESSAGES), "(Ollama) stub", context_window=context_window)
+        assert success, result
+
+    print(f"Stub Ollama: {StubOllama.LOAD_TIME}s load, {SLOTS} parallel slots, "
+          f"{DOCUMENTS} documents x {SEGMENTS_PER_DOCUMENT} segments, {PAUSE_BETWEEN_DOCUMENTS}s between documents")
+    before = run_jobs(f"before: num_ctx {DEFAULT_CONTEXT_WINDOW}, no keep_alive, 4 threads", legacy_request, 4, False, context_window)
+    after = run_jobs(f"after: num_ctx {context_window}, keep_alive, warm-up, {SLOTS} threads", tuned_request, SLOTS, True, context_window)
+    print(f"Saved {before - after:.2f}s ({(before - after) / before:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Requests and budget fill of the greedy and bin-packing segment planners on
+table-heavy and paragraph-heavy documents.
+
+    python -m benchmarks.segment_planner
+"""
+import json
+import time
+import random
+from textProcessing.text_separator import (
+    PLANNER_GREEDY, PLANNER_BIN_PACKING, make_segment_builder, segment_token_budget, split_by_sentences_and_combine
+)
+
+WORDS = ["contract", "party", "shall", "agreement", "notice", "payment", "term", "clause",
+         "表格", "合同", "甲方", "乙方", "付款", "条款", "Section", "2024", "USD", "pursuant"]
+
+def text(word_count):
+    return " ".join(random.choice(WORDS) for _ in range(word_count))
+
+def document(cells_per_table):
+    cells = []
+    for _ in range(400):
+        # A table (short cells), then a few paragraphs of mixed length
+        cells += [text(random.randint(1, 6)) for _ in range(random.randint(*cells_per_table))]
+        cells += [text(random.randint(10, 120)) for _ in range(random.randint(1, 5))]
+    # Paragraphs are pre-split to 256 tokens before planning, as in a job
+    split_items = []
+    for value in cells:
+        for chunk in split_by_sentences_and_combine(value, 256):
+            split_items.append({"count_split": len(split_items) + 1, "value": chunk})
+    return split_items
+
+def clean_segment(segment):
+    return segment.removeprefix("```json\n").removesuffix("\n```")
+
+def main():
+    random.seed(0)
+    for label, cells_per_table in (("table-heavy", (10, 60)), ("paragraph-heavy", (0, 3))):
+        split_items = document(cells_per_table)
+        print(f"{label}: {len(split_items)} lines")
+        print(f"{'max_token':>9} {'planner':>12} {'requests':>9} {'fill':>6} {'time':>7}")
+        for max_token in (768, 1024, 2048):
+            budget = segment_token_budget(max_token, "system prompt", "user prompt", "previous prompt")
+            for planner in (PLANNER_GREEDY, PLANNER_BIN_PACKING):
+                builder = make_segment_builder(planner, budget, len(split_items))
+                start = time.perf_counter()
+                segments = []
+                for item in split_items:
+                    segments.extend(builder.add(item["count_split"], item["value"]))
+                segments.extend(builder.finish())
+                elapsed = time.perf_counter() - start
+                requests, fill = builder.fill_stats()
+                print(f"{max_token:>9} {planner:>12} {requests:>9} {fill:>6.0%} {elapsed:>6.2f}s")
+
+                # Every line planned exactly once, no segment over budget
+                planned = [key for segment, _, _ in segments for key in json.loads(clean_segment(segment))]
+                assert sorted(planned, key=int) == [str(item["count_split"]) for item in split_items], "lines lost or repeated"
+                assert max(builder.segment_tokens) <= budget, "segment over budget"
+
+if __name__ == "__main__":
+    main()
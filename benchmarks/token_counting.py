@@ -0,0 +1,78 @@
+"""
+Split + segment a large src.json with and without token count reuse.
+
+    python -m benchmarks.token_counting [paragraph_count]
+"""
+import os
+import sys
+import time
+import random
+from unittest import mock
+from textProcessing import calculation_tokens, text_separator
+from textProcessing.job_store import JobStore
+from benchmarks.harness import CallTimer, work_dir
+
+MAX_TOKEN = 768
+WORDS = ["contract", "party", "shall", "agreement", "notice", "payment", "term", "clause",
+         "表格", "合同", "甲方", "乙方", "付款", "条款", "Section", "2024", "USD", "pursuant"]
+
+def make_document(paragraph_count):
+    random.seed(0)
+
+    def make_sentence():
+        return " ".join(random.choice(WORDS) for _ in range(random.randint(4, 20))) + random.choice([". ", "。", "; ", "! "])
+
+    data = []
+    for index in range(paragraph_count):
+        # Mostly short paragraphs with a tail of long ones that need splitting
+        sentence_count = random.randint(1, 4) if random.random() < 0.97 else random.randint(60, 120)
+        data.append({"count_src": index + 1, "type": "text", "value": "".join(make_sentence() for _ in range(sentence_count))})
+    return data
+
+def run_job(job_store):
+    """Split, segment, then segment again as a retry round or continue run does"""
+    start = time.perf_counter()
+    split_items = text_separator.split_text_by_token_limit(job_store, MAX_TOKEN)
+    segments = text_separator.stream_segment_json(split_items, MAX_TOKEN, "system prompt", "user prompt", "previous prompt")
+    first_pass = time.perf_counter() - start
+    text_separator.stream_segment_json(split_items, MAX_TOKEN, "system prompt", "user prompt", "previous prompt")
+    return segments, first_pass, time.perf_counter() - start
+
+def run_with(job_store, counter, batch_counter):
+    """run_job with text_separator's token counters replaced, timing the time spent counting"""
+    timer = CallTimer()
+    with mock.patch.object(text_separator, "num_tokens_from_string", timer.wrap(counter)), \
+         mock.patch.object(text_separator, "num_tokens_batch", timer.wrap(batch_counter)):
+        segments, first_pass, total = run_job(job_store)
+    return segments, first_pass, total, timer.total
+
+def main(paragraph_count):
+    encoder = calculation_tokens.get_encoder()
+
+    # Baseline: a fresh BPE encode for every count
+    def uncached_count(text, encoding_name="cl100k_base"):
+        return len(encoder.encode(text if isinstance(text, str) else str(text)))
+
+    def uncached_batch(texts, *args, **kwargs):
+        return [uncached_count(text) for text in texts]
+
+    with work_dir() as path:
+        job_store = JobStore(os.path.join(path, "job.db"))
+        try:
+            job_store.save_deduped([dict(item, count_deduped=item["count_src"]) for item in make_document(paragraph_count)], {})
+            baseline = run_with(job_store, uncached_count, uncached_batch)
+            calculation_tokens._token_cache.clear()
+            cached = run_with(job_store, calculation_tokens.num_tokens_from_string, calculation_tokens.num_tokens_batch)
+        finally:
+            job_store.close()
+
+    assert cached[0] == baseline[0], "segmentation changed"
+    cache = calculation_tokens._token_cache
+    print(f"{paragraph_count} paragraphs -> {len(cached[0])} segments, {calculation_tokens.BATCH_THREADS} batch threads")
+    print(f"{'':20} {'first pass':>10} {'+ re-segment':>13} {'token counting':>15}")
+    for label, (_, first_pass, total, counting) in (("per-call encode", baseline), ("memoized + batched", cached)):
+        print(f"{label:20} {first_pass:9.2f}s {total:12.2f}s {counting:14.2f}s")
+    print(f"token cache: {cache.hits} hits, {cache.misses} misses")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
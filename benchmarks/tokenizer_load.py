@@ -0,0 +1,25 @@
+"""
+Cold-load cost of the cl100k ranks: parsing the text ranks file vs the precompiled cache.
+
+    python -m benchmarks.tokenizer_load
+"""
+import time
+from textProcessing.calculation_tokens import get_application_path, load_mergeable_ranks, _parse_mergeable_ranks
+
+def main():
+    encoder_file = get_application_path() / "models" / "tiktoken" / "cl100k_base.tiktoken"
+    start = time.perf_counter()
+    with open(encoder_file, "rb") as f:
+        parsed = _parse_mergeable_ranks(f.read())
+    parse_time = time.perf_counter() - start
+
+    load_mergeable_ranks(encoder_file)  # writes the cache on first use
+    start = time.perf_counter()
+    cached = load_mergeable_ranks(encoder_file)
+    cache_time = time.perf_counter() - start
+
+    assert cached == parsed
+    print(f"{len(parsed)} ranks: parse {parse_time * 1000:.1f} ms, cache {cache_time * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+DocumentTranslator against a stub backend.
+
+    python -m benchmarks.translation_pipeline           thread scaling
+    python -m benchmarks.translation_pipeline pipeline  barrier vs streaming extraction, end to end
+"""
+import os
+import sys
+import json
+import time
+import shutil
+from unittest import mock
+from textProcessing import base_translator
+from textProcessing.base_translator import DocumentTranslator
+from textProcessing.streaming_pipeline import StreamingItemList
+from textProcessing.translation_checker import clean_json, check_and_sort_translations
+from textProcessing.text_separator import (
+    deduplicate_translation_content, split_text_by_token_limit, restore_translations_from_deduped
+)
+from benchmarks.harness import quiet_logs
+
+ITEM_COUNT = 2000
+
+class StubBackend:
+    """translate_text stand-in that answers every line after a fixed latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, segments, previous_text, *args, **kwargs):
+        time.sleep(self.latency)
+        segment_json = json.loads(clean_json(segments))
+        return json.dumps({k: f"译{v}" for k, v in segment_json.items()}, ensure_ascii=False), True
+
+class StubTranslator(DocumentTranslator):
+    supports_streaming_extraction = True
+    extract_delay = 0.0  # seconds of parsing per extracted item
+
+    def extract_content_to_json(self, progress_callback=None, on_item=None):
+        os.makedirs(self.file_dir, exist_ok=True)
+        items = StreamingItemList(on_item) if on_item else []
+        for i in range(ITEM_COUNT):
+            if self.extract_delay:
+                time.sleep(self.extract_delay)
+            items.append({"count_src": i + 1, "type": "text", "value": f"Paragraph {i}: the quick brown fox jumps over the lazy dog."})
+        with open(self.src_json_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+
+def make_translator(thread_count):
+    translator = StubTranslator(
+        f"__benchmark_{os.getpid()}.txt", "stub", False, "", "en", "zh",
+        False, 768, 1, thread_count, None
+    )
+    translator._open_job_store()
+    return translator
+
+def prepare(translator):
+    """The stages before translation, with their barriers"""
+    translator.extract_content_to_json()
+    translator.job_store.import_source_json(translator.src_json_path)
+    deduplicate_translation_content(translator.job_store)
+    split_text_by_token_limit(translator.job_store)
+    translator._load_status_table()
+
+def benchmark_threads(latency):
+    print("--- Thread Scaling Benchmark (stub backend) ---")
+    print(f"{ITEM_COUNT} items, {latency * 1000:.0f} ms per request")
+    for thread_count in [1, 2, 4, 8, 16]:
+        translator = make_translator(thread_count)
+        try:
+            prepare(translator)
+            start = time.time()
+            translator.translate_content(None)
+            translator.writer.close()
+            elapsed = time.time() - start
+
+            completed = translator.job_store.results.count()
+            print(f"threads={thread_count:>2}  {elapsed:6.2f}s  {completed / elapsed:8.1f} items/s")
+        finally:
+            translator._close_job_store()
+            shutil.rmtree(translator.file_dir, ignore_errors=True)
+
+def benchmark_pipeline(latency, extract_delay):
+    """Extract + dedup + split + translate + restore, with and without stage barriers"""
+    print("--- Streaming Pipeline Benchmark (stub extractor and backend) ---")
+    print(f"{ITEM_COUNT} items, {extract_delay * 1000:.1f} ms extraction per item, "
+          f"{latency * 1000:.0f} ms per request, 8 threads")
+    outputs = {}
+    for label, streaming in (("barrier", False), ("streaming", True)):
+        translator = make_translator(8)
+        translator.extract_delay = extract_delay
+        translator.streaming_pipeline = streaming
+        try:
+            start = time.time()
+            if streaming:
+                translator.translate_content_streaming(None)
+            else:
+                prepare(translator)
+                translator.translate_content(None)
+            translator.writer.close()
+            check_and_sort_translations(translator.job_store)
+            result_path = restore_translations_from_deduped(translator.job_store, translator.result_json_path)
+            elapsed = time.time() - start
+
+            with open(result_path, "r", encoding="utf-8") as f:
+                outputs[label] = json.load(f)
+            print(f"{label:<10} {elapsed:6.2f}s")
+        finally:
+            translator._close_job_store()
+            shutil.rmtree(translator.file_dir, ignore_errors=True)
+    assert outputs["barrier"] == outputs["streaming"], "streaming changed the output"
+    print("Output identical")
+
+def main(mode):
+    # Pipeline mode: slow parse and a realistic request latency, so both stages matter
+    latency = 0.2 if mode == "pipeline" else 0.05
+    # Workers look translate_text up in base_translator; no translation memory, so runs are independent
+    with quiet_logs(), \
+         mock.patch.object(base_translator, "translate_text", StubBackend(latency)), \
+         mock.patch.object(base_translator, "get_translation_memory", lambda: None):
+        if mode == "pipeline":
+            benchmark_pipeline(latency, extract_delay=0.002)
+        else:
+            benchmark_threads(latency)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "threads")
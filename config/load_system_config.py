@@ -0,0 +1,12 @@
+import os
+import json
+
+SYSTEM_CONFIG_PATH = os.path.join("config", "system_config.json")
+
+def load_system_config():
+    """Load system config, empty dict if missing or invalid"""
+    try:
+        with open(SYSTEM_CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
@@ -0,0 +1,179 @@
+import time
+import asyncio
+from threading import Lock
+from config.log_config import app_logger
+from llmWrapper.model_config import get_model_config
+
+# Consecutive connection failures that open the circuit
+FAILURE_THRESHOLD = 5
+# Wait before the first half-open probe; doubles after every failed probe
+RESET_TIMEOUT = 5.0
+MAX_RESET_TIMEOUT = 60.0
+# A probe that has not reported after this long (longer than a request timeout) is replaced
+PROBE_TIMEOUT = 150.0
+# Requests stop waiting and fail once an outage has lasted this long
+MAX_OUTAGE_WAIT = 600.0
+# How often waiting requests re-check the circuit
+WAIT_POLL_INTERVAL = 0.5
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Result messages of failed calls that mean the endpoint could not be reached
+CONNECTION_FAILURE_MARKERS = (
+    "not reachable", "not available", "network error", "connection", "timed out", "timeout",
+    "http 502", "http 503", "http 504",
+)
+
+def is_connection_failure(result, success):
+    """True if a (result, success) pair from a translate call means the endpoint is down"""
+    if success:
+        return False
+    message = str(result).lower()
+    return any(marker in message for marker in CONNECTION_FAILURE_MARKERS)
+
+class CircuitOpenError(Exception):
+    """Raised to a waiting request once the outage has lasted MAX_OUTAGE_WAIT"""
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one endpoint, shared by every worker and job.
+
+    After FAILURE_THRESHOLD consecutive connection failures the circuit opens
+    and requests wait instead of being sent. Once the reset timeout passes a
+    single request goes out as a half-open probe: success closes the circuit,
+    failure opens it again with a doubled timeout.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, max_outage_wait=MAX_OUTAGE_WAIT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.max_outage_wait = max_outage_wait
+        self.lock = Lock()
+
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.open_until = 0.0
+        self.probe_started = None
+        self.outage_start = None
+        self.times_opened = 0
+
+    def try_acquire(self):
+        """
+        Returns (allowed, probe, wait): whether a request may go out now, whether
+        it is the half-open probe, and otherwise how long to wait before asking again.
+        Raises CircuitOpenError once the outage has lasted max_outage_wait.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True, False, 0.0
+
+            now = time.monotonic()
+            if now - self.outage_start > self.max_outage_wait:
+                raise CircuitOpenError(
+                    f"{self.name} unavailable for {int(now - self.outage_start)}s, giving up"
+                )
+
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return False, False, self.open_until - now
+                self.state = HALF_OPEN
+                self.probe_started = now
+                return True, True, 0.0
+
+            # Half-open: one probe at a time, replaced if it never reports
+            if now - self.probe_started > PROBE_TIMEOUT:
+                self.probe_started = now
+                return True, True, 0.0
+            return False, False, WAIT_POLL_INTERVAL
+
+    def wait(self, check_stop_callback=None):
+        """Block until a request may go out, checking for stop requests; returns True for the probe"""
+        while True:
+            allowed, probe, wait = self.try_acquire()
+            if allowed:
+                return probe
+            if check_stop_callback:
+                check_stop_callback()
+            time.sleep(min(wait, WAIT_POLL_INTERVAL))
+
+    async def wait_async(self):
+        """Wait for the circuit without blocking the event loop; returns True for the probe"""
+        while True:
+            allowed, probe, wait = self.try_acquire()
+            if allowed:
+                return probe
+            await asyncio.sleep(min(wait, WAIT_POLL_INTERVAL))
+
+    def record(self, connection_failure, probe=False):
+        """Report the outcome of a request that went out"""
+        with self.lock:
+            if not connection_failure:
+                was_open = self.state != CLOSED
+                self.state = CLOSED
+                self.failures = 0
+                self.reset_timeout = self.base_reset_timeout
+                outage = time.monotonic() - self.outage_start if was_open else 0
+                self.outage_start = None
+            elif probe:
+                was_open = False
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED:
+                was_open = False
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.outage_start = time.monotonic()
+                    self.times_opened += 1
+                    self._open()
+                    app_logger.warning(
+                        f"Circuit for {self.name} opened after {self.failures} connection failures, "
+                        f"probing again in {self.reset_timeout:g}s"
+                    )
+                return
+            else:
+                # Requests sent before the circuit opened; the probe decides
+                return
+
+        if was_open:
+            app_logger.info(f"Circuit for {self.name} closed after {outage:.0f}s")
+        elif probe:
+            app_logger.warning(f"Probe to {self.name} failed, probing again in {self.reset_timeout:g}s")
+
+    def abandon_probe(self):
+        """The probe was cancelled before it reported; let the next request probe"""
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.open_until = time.monotonic()
+
+    def _open(self):
+        self.state = OPEN
+        self.open_until = time.monotonic() + self.reset_timeout
+        self.probe_started = None
+
+# endpoint -> CircuitBreaker, shared by all jobs
+_breakers = {}
+_breakers_lock = Lock()
+
+def endpoint_key(model, use_online):
+    """The endpoint a model's requests go to: the API base URL, or the local service"""
+    if not use_online:
+        return "LM Studio" if model and model.startswith("(LM Studio)") else "Ollama"
+    config = get_model_config(model) or {}
+    return config.get("base_url") or model
+
+def get_circuit_breaker(model, use_online):
+    """Shared circuit breaker for the endpoint serving model"""
+    key = endpoint_key(model, use_online)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key)
+            _breakers[key] = breaker
+        return breaker
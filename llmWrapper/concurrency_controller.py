@@ -0,0 +1,139 @@
+import time
+import asyncio
+from threading import Condition
+from config.log_config import app_logger
+
+# Starting limit before the controller has seen any round trips
+INITIAL_LIMIT = 4
+# Multiplicative decrease on 429s/timeouts and on latency spikes
+THROTTLE_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.9
+# Average latency above this multiple of the best seen counts as congestion
+LATENCY_TOLERANCE = 3.0
+LATENCY_SMOOTHING = 0.2
+
+def classify_outcome(result, success):
+    """Map a (result, success) pair from a translate call to ok/throttled/timeout/error"""
+    if success:
+        return "ok"
+    message = str(result).lower()
+    if "rate limit" in message or "429" in message:
+        return "throttled"
+    if "timed out" in message or "timeout" in message:
+        return "timeout"
+    return "error"
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD limit on in-flight LLM requests, bounded by max_limit.
+
+    The limit grows by one per success until the first congestion signal
+    (slow start), then by one per round trip. 429s and timeouts halve it,
+    latency far above the best observed average trims it; at most one
+    decrease is applied per round trip.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial_limit=None):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = float(min(self.max_limit, initial_limit or INITIAL_LIMIT))
+        self.in_flight = 0
+        self.slow_start = True
+        self.avg_latency = None
+        self.min_avg_latency = None
+        self.last_decrease_time = 0
+        self.condition = Condition()
+
+        self.requests = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.peak_limit = int(self.limit)
+
+    def try_acquire(self):
+        """Take a slot if one is free"""
+        with self.condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, check_stop_callback=None):
+        """Block until a slot is free, checking for stop requests"""
+        while True:
+            with self.condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(0.1)
+            if check_stop_callback:
+                check_stop_callback()
+
+    async def acquire_async(self):
+        """Wait for a slot without blocking the event loop"""
+        while not self.try_acquire():
+            await asyncio.sleep(0.05)
+
+    def release(self, latency, outcome):
+        """Return a slot and adjust the limit from the request outcome"""
+        with self.condition:
+            was_saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.requests += 1
+            old_limit = int(self.limit)
+            reason = None
+
+            if outcome == "ok":
+                self._record_latency(latency)
+                if self.avg_latency > LATENCY_TOLERANCE * self.min_avg_latency:
+                    reason = self._decrease(LATENCY_BACKOFF, "latency")
+                elif was_saturated:
+                    step = 1 if self.slow_start else 1 / self.limit
+                    self.limit = min(self.max_limit, self.limit + step)
+            elif outcome == "throttled":
+                self.throttled += 1
+                reason = self._decrease(THROTTLE_BACKOFF, "throttled")
+            elif outcome == "timeout":
+                self.timeouts += 1
+                reason = self._decrease(THROTTLE_BACKOFF, "timeout")
+
+            new_limit = int(self.limit)
+            self.peak_limit = max(self.peak_limit, new_limit)
+            avg_latency = self.avg_latency
+            self.condition.notify_all()
+
+        if new_limit != old_limit:
+            latency_info = f", avg latency {avg_latency:.2f}s" if avg_latency else ""
+            if reason:
+                app_logger.warning(f"Concurrency {old_limit} -> {new_limit} ({reason}{latency_info})")
+            else:
+                app_logger.info(f"Concurrency {old_limit} -> {new_limit}{latency_info}")
+
+    def _record_latency(self, latency):
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += LATENCY_SMOOTHING * (latency - self.avg_latency)
+        if self.min_avg_latency is None or self.avg_latency < self.min_avg_latency:
+            self.min_avg_latency = self.avg_latency
+
+    def _decrease(self, factor, reason):
+        """Cut the limit once per round trip; returns the reason if applied"""
+        now = time.time()
+        if now - self.last_decrease_time < (self.avg_latency or 0):
+            return None
+        self.last_decrease_time = now
+        self.slow_start = False
+        self.limit = max(self.min_limit, self.limit * factor)
+        if reason == "latency":
+            # Re-baseline so a lasting shift in segment size cannot ratchet the limit down
+            self.min_avg_latency = self.avg_latency / 2
+        return reason
+
+    def log_stats(self):
+        if not self.requests:
+            return
+        latency_info = f", avg latency {self.avg_latency:.2f}s" if self.avg_latency else ""
+        app_logger.info(
+            f"Concurrency controller: limit {int(self.limit)}/{self.max_limit} (peak {self.peak_limit}), "
+            f"{self.requests} requests, {self.throttled} throttled, {self.timeouts} timeouts{latency_info}"
+        )
@@ -0,0 +1,154 @@
+import asyncio
+import httpx
+import requests
+from threading import Lock
+from contextlib import contextmanager, asynccontextmanager
+from requests.adapters import HTTPAdapter
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from config.log_config import app_logger
+
+# Keep-alive pool size when no job has configured one yet
+DEFAULT_POOL_SIZE = 10
+
+_pool_size = DEFAULT_POOL_SIZE
+_registry_lock = Lock()
+
+# (base_url, api_key) -> _PooledClient
+_openai_clients = {}
+# base_url -> _PooledClient
+_sessions = {}
+# event loop -> {(base_url, api_key): _PooledClient}
+_async_openai_clients = {}
+
+class _PooledClient:
+    """A shared OpenAI client or requests.Session with the number of calls using it"""
+
+    def __init__(self, client, pool_size):
+        self.client = client
+        self.pool_size = pool_size
+        self.users = 0
+        # Set once a client with a larger pool has replaced this one
+        self.retired = False
+
+def set_pool_size(size):
+    """Set the keep-alive pool size for clients created from now on"""
+    global _pool_size
+    _pool_size = max(1, int(size))
+
+def _httpx_limits(pool_size):
+    return httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+
+def _lease(registry, key, create):
+    """
+    Take the registry's client for key for one call, rebuilding it only when a
+    job needs a larger pool. Returns (entry, idle): idle is a replaced client
+    no call is using, which the caller closes.
+    """
+    idle = None
+    with _registry_lock:
+        entry = registry.get(key)
+        if entry is None or entry.pool_size < _pool_size:
+            if entry is not None:
+                entry.retired = True
+                if entry.users == 0:
+                    idle = entry
+            entry = _PooledClient(create(_pool_size), _pool_size)
+            registry[key] = entry
+        entry.users += 1
+    return entry, idle
+
+def _release(entry):
+    """End one call on entry; True if it was the last call on a replaced client"""
+    with _registry_lock:
+        entry.users -= 1
+        return entry.retired and entry.users == 0
+
+@contextmanager
+def openai_client(base_url, api_key):
+    """
+    Use the shared OpenAI client for (base_url, api_key) for one call.
+    A client replaced by a larger pool is closed once its last call finishes.
+    """
+    def create(pool_size):
+        app_logger.debug(f"Created OpenAI client for {base_url} (pool size {pool_size})")
+        return OpenAI(
+            api_key=api_key, base_url=base_url,
+            http_client=DefaultHttpxClient(limits=_httpx_limits(pool_size))
+        )
+
+    entry, idle = _lease(_openai_clients, (base_url, api_key), create)
+    if idle is not None:
+        _close_client(idle)
+    try:
+        yield entry.client
+    finally:
+        if _release(entry):
+            _close_client(entry)
+
+@asynccontextmanager
+async def async_openai_client(base_url, api_key):
+    """
+    Async counterpart of openai_client.
+    Async connections are bound to an event loop, so clients are cached per running loop.
+    """
+    def create(pool_size):
+        app_logger.debug(f"Created AsyncOpenAI client for {base_url} (pool size {pool_size})")
+        return AsyncOpenAI(
+            api_key=api_key, base_url=base_url,
+            http_client=DefaultAsyncHttpxClient(limits=_httpx_limits(pool_size))
+        )
+
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        loop_clients = _async_openai_clients.setdefault(loop, {})
+    entry, idle = _lease(loop_clients, (base_url, api_key), create)
+    if idle is not None:
+        await _close_async_client(idle)
+    try:
+        yield entry.client
+    finally:
+        if _release(entry):
+            await _close_async_client(entry)
+
+def _close_client(entry):
+    try:
+        entry.client.close()
+    except Exception as e:
+        app_logger.debug(f"Error closing client: {e}")
+
+async def _close_async_client(entry):
+    try:
+        await entry.client.close()
+    except Exception as e:
+        app_logger.debug(f"Error closing async client: {e}")
+
+async def close_async_clients():
+    """Close the async clients owned by the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        loop_clients = _async_openai_clients.pop(loop, {})
+    for entry in loop_clients.values():
+        await _close_async_client(entry)
+
+@contextmanager
+def http_session(base_url):
+    """
+    Use the shared requests.Session with a keep-alive pool for base_url for one call.
+    A session replaced by a larger pool is closed once its last call finishes.
+    """
+    def create(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        app_logger.debug(f"Created HTTP session for {base_url} (pool size {pool_size})")
+        return session
+
+    entry, idle = _lease(_sessions, base_url, create)
+    if idle is not None:
+        _close_client(idle)
+    try:
+        yield entry.client
+    finally:
+        if _release(entry):
+            _close_client(entry)
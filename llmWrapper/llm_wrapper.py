@@ -1,13 +1,115 @@
 from config.log_config import app_logger
-from llmWrapper.online_translation import translate_online
+from llmWrapper.online_translation import translate_online, translate_online_async
 from llmWrapper.offline_translation import translate_offline
+from llmWrapper.concurrency_controller import classify_outcome
+from llmWrapper.rate_limiter import get_rate_limiter
+from llmWrapper.circuit_breaker import CircuitOpenError, get_circuit_breaker, is_connection_failure
+from llmWrapper.retry_budget import is_transport_failure
+from textProcessing.calculation_tokens import num_tokens_from_string
 import json
 import time
+import asyncio
 
 
-def translate_text(segments, previous_text, model, use_online, api_key, system_prompt, user_prompt, previous_prompt, glossary_prompt, glossary_terms=None, check_stop_callback=None):
+def _segments_to_text(segments):
+    """Render segments as the text sent for translation"""
+    # Handle dictionary segments
+    if isinstance(segments, dict):
+        try:
+            return json.dumps(segments, ensure_ascii=False)
+        except Exception as e:
+            app_logger.error(f"Error converting dict to string: {e}")
+            return str(segments)
+    elif isinstance(segments, list):
+        return "\n".join(segments)
+    return segments
+
+def estimate_request_tokens(messages, segments):
+    """Estimate prompt plus completion tokens; the completion is assumed as long as the source"""
+    prompt_tokens = sum(num_tokens_from_string(message["content"]) for message in messages)
+    return prompt_tokens + num_tokens_from_string(_segments_to_text(segments) or "")
+
+def _reserve_rate_limit(rate_limiter, messages, segments):
+    """Reserve one request on the provider limiter, returning the wait in seconds"""
+    tokens = estimate_request_tokens(messages, segments) if rate_limiter.charges_tokens else 0
+    return rate_limiter.reserve(tokens)
+
+def _report_circuit(breaker, probe, connection_failure):
+    """Record a request on the circuit breaker; a probe that never completed hands over to the next request"""
+    if connection_failure is not None:
+        breaker.record(connection_failure, probe)
+    elif probe:
+        breaker.abandon_probe()
+
+def _request_outcome(translation_result, api_success, interrupted):
+    """
+    (outcome, connection_failure) of a request for the concurrency controller
+    and circuit breaker. A stream that broke off keeps its received keys as a
+    successful result, but still counts as the failed request it was.
+    """
+    if interrupted:
+        message = str(interrupted[0])
+        return classify_outcome(message, False), is_connection_failure(message, False)
+    return classify_outcome(translation_result, api_success), is_connection_failure(translation_result, api_success)
+
+def _retry_allowed(retry_budget, result):
+    """Take a retry after a transport failure from the job's budget, if the caller passed one"""
+    if retry_budget is None or not is_transport_failure(result, False):
+        return True
+    return retry_budget.try_spend()
+
+def _local_limits(output_budget, messages, segments, model):
+    """(max_tokens, context_window, on_truncated) for a local request; all None without a budget, no cap unless it is enabled"""
+    if output_budget is None:
+        return None, None, None
+    source_tokens = num_tokens_from_string(_segments_to_text(segments) or "")
+    prompt_tokens = sum(num_tokens_from_string(message["content"]) for message in messages)
+    max_tokens, context_window = output_budget.request_limits(prompt_tokens, source_tokens)
+    if max_tokens is None:
+        return None, context_window, None
+
+    def on_truncated():
+        output_budget.record_truncation(source_tokens, max_tokens, model)
+
+    return max_tokens, context_window, on_truncated
+
+def build_messages(segments, previous_text, system_prompt, user_prompt, previous_prompt, glossary_prompt, glossary_terms=None, log_glossary=False):
+    """Build chat messages for one translation request"""
+    text_to_translate = _segments_to_text(segments)
+    
+    # Prepare glossary
+    glossary_text = ""
+    glossary_prompt_str = str(glossary_prompt) if glossary_prompt else ""
+    if glossary_terms and len(glossary_terms) > 0:
+        glossary_lines = [f"{src} -> {dst}" for src, dst in glossary_terms]
+        glossary_text = glossary_prompt_str + "\n".join(glossary_lines) + "\n\n"
+
+        # Only log glossary info on first attempt
+        if log_glossary:
+            glossary_info = "Glossary used:\n"
+            glossary_info += " || ".join([f"{src} ==> {dst}" for src, dst in glossary_terms])
+            app_logger.info(glossary_info)
+    
+    # Prepare components
+    previous_prompt_str = str(previous_prompt) if previous_prompt else ""
+    previous_text_str = str(previous_text) if previous_text else ""
+    user_prompt_str = str(user_prompt) if user_prompt else ""
+    text_to_translate_str = str(text_to_translate) if text_to_translate else ""
+    
+    full_user_prompt = f"{previous_prompt_str}\n###{previous_text_str}###\n{user_prompt_str}###\n{text_to_translate_str}###\n{glossary_text}"
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": full_user_prompt},
+    ]
+
+def translate_text(segments, previous_text, model, use_online, api_key, system_prompt, user_prompt, previous_prompt, glossary_prompt, glossary_terms=None, check_stop_callback=None, concurrency_controller=None, stream=False, retry_budget=None, output_budget=None):
     """
     Translate text segments with optional glossary support
+
+    Requests wait while the endpoint's circuit breaker is open; retries after
+    failed calls are paid from retry_budget when one is given. output_budget
+    sizes the completion limit and context window of local requests.
     
     Returns:
         tuple: (translation_result, success_status)
@@ -19,6 +121,10 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
     # Track attempts for logging
     current_attempt = 0
     wait_time = 1
+
+    # Shared RPM/TPM pacing for the provider
+    rate_limiter = get_rate_limiter(model) if use_online else None
+    breaker = get_circuit_breaker(model, use_online)
     
     while (time.time() - start_time) < max_retry_time:
         # Check for stop request at the beginning of each iteration
@@ -27,47 +133,16 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
             
         current_attempt += 1
         
-        # Handle dictionary segments
-        if isinstance(segments, dict):
-            try:
-                text_to_translate = json.dumps(segments, ensure_ascii=False)
-            except Exception as e:
-                app_logger.error(f"Error converting dict to string: {e}")
-                text_to_translate = str(segments)
-        elif isinstance(segments, list):
-            text_to_translate = "\n".join(segments)
-        else:
-            text_to_translate = segments
-        
-        # Prepare glossary
-        glossary_text = ""
-        glossary_prompt_str = str(glossary_prompt) if glossary_prompt else ""
-        if glossary_terms and len(glossary_terms) > 0:
-            # Only log glossary info on first attempt
-            if current_attempt == 1:
-                glossary_lines = [f"{src} -> {dst}" for src, dst in glossary_terms]
-                glossary_text = glossary_prompt_str + "\n".join(glossary_lines) + "\n\n"
-                
-                glossary_info = "Glossary used:\n"
-                glossary_info += " || ".join([f"{src} ==> {dst}" for src, dst in glossary_terms])
-                app_logger.info(glossary_info)
-            else:
-                glossary_lines = [f"{src} -> {dst}" for src, dst in glossary_terms]
-                glossary_text = glossary_prompt_str + "\n".join(glossary_lines) + "\n\n"
-        
-        # Prepare components
-        previous_prompt_str = str(previous_prompt) if previous_prompt else ""
-        previous_text_str = str(previous_text) if previous_text else ""
-        user_prompt_str = str(user_prompt) if user_prompt else ""
-        text_to_translate_str = str(text_to_translate) if text_to_translate else ""
-        
         # Calculate time status
         elapsed_time = time.time() - start_time
         remaining_time = max_retry_time - elapsed_time
         
         # Construct full prompt
         try:
-            full_user_prompt = f"{previous_prompt_str}\n###{previous_text_str}###\n{user_prompt_str}###\n{text_to_translate_str}###\n{glossary_text}"
+            messages = build_messages(
+                segments, previous_text, system_prompt, user_prompt, previous_prompt,
+                glossary_prompt, glossary_terms, log_glossary=current_attempt == 1
+            )
         except Exception as e:
             app_logger.error(f"Error constructing prompt (attempt {current_attempt}): {e}")
             
@@ -81,17 +156,39 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
             interruptible_sleep(wait_time, check_stop_callback)
             continue
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": full_user_prompt},
-        ]
-        
         try:
-            # Perform translation - now returns (result, status)
-            if not use_online:
-                translation_result, api_success = translate_offline(messages, model)
-            else:
-                translation_result, api_success = translate_online(api_key, messages, model)
+            # Pace to the provider limits before taking a concurrency slot
+            if rate_limiter:
+                interruptible_sleep(_reserve_rate_limit(rate_limiter, messages, segments), check_stop_callback)
+
+            # Wait for a slot from the adaptive concurrency limit
+            if concurrency_controller:
+                concurrency_controller.acquire(check_stop_callback)
+            request_start = time.time()
+            outcome = "error"
+            probe = False
+            connection_failure = None
+            try:
+                # Hold off while the endpoint's circuit is open
+                probe = breaker.wait(check_stop_callback)
+                request_start = time.time()
+                interrupted = []
+                # Perform translation - now returns (result, status)
+                if not use_online:
+                    max_tokens, context_window, on_truncated = _local_limits(output_budget, messages, segments, model)
+                    translation_result, api_success = translate_offline(
+                        messages, model, stream=stream, context_window=context_window,
+                        max_tokens=max_tokens, on_truncated=on_truncated, on_interrupted=interrupted.append
+                    )
+                else:
+                    translation_result, api_success = translate_online(
+                        api_key, messages, model, stream=stream, on_interrupted=interrupted.append
+                    )
+                outcome, connection_failure = _request_outcome(translation_result, api_success, interrupted)
+            finally:
+                _report_circuit(breaker, probe, connection_failure)
+                if concurrency_controller:
+                    concurrency_controller.release(time.time() - request_start, outcome)
             
             # If API call was successful, return the result
             if api_success:
@@ -110,6 +207,9 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
             if remaining_time <= 0:
                 app_logger.error(f"Failed to translate after 1 hour ({current_attempt} attempts).")
                 return translation_result, False
+
+            if not _retry_allowed(retry_budget, translation_result):
+                return translation_result, False
             
             # Wait before retry with exponential backoff
             wait_time = min(wait_time * 2, 10, remaining_time)  
@@ -117,6 +217,10 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
             # Interruptible sleep
             interruptible_sleep(wait_time, check_stop_callback)
                 
+        except CircuitOpenError as e:
+            app_logger.error(str(e))
+            return str(e), False
+
         except Exception as e:
             # Update time remaining
             elapsed_time = time.time() - start_time
@@ -128,6 +232,9 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
                 return f"Translation failed after 1 hour: {str(e)}", False
                 
             app_logger.error(f"Translation exception (attempt {current_attempt}): {e}")
+
+            if not _retry_allowed(retry_budget, str(e)):
+                return f"Translation failed: {str(e)}", False
             
             # Wait before retry (don't wait longer than remaining time)
             wait_time = min(wait_time * 2, 10, remaining_time)
@@ -139,6 +246,92 @@ def translate_text(segments, previous_text, model, use_online, api_key, system_p
     app_logger.error(f"Failed to translate after 1 hour ({current_attempt} attempts).")
     return None, False
 
+async def translate_text_async(segments, previous_text, model, api_key, system_prompt, user_prompt, previous_prompt, glossary_prompt, glossary_terms=None, concurrency_controller=None, stream=False, retry_budget=None):
+    """
+    Async counterpart of translate_text for online providers.
+
+    Stop requests cancel the running task, so no stop callback is polled here.
+
+    Returns:
+        tuple: (translation_result, success_status)
+    """
+    max_retry_time = 3600
+    start_time = time.time()
+    current_attempt = 0
+    wait_time = 1
+    rate_limiter = get_rate_limiter(model)
+    breaker = get_circuit_breaker(model, True)
+
+    while (time.time() - start_time) < max_retry_time:
+        current_attempt += 1
+        elapsed_time = time.time() - start_time
+
+        messages = build_messages(
+            segments, previous_text, system_prompt, user_prompt, previous_prompt,
+            glossary_prompt, glossary_terms, log_glossary=current_attempt == 1
+        )
+
+        try:
+            if rate_limiter:
+                await asyncio.sleep(_reserve_rate_limit(rate_limiter, messages, segments))
+            if concurrency_controller:
+                await concurrency_controller.acquire_async()
+            request_start = time.time()
+            outcome = "error"
+            probe = False
+            connection_failure = None
+            try:
+                probe = await breaker.wait_async()
+                request_start = time.time()
+                interrupted = []
+                translation_result, api_success = await translate_online_async(
+                    api_key, messages, model, stream=stream, on_interrupted=interrupted.append
+                )
+                outcome, connection_failure = _request_outcome(translation_result, api_success, interrupted)
+            finally:
+                # Cancelled requests release their slot without counting as congestion
+                _report_circuit(breaker, probe, connection_failure)
+                if concurrency_controller:
+                    concurrency_controller.release(time.time() - request_start, outcome)
+
+            if api_success:
+                if current_attempt > 1:
+                    app_logger.info(f"Translation succeeded on attempt {current_attempt} after {int(elapsed_time)}s")
+                return translation_result, True
+
+            app_logger.warning(f"API call failed (attempt {current_attempt}): {translation_result}")
+            error_result = translation_result
+
+        except asyncio.CancelledError:
+            raise
+        except CircuitOpenError as e:
+            app_logger.error(str(e))
+            return str(e), False
+        except Exception as e:
+            app_logger.error(f"Translation exception (attempt {current_attempt}): {e}")
+            if time.time() - start_time >= max_retry_time:
+                app_logger.error(f"Translation failed after 1 hour ({current_attempt} attempts): {e}")
+                return f"Translation failed after 1 hour: {str(e)}", False
+            error_result = f"Translation failed: {str(e)}"
+
+        elapsed_time = time.time() - start_time
+        remaining_time = max_retry_time - elapsed_time
+
+        if remaining_time <= 0:
+            app_logger.error(f"Failed to translate after 1 hour ({current_attempt} attempts).")
+            return error_result, False
+
+        if not _retry_allowed(retry_budget, error_result):
+            return error_result, False
+
+        # Wait before retry with exponential backoff
+        wait_time = min(wait_time * 2, 10, remaining_time)
+        app_logger.info(f"Waiting {wait_time}s before retry... ({int(elapsed_time)}s elapsed, {int(remaining_time)}s remaining)")
+        await asyncio.sleep(wait_time)
+
+    app_logger.error(f"Failed to translate after 1 hour ({current_attempt} attempts).")
+    return None, False
+
 def interruptible_sleep(duration, check_stop_callback=None):
     """Sleep that can be interrupted by checking stop callback"""
     interval = 0.1  # Check every 100ms
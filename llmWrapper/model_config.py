@@ -0,0 +1,121 @@
+import os
+import json
+from threading import Lock
+from config.log_config import app_logger
+
+CONFIG_DIR = "config/api_config"
+
+# Optional performance fields; None means no limit / backend default
+PERFORMANCE_FIELDS = (
+    "max_concurrency",    # concurrent requests the provider allows
+    "rpm",                # requests per minute
+    "tpm",                # tokens per minute
+    "context_window",     # total tokens per request
+    "max_output_tokens",  # completion tokens per request
+)
+
+def _validate_config(model, config):
+    """Check required keys and normalize performance fields to positive ints or None"""
+    if not isinstance(config, dict):
+        app_logger.error(f"Model config for {model} must be a JSON object")
+        return None
+
+    if not config.get("base_url") or not config.get("model"):
+        app_logger.warning(f"Model config {model} is missing base_url or model")
+
+    for field in PERFORMANCE_FIELDS:
+        value = config.get(field)
+        if value is None:
+            config[field] = None
+            continue
+        try:
+            value = int(value)
+            if value <= 0:
+                raise ValueError
+            config[field] = value
+        except (TypeError, ValueError):
+            app_logger.warning(f"Ignoring invalid {field}={config.get(field)!r} in model config {model}")
+            config[field] = None
+
+    return config
+
+class ModelConfigRegistry:
+    """
+    In-memory cache of config/api_config/*.json.
+
+    Each file is parsed once and re-parsed only when its mtime changes, so
+    per-request lookups cost a single stat call.
+    """
+
+    def __init__(self, config_dir=CONFIG_DIR):
+        self.config_dir = config_dir
+        self.lock = Lock()
+        self.entries = {}  # model -> (mtime, config)
+        self.listing = (None, [])  # (dir mtime, model names)
+
+    def get(self, model):
+        """Return the parsed config for model, or None if missing or invalid"""
+        json_path = os.path.join(self.config_dir, f"{model}.json")
+        try:
+            mtime = os.stat(json_path).st_mtime_ns
+        except OSError:
+            with self.lock:
+                self.entries.pop(model, None)
+            return None
+
+        with self.lock:
+            entry = self.entries.get(model)
+            if entry and entry[0] == mtime:
+                return entry[1]
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                config = _validate_config(model, json.load(f))
+        except json.JSONDecodeError:
+            app_logger.error(f"Failed to parse JSON file: {json_path}")
+            config = None
+        except OSError as e:
+            app_logger.error(f"Failed to read model config {json_path}: {e}")
+            return None
+
+        with self.lock:
+            self.entries[model] = (mtime, config)
+        if config is not None:
+            app_logger.debug(f"Loaded model config: {model}")
+        return config
+
+    def list_models(self, include_custom=False):
+        """List configured model names, cached until the directory changes"""
+        try:
+            mtime = os.stat(self.config_dir).st_mtime_ns
+        except OSError:
+            return []
+
+        with self.lock:
+            if self.listing[0] != mtime:
+                names = sorted(
+                    os.path.splitext(f)[0] for f in os.listdir(self.config_dir)
+                    if f.endswith(".json")
+                )
+                self.listing = (mtime, names)
+            names = self.listing[1]
+
+        if include_custom:
+            return list(names)
+        return [name for name in names if name != "Custom"]
+
+# Process-wide registry
+model_config_registry = ModelConfigRegistry()
+
+def get_model_config(model):
+    """Get cached config for model, or None"""
+    return model_config_registry.get(model)
+
+def get_model_limit(model, field):
+    """Get a performance field for model, None if unset"""
+    config = get_model_config(model)
+    return config.get(field) if config else None
+
+def list_online_models():
+    """Online models shown in the UI"""
+    return model_config_registry.list_models()
@@ -5,6 +5,12 @@ from config.log_config import app_logger
 import subprocess
 import json
 import socket
+import time
+import threading
+from llmWrapper.http_clients import http_session
+from llmWrapper.model_config import get_model_config
+from llmWrapper.ollama_options import ollama_request_fields
+from llmWrapper.stream_parser import IncrementalJSONParser, StreamStats, finish_stream
 
 def _get_host():
     # Get OLLAMA_HOST from environment variables or use default
@@ -23,6 +29,15 @@ def _get_host():
     
     return host_part, port_part
 
+# Local backend defaults when the model has no api_config entry
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_LM_STUDIO_MAX_TOKENS = 2048
+
+# Seconds a "down" result is trusted before a background probe checks again
+LIVENESS_TTL = 5.0
+# Seconds a discovered local model list is reused before it is discovered again
+DISCOVERY_TTL = 300.0
+
 # Global variables for hosts and ports
 OLLAMA_HOST, OLLAMA_PORT = _get_host()
 
@@ -100,13 +115,142 @@ def _detect_lm_studio_port():
     if not lm_studio_running:
         app_logger.info("LM Studio does not appear to be running")
 
+_lm_studio_port_lock = threading.Lock()
+_lm_studio_port_detected = False
+
+def ensure_lm_studio_port(force=False):
+    """Detect the LM Studio port on first use instead of at import"""
+    global _lm_studio_port_detected
+    if _lm_studio_port_detected and not force:
+        return
+    with _lm_studio_port_lock:
+        if force or not _lm_studio_port_detected:
+            _detect_lm_studio_port()
+            _lm_studio_port_detected = True
+
+def _port_open(host, port, timeout=1):
+    """True if a TCP connection to host:port succeeds"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        return sock.connect_ex((host, int(port))) == 0
+    finally:
+        sock.close()
+
+class ServiceLiveness:
+    """
+    Cached reachability of a local service.
+
+    Requests report their own outcome, so translate_offline never opens a
+    separate probe connection. While the service is up nothing is checked;
+    once a request fails to connect, requests fail fast and a background
+    probe re-checks at most once per LIVENESS_TTL.
+    """
+
+    def __init__(self, name, probe):
+        self.name = name
+        self.probe = probe  # probe(timeout) -> bool
+        self.alive = None  # unknown until the first request or probe
+        self.checked_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def is_available(self):
+        """Cached state for the request path; never blocks"""
+        if self.alive is False:
+            self.refresh_async()
+        return self.alive is not False
+
+    def report(self, alive):
+        """Record what a request or probe found out"""
+        if alive and self.alive:
+            return
+        with self.lock:
+            changed = self.alive is not None and self.alive != alive
+            self.alive = alive
+            self.checked_at = time.monotonic()
+        if changed:
+            app_logger.info(f"{self.name} service is {'reachable again' if alive else 'not reachable'}")
+
+    def check(self, timeout=1):
+        """Probe now and cache the result"""
+        try:
+            alive = self.probe(timeout)
+        except Exception as e:
+            app_logger.debug(f"Error checking {self.name} service: {e}")
+            alive = False
+        self.report(alive)
+        return alive
+
+    def refresh_async(self):
+        """Re-check in the background once the cached result is older than LIVENESS_TTL"""
+        with self.lock:
+            if self.probing or time.monotonic() - self.checked_at < LIVENESS_TTL:
+                return
+            self.probing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.check()
+        finally:
+            self.probing = False
+
+# Probes read the globals at call time, as the LM Studio port may be re-detected
+_liveness = {
+    "ollama": ServiceLiveness("Ollama", lambda timeout: _port_open(OLLAMA_HOST, OLLAMA_PORT, timeout)),
+    "lm_studio": ServiceLiveness("LM Studio", lambda timeout: _port_open(LM_STUDIO_HOST, LM_STUDIO_PORT, timeout)),
+}
+
+def parse_local_model(model):
+    """(service, model_name) for a local model name; unprefixed names are Ollama models"""
+    if model.startswith("(LM Studio)"):
+        return "lm_studio", model.split(")", 1)[1].strip()
+    if model.startswith("(Ollama)"):
+        return "ollama", model.split(")", 1)[1].strip()
+    return "ollama", model
+
+def warm_up_local_model(model, context_window=None):
+    """
+    Load an Ollama model in a background thread, with the num_ctx the job will
+    use, so loading overlaps extraction instead of delaying the first segment.
+    Returns the thread, or None for other services.
+    """
+    service, model_name = parse_local_model(model)
+    if service != "ollama":
+        return None
+
+    def warm_up():
+        base_url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
+        keep_alive, options = ollama_request_fields(model_name, context_window or DEFAULT_CONTEXT_WINDOW)
+        # A generate request without a prompt only loads the model
+        payload = {"model": model_name, "options": options}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        start_time = time.perf_counter()
+        try:
+            with http_session(base_url) as session:
+                response = session.post(f"{base_url}/api/generate", json=payload, timeout=300)
+            _liveness["ollama"].report(True)
+            response.raise_for_status()
+            app_logger.info(f"Ollama model {model_name} ready in {time.perf_counter() - start_time:.1f}s (num_ctx {options['num_ctx']})")
+        except requests.exceptions.ConnectionError as e:
+            _liveness["ollama"].report(False)
+            app_logger.warning(f"Ollama warm-up failed: {e}")
+        except requests.exceptions.RequestException as e:
+            app_logger.warning(f"Ollama warm-up failed: {e}")
 
-# Run the detection once at module initialization
-_detect_lm_studio_port()
+    thread = threading.Thread(target=warm_up, name="ollama-warm-up", daemon=True)
+    thread.start()
+    return thread
 
-def translate_offline(messages, model):
+def translate_offline(messages, model, stream=False, context_window=None, max_tokens=None, on_truncated=None, on_interrupted=None):
     """
     Send messages to a local LLM service for translation.
+    context_window is the job's num_ctx for Ollama and max_tokens the request's
+    completion limit; None falls back to the model config. on_truncated is
+    called when the response was cut off at the limit, on_interrupted when a
+    stream broke off after some keys arrived.
     
     Returns:
         tuple: (translation_result, success_status)
@@ -119,20 +263,16 @@ def translate_offline(messages, model):
             return "Error: No model specified", False
             
         # Strip the prefix from the model name if present
-        if model.startswith("(Ollama)") or model.startswith("(LM Studio)"):
-            # Extract service type and model name
-            if "(Ollama)" in model:
-                service = "ollama"
-                model_name = model.split(")", 1)[1].strip()
-            else:  # Must be LM Studio
-                service = "lm_studio"
-                model_name = model.split(")", 1)[1].strip()
-        else:
-            # Default to Ollama if no prefix is present
-            service = "ollama"
-            model_name = model
+        service, model_name = parse_local_model(model)
             
         app_logger.debug(f"Using {service} model: {model_name}")
+
+        # Optional per-model limits from the cached config registry
+        model_config = get_model_config(model) or {}
+        context_window = context_window or model_config.get("context_window") or DEFAULT_CONTEXT_WINDOW
+        # The model config's max_output_tokens caps the per-request budget
+        limits = [limit for limit in (max_tokens, model_config.get("max_output_tokens")) if limit]
+        max_output_tokens = min(limits) if limits else None
         
         # Special handling for qwen3 models
         is_qwen3 = "qwen3" in model_name.lower()
@@ -148,36 +288,40 @@ def translate_offline(messages, model):
         
         # Configure URL and payload based on service
         if service.lower() == "ollama":
-            url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/chat"
+            base_url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
+            url = f"{base_url}/api/chat"
             
+            keep_alive, options = ollama_request_fields(model_name, context_window, max_output_tokens)
+            options.setdefault("num_predict", -1)
             payload = {
                 "model": model_name,
                 "messages": messages,
-                "options": {
-                    "num_ctx": 8192,
-                    "num_predict": -1
-                },
+                "options": options,
                 "stream": False
             }
+            if keep_alive is not None:
+                payload["keep_alive"] = keep_alive
             
-            # Check if Ollama is running
-            if not is_ollama_running():
+            # Fail fast while the last request found Ollama down
+            if not _liveness["ollama"].is_available():
                 app_logger.error("Ollama service is not running")
                 return "Ollama service is not available", False
                 
         elif service.lower() == "lm_studio":
-            url = f"http://{LM_STUDIO_HOST}:{LM_STUDIO_PORT}/v1/chat/completions"
+            ensure_lm_studio_port()
+            base_url = f"http://{LM_STUDIO_HOST}:{LM_STUDIO_PORT}"
+            url = f"{base_url}/v1/chat/completions"
             
             payload = {
                 "model": model_name,
                 "messages": messages,
                 "temperature": 0.7,
-                "max_tokens": 2048,
+                "max_tokens": max_output_tokens or DEFAULT_LM_STUDIO_MAX_TOKENS,
                 "stream": False
             }
             
-            # Check if LM Studio is running
-            if not is_lm_studio_running():
+            # Fail fast while the last request found LM Studio down
+            if not _liveness["lm_studio"].is_available():
                 app_logger.error("LM Studio service is not running")
                 return "LM Studio service is not available", False
         else:
@@ -185,9 +329,20 @@ def translate_offline(messages, model):
             return f"Unknown service: {service}", False
             
         app_logger.debug(f"Sending request to {url} with payload: {payload}")
+
+        if stream:
+            payload["stream"] = True
+            # The session stays leased until the stream has been read
+            with http_session(base_url) as session:
+                response = session.post(url, json=payload, timeout=120, stream=True)
+                _liveness[service].report(True)
+                response.raise_for_status()
+                return _read_local_stream(response, service, model_name, on_truncated, on_interrupted)
         
-        # Make the request
-        response = requests.post(url, json=payload, timeout=120)
+        # Make the request over the pooled keep-alive session
+        with http_session(base_url) as session:
+            response = session.post(url, json=payload, timeout=120)
+        _liveness[service].report(True)
         response.raise_for_status()  # Raise exception for HTTP errors
         response_text = response.text
         
@@ -204,10 +359,15 @@ def translate_offline(messages, model):
                 if "message" not in response_json or "content" not in response_json["message"]:
                     return "Invalid Ollama response format", True
                 translated_text = response_json["message"]["content"]
+                finish_reason = response_json.get("done_reason")
             elif service.lower() == "lm_studio":
                 if "choices" not in response_json or not response_json["choices"]:
                     return "Invalid LM Studio response format", True
                 translated_text = response_json["choices"][0]["message"]["content"]
+                finish_reason = response_json["choices"][0].get("finish_reason")
+
+            if finish_reason == "length" and on_truncated:
+                on_truncated()
                 
             if not translated_text:
                 return f"Empty content from {service}", True
@@ -235,6 +395,7 @@ def translate_offline(messages, model):
 
     except requests.exceptions.ConnectionError as e:
         app_logger.error(f"Connection error: {e}")
+        _liveness[service].report(False)
         return f"{service} service is not reachable", False
     except requests.exceptions.Timeout as e:
         app_logger.error(f"Request timeout: {e}")
@@ -250,6 +411,61 @@ def translate_offline(messages, model):
         app_logger.error(f"Unexpected error: {e}")
         return f"Unexpected error: {str(e)}", False
 
+def _stream_content(line, service):
+    """(content delta, finish reason) of one streamed line; the finish reason is set on the last one"""
+    if service == "ollama":
+        data = json.loads(line)
+        content = data.get("message", {}).get("content", "")
+        if data.get("done"):
+            return content, data.get("done_reason") or "stop"
+        return content, None
+
+    # LM Studio sends OpenAI-style server-sent events
+    if not line.startswith("data:"):
+        return "", None
+    line = line[len("data:"):].strip()
+    if line == "[DONE]":
+        return "", "stop"
+    choices = json.loads(line).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or "", choices[0].get("finish_reason")
+
+def _read_local_stream(response, service, model_name, on_truncated=None, on_interrupted=None):
+    """Read a streamed local response, stopping once the JSON object closes"""
+    parser = IncrementalJSONParser()
+    stats = StreamStats(f"{service} {model_name}")
+    error = None
+    stopped_early = False
+
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            content, finish_reason = _stream_content(line, service)
+            if content:
+                stats.on_content(content)
+                if parser.feed(content):
+                    stopped_early = True
+                    break
+            if finish_reason:
+                if finish_reason == "length" and on_truncated:
+                    on_truncated()
+                break
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        app_logger.warning(f"Stream from {service} broke off: {e}")
+        error = e
+    finally:
+        # Closing the connection also stops generation on the server
+        response.close()
+
+    result = finish_stream(parser, stats, error=error, stopped_early=stopped_early, on_interrupted=on_interrupted)
+    if result is None:
+        raise error
+
+    text, success = result
+    if not text:
+        return f"Empty content from {service}", True
+    return fix_json_format(text) or text, success
+
 def fix_json_format(text):
     """
     Fix the JSON format of the response text.
@@ -306,31 +522,11 @@ def fix_json_format(text):
 
 def is_ollama_running(timeout=1):
     """Check if Ollama service is running by attempting to connect to its API port."""
-    try:
-        port_int = int(OLLAMA_PORT)
-        
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((OLLAMA_HOST, port_int))
-        sock.close()
-        return result == 0
-    except Exception as e:
-        app_logger.debug(f"Error checking Ollama service: {e}")
-        return False
+    return _liveness["ollama"].check(timeout)
 
 def is_lm_studio_running(timeout=1):
     """Check if LM Studio service is running by attempting to connect to its API port."""
-    try:
-        port_int = int(LM_STUDIO_PORT)
-        
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((LM_STUDIO_HOST, port_int))
-        sock.close()
-        return result == 0
-    except Exception as e:
-        app_logger.debug(f"Error checking LM Studio service: {e}")
-        return False
+    return _liveness["lm_studio"].check(timeout)
 
 def get_ollama_models():
     """Get list of available Ollama models."""
@@ -418,4 +614,73 @@ def populate_sum_model():
     else:
         app_logger.info(f"Found {len(ollama_models)} Ollama models and {len(lm_studio_models)} LM Studio models")
     
-    return combined_models if combined_models else None
\ No newline at end of file
+    return combined_models if combined_models else None
+
+class LocalModelDiscovery:
+    """
+    Local model list, discovered in a background thread.
+
+    Callers never wait for `ollama list`, `lms server status` or probe
+    timeouts unless they ask to: they get the cached list (empty until the
+    first discovery finishes), and a list older than DISCOVERY_TTL is
+    refreshed in the background.
+    """
+
+    def __init__(self, ttl=DISCOVERY_TTL):
+        self.ttl = ttl
+        self.models = None
+        self.discovered_at = 0.0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.thread = None
+
+    def start(self, force=False):
+        """Start discovery unless it is running or the cached list is still fresh"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if not force and self.models is not None and time.monotonic() - self.discovered_at < self.ttl:
+                return
+            self.done.clear()
+            self.thread = threading.Thread(target=self._discover, args=(force,), name="local-model-discovery", daemon=True)
+            self.thread.start()
+
+    def running(self):
+        with self.lock:
+            return self.thread is not None and self.thread.is_alive()
+
+    def get(self, timeout=0):
+        """Cached models, waiting up to timeout seconds for a running discovery"""
+        self.start()
+        if timeout:
+            self.done.wait(timeout)
+        return list(self.models or [])
+
+    def _discover(self, force):
+        start_time = time.perf_counter()
+        try:
+            # A refresh also picks up an LM Studio server started on another port
+            ensure_lm_studio_port(force=force)
+            models = populate_sum_model() or []
+        except Exception as e:
+            app_logger.warning(f"Local model discovery failed: {e}")
+            models = self.models or []
+        with self.lock:
+            self.models = models
+            self.discovered_at = time.monotonic()
+        self.done.set()
+        app_logger.debug(f"Local model discovery finished in {time.perf_counter() - start_time:.2f}s")
+
+_local_discovery = LocalModelDiscovery()
+
+def start_local_model_discovery(force=False):
+    """Discover local models in the background; force re-runs it even if the list is fresh"""
+    _local_discovery.start(force)
+
+def get_local_models(timeout=0):
+    """Discovered local models, waiting up to timeout seconds if discovery is still running"""
+    return _local_discovery.get(timeout)
+
+def local_model_discovery_running():
+    """True while a background discovery may still change the local model list"""
+    return _local_discovery.running()
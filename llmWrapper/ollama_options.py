@@ -0,0 +1,87 @@
+import os
+import math
+import json
+from threading import Lock
+from config.log_config import app_logger
+from config.load_system_config import SYSTEM_CONFIG_PATH
+
+# Ollama unloads an idle model after 5 minutes by default; keep it across pauses between jobs
+DEFAULT_KEEP_ALIVE = "30m"
+# Tokens kept free for previous text, glossary lines and the prompt wrapper
+CONTEXT_OVERHEAD_TOKENS = 512
+# num_ctx is rounded so every request of a job sends the same value;
+# Ollama reloads the model whenever num_ctx changes
+CONTEXT_GRANULARITY = 1024
+MIN_CONTEXT_WINDOW = 2048
+
+_config_lock = Lock()
+_config_cache = (None, {})  # (mtime, ollama section of the system config)
+
+def _ollama_config():
+    """"ollama_options" and "ollama_num_parallel" from the system config, re-read when the file changes"""
+    global _config_cache
+    try:
+        mtime = os.stat(SYSTEM_CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    with _config_lock:
+        if _config_cache[0] == mtime:
+            return _config_cache[1]
+    try:
+        with open(SYSTEM_CONFIG_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        config = {}
+    section = {
+        "options": config.get("ollama_options") or {},
+        "num_parallel": config.get("ollama_num_parallel"),
+    }
+    with _config_lock:
+        _config_cache = (mtime, section)
+    return section
+
+def ollama_model_options(model_name):
+    """Options for one model: the "default" entry of "ollama_options" overlaid by the model's own"""
+    configured = _ollama_config().get("options", {})
+    options = {"keep_alive": DEFAULT_KEEP_ALIVE}
+    options.update(configured.get("default") or {})
+    options.update(configured.get(model_name) or {})
+    return options
+
+def round_context(tokens):
+    """Round a context size up to CONTEXT_GRANULARITY, at least MIN_CONTEXT_WINDOW"""
+    return max(MIN_CONTEXT_WINDOW, math.ceil(tokens / CONTEXT_GRANULARITY) * CONTEXT_GRANULARITY)
+
+def context_window_for(max_token, output_tokens):
+    """num_ctx for a job: the largest request plus output_tokens for its translation, rounded up"""
+    return round_context(max_token + CONTEXT_OVERHEAD_TOKENS + output_tokens)
+
+def ollama_request_fields(model_name, context_window, max_tokens=None):
+    """
+    (keep_alive, options) for an Ollama request. num_ctx and num_predict set in
+    config win over the job's; num_predict -1 there lifts the limit, e.g. for
+    models that think before answering.
+    """
+    configured = ollama_model_options(model_name)
+    options = {"num_ctx": configured.get("num_ctx") or context_window}
+    num_predict = configured.get("num_predict") or max_tokens
+    if num_predict:
+        options["num_predict"] = num_predict
+    if configured.get("num_thread"):
+        options["num_thread"] = configured["num_thread"]
+    return configured.get("keep_alive"), options
+
+def ollama_parallel_slots():
+    """
+    Requests the Ollama server runs at once, from "ollama_num_parallel"; None if unset.
+    The server may run on another host, so this process's environment is not consulted.
+    """
+    value = _ollama_config().get("num_parallel")
+    if not value:
+        return None
+    try:
+        slots = int(value)
+    except (TypeError, ValueError):
+        app_logger.warning(f"Ignoring invalid Ollama parallel slot count {value!r}")
+        return None
+    return slots if slots > 0 else None
@@ -1,28 +1,20 @@
 import re
 import logging
 import json
-import os
-from openai import OpenAI
+import asyncio
+from llmWrapper.model_config import get_model_config
+from llmWrapper.stream_parser import IncrementalJSONParser, StreamStats, finish_stream
+from llmWrapper.http_clients import openai_client, async_openai_client
 from config.log_config import app_logger
 
-CONFIG_DIR = "config/api_config"
-
 def load_model_config(model):
     """
-    Load the JSON config for the given model name.
+    Get the cached JSON config for the given model name.
     """
-    json_path = os.path.join(CONFIG_DIR, f"{model}.json")
-    if not os.path.exists(json_path):
-        app_logger.error(f"Model config file not found: {json_path}")
-        return None
-
-    try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        return config
-    except json.JSONDecodeError:
-        app_logger.error(f"Failed to parse JSON file: {json_path}")
-        return None
+    config = get_model_config(model)
+    if config is None:
+        app_logger.error(f"Model config not found or invalid: {model}")
+    return config
 
 def fix_json_format(text):
     """
@@ -82,75 +74,42 @@ def fix_json_format(text):
         # Last resort: wrap everything in a JSON object
         return json.dumps({"translated_text": text}, ensure_ascii=False)
     
-def translate_online(api_key, messages, model):
-    """
-    Perform translation using an online API with config from a JSON file.
-    
-    Returns:
-        tuple: (translation_result, success_status)
-            - translation_result: Translated text or error message
-            - success_status: True if API call successful, False if network/auth error
-    """
-    # Load model config
-    model_config = load_model_config(model)
-    if not model_config:
-        return "Model configuration not found", False
-        
-    # Get API settings from the config
-    base_url = model_config.get("base_url")
-    api_model = model_config.get("model")
-    top_p = model_config.get("top_p")
-    temperature = model_config.get("temperature")
-    presence_penalty = model_config.get("presence_penalty")
-    frequency_penalty = model_config.get("frequency_penalty")
-
-    if not base_url or not api_model:
-        app_logger.error(f"Invalid model config: {model}")
-        return "Invalid model configuration", False
+def _build_request_params(model_config, messages):
+    """Build chat completion parameters from model config"""
+    params = {
+        "model": model_config.get("model"),
+        "messages": messages,
+        "stream": False
+    }
 
-    try:
-        # Initialize API client
-        client = OpenAI(api_key=api_key, base_url=base_url)
-
-        # Prepare parameters for the API call
-        params = {
-            "model": api_model,
-            "messages": messages,
-            "stream": False
-        }
-        
-        # Only add parameters that are present in the config
-        if top_p is not None:
-            params["top_p"] = top_p
-        if temperature is not None:
-            params["temperature"] = temperature
-        if presence_penalty is not None:
-            params["presence_penalty"] = presence_penalty
-        if frequency_penalty is not None:
-            params["frequency_penalty"] = frequency_penalty
+    # Only add parameters that are present in the config
+    for key in ("top_p", "temperature", "presence_penalty", "frequency_penalty"):
+        if model_config.get(key) is not None:
+            params[key] = model_config[key]
+    if model_config.get("max_output_tokens"):
+        params["max_tokens"] = model_config["max_output_tokens"]
 
-        # Log the messages being sent to the API
-        app_logger.debug(f"Sending messages to API: {json.dumps(messages, ensure_ascii=False, indent=2)}")
+    return params
 
-        # Send request
-        response = client.chat.completions.create(**params)
-        
-    except Exception as e:
-        error_msg = str(e).lower()
-        app_logger.error(f"API call failed: {e}")
-        
-        # Check for specific error types
-        if "connection" in error_msg or "network" in error_msg:
-            return f"Network error: {str(e)}", False
-        elif "unauthorized" in error_msg or "401" in error_msg:
-            return "Authentication failed - check API key", False
-        elif "insufficient" in error_msg or "quota" in error_msg:
-            return "Insufficient balance or quota exceeded", False
-        elif "rate limit" in error_msg or "429" in error_msg:
-            return "Rate limit exceeded", False
-        else:
-            return f"API request failed: {str(e)}", False
+def _classify_api_error(e):
+    """Map an API exception to (error_message, False)"""
+    error_msg = str(e).lower()
+    app_logger.error(f"API call failed: {e}")
+
+    # Check for specific error types
+    if "connection" in error_msg or "network" in error_msg:
+        return f"Network error: {str(e)}", False
+    elif "unauthorized" in error_msg or "401" in error_msg:
+        return "Authentication failed - check API key", False
+    elif "insufficient" in error_msg or "quota" in error_msg:
+        return "Insufficient balance or quota exceeded", False
+    elif "rate limit" in error_msg or "429" in error_msg:
+        return "Rate limit exceeded", False
+    else:
+        return f"API request failed: {str(e)}", False
 
+def _parse_response(response, api_model):
+    """Extract translated JSON text from a chat completion response"""
     try:
         if response and response.choices:
             app_logger.debug(f"API Response: {response}")
@@ -184,4 +143,131 @@ def translate_online(api_key, messages, model):
                 return str(response.choices[0].message.content), True
             except:
                 pass
-        return f"Error parsing API response: {str(e)}", True  # API call succeeded but parsing failed
\ No newline at end of file
+        return f"Error parsing API response: {str(e)}", True  # API call succeeded but parsing failed
+
+def _load_valid_config(model):
+    """Load model config, returning (config, error_message)"""
+    model_config = load_model_config(model)
+    if not model_config:
+        return None, "Model configuration not found"
+
+    if not model_config.get("base_url") or not model_config.get("model"):
+        app_logger.error(f"Invalid model config: {model}")
+        return None, "Invalid model configuration"
+
+    return model_config, None
+
+def _finish_online_stream(parser, stats, error=None, stopped_early=False, on_interrupted=None):
+    """Convert a streamed response into (translation_result, success_status)"""
+    result = finish_stream(parser, stats, error=error, stopped_early=stopped_early, on_interrupted=on_interrupted)
+    if result is None:
+        return _classify_api_error(error)
+
+    text, success = result
+    if not text:
+        app_logger.warning("Empty content in API response")
+        return "Empty response from API", True
+    return fix_json_format(text) or text, success
+
+def translate_online(api_key, messages, model, stream=False, on_interrupted=None):
+    """
+    Perform translation using an online API with config from a JSON file.
+    on_interrupted is called when a stream broke off after some keys arrived.
+    
+    Returns:
+        tuple: (translation_result, success_status)
+            - translation_result: Translated text or error message
+            - success_status: True if API call successful, False if network/auth error
+    """
+    model_config, error = _load_valid_config(model)
+    if error:
+        return error, False
+
+    try:
+        params = _build_request_params(model_config, messages)
+
+        # Log the messages being sent to the API
+        app_logger.debug(f"Sending messages to API: {json.dumps(messages, ensure_ascii=False, indent=2)}")
+
+        # Reuse the pooled client for this endpoint
+        with openai_client(model_config["base_url"], api_key) as client:
+            if stream:
+                params["stream"] = True
+                return _read_stream(client.chat.completions.create(**params), model_config["model"], on_interrupted)
+
+            # Send request
+            response = client.chat.completions.create(**params)
+        
+    except Exception as e:
+        return _classify_api_error(e)
+
+    return _parse_response(response, model_config["model"])
+
+def _read_stream(response_stream, api_model, on_interrupted=None):
+    """Read a streamed completion, stopping once the JSON object closes"""
+    parser = IncrementalJSONParser()
+    stats = StreamStats(api_model)
+    try:
+        for chunk in response_stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if not content:
+                continue
+            stats.on_content(content)
+            if parser.feed(content):
+                # Drop the rest of the generation
+                return _finish_online_stream(parser, stats, stopped_early=True)
+    except Exception as e:
+        return _finish_online_stream(parser, stats, error=e, on_interrupted=on_interrupted)
+    finally:
+        response_stream.close()
+
+    return _finish_online_stream(parser, stats)
+
+async def translate_online_async(api_key, messages, model, stream=False, on_interrupted=None):
+    """
+    Async variant of translate_online for the asyncio engine.
+    Cancellation propagates to the caller.
+    """
+    model_config, error = _load_valid_config(model)
+    if error:
+        return error, False
+
+    try:
+        params = _build_request_params(model_config, messages)
+
+        app_logger.debug(f"Sending messages to API: {json.dumps(messages, ensure_ascii=False, indent=2)}")
+
+        async with async_openai_client(model_config["base_url"], api_key) as client:
+            if stream:
+                params["stream"] = True
+                return await _read_stream_async(await client.chat.completions.create(**params), model_config["model"], on_interrupted)
+
+            response = await client.chat.completions.create(**params)
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return _classify_api_error(e)
+
+    return _parse_response(response, model_config["model"])
+
+async def _read_stream_async(response_stream, api_model, on_interrupted=None):
+    """Async counterpart of _read_stream"""
+    parser = IncrementalJSONParser()
+    stats = StreamStats(api_model)
+    try:
+        async for chunk in response_stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if not content:
+                continue
+            stats.on_content(content)
+            if parser.feed(content):
+                return _finish_online_stream(parser, stats, stopped_early=True)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return _finish_online_stream(parser, stats, error=e, on_interrupted=on_interrupted)
+    finally:
+        await response_stream.close()
+
+    return _finish_online_stream(parser, stats)
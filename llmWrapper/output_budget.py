@@ -0,0 +1,106 @@
+import math
+from threading import Lock
+from config.log_config import app_logger
+from config.load_system_config import load_system_config
+from llmWrapper.ollama_options import context_window_for, round_context
+
+# Tokens the cl100k tokenizer needs for the same content, relative to English.
+# Overridable per language code with the "language_token_density" config key.
+LANGUAGE_TOKEN_DENSITY = {
+    "en": 1.0,
+    "es": 1.3,
+    "fr": 1.3,
+    "de": 1.4,
+    "it": 1.3,
+    "pt": 1.3,
+    "ru": 2.0,
+    "zh": 1.3,
+    "zh-Hant": 1.5,
+    "ja": 1.5,
+    "ko": 1.8,
+    "th": 2.5,
+    "vi": 1.7,
+}
+DEFAULT_TOKEN_DENSITY = 1.5
+# Headroom over the expected translation length, so only outliers are cut off
+OUTPUT_MARGIN = 1.5
+# Room for the braces and stray whitespace. Think blocks are not covered, which is
+# why the budget only caps requests when the "output_budget" config key is on.
+OUTPUT_OVERHEAD_TOKENS = 64
+MIN_OUTPUT_TOKENS = 256
+# Each truncation widens the job's budget by this factor, up to MAX_TRUNCATION_BOOST
+TRUNCATION_BOOST = 1.25
+MAX_TRUNCATION_BOOST = 4.0
+
+def token_density(lang):
+    """Relative token cost of a language, from config overrides or the built-in table"""
+    overrides = load_system_config().get("language_token_density") or {}
+    return overrides.get(lang) or LANGUAGE_TOKEN_DENSITY.get(lang) or DEFAULT_TOKEN_DENSITY
+
+def expansion_factor(src_lang, dst_lang):
+    """Expected translation tokens per source token"""
+    return token_density(dst_lang) / token_density(src_lang)
+
+class OutputBudget:
+    """
+    Per-job completion limits sized from the source text.
+
+    A request may generate its source tokens times the language pair's
+    expansion factor, with OUTPUT_MARGIN headroom. For local models the job
+    also owns one context window, which only grows, so the model is not
+    reloaded back and forth. Truncations are logged with the numbers needed
+    to tune LANGUAGE_TOKEN_DENSITY and widen the budget for the rest of the job.
+
+    Unless enabled, requests stay uncapped, so models that think before
+    answering (qwen3, deepseek-r1, qwq) are not cut off mid-thought; the
+    budget then only sizes the context window.
+    """
+
+    def __init__(self, src_lang, dst_lang, enabled=False):
+        self.src_lang = src_lang
+        self.enabled = enabled
+        self.dst_lang = dst_lang
+        self.expansion = expansion_factor(src_lang, dst_lang)
+        self.boost = 1.0
+        self.context_window = None
+        self.lock = Lock()
+        self.truncations = 0
+
+    def limit(self, source_tokens):
+        """Completion tokens allowed for a request translating source_tokens"""
+        expected = source_tokens * self.expansion * self.boost
+        return max(MIN_OUTPUT_TOKENS, math.ceil(expected * OUTPUT_MARGIN) + OUTPUT_OVERHEAD_TOKENS)
+
+    def size_context(self, max_token, segment_budget):
+        """Context window for local requests: a full request plus the budget for its translation"""
+        self.context_window = context_window_for(max_token, self.limit(segment_budget))
+        return self.context_window
+
+    def request_limits(self, prompt_tokens, source_tokens):
+        """(max_tokens, context_window) for one request; max_tokens is None unless enabled"""
+        max_tokens = self.limit(source_tokens)
+        needed = prompt_tokens + max_tokens
+        if self.context_window and needed > self.context_window:
+            with self.lock:
+                if needed > self.context_window:
+                    self.context_window = round_context(needed)
+                    app_logger.info(f"Request needs {needed} tokens, raising the context window to {self.context_window}")
+        return (max_tokens if self.enabled else None), self.context_window
+
+    def record_truncation(self, source_tokens, max_tokens, label):
+        """Log a response cut off at max_tokens and widen the budget for later requests"""
+        with self.lock:
+            self.truncations += 1
+            self.boost = min(self.boost * TRUNCATION_BOOST, MAX_TRUNCATION_BOOST)
+            boost = self.boost
+        app_logger.warning(
+            f"Output truncated at {max_tokens} tokens ({label}): {source_tokens} source tokens, "
+            f"{self.src_lang}->{self.dst_lang} expansion {self.expansion:.2f}, raising the job's budget to x{boost:.2f}"
+        )
+
+    def log_stats(self):
+        if self.truncations:
+            app_logger.info(
+                f"Output budget: {self.truncations} truncated responses for {self.src_lang}->{self.dst_lang}, "
+                f"budget ended at x{self.boost:.2f} of expansion {self.expansion:.2f}"
+            )
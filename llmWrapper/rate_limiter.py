@@ -0,0 +1,82 @@
+import time
+from threading import Lock
+from config.log_config import app_logger
+from llmWrapper.model_config import get_model_config
+
+# Waits longer than this are logged, at most once per LOG_INTERVAL
+LOG_WAIT_THRESHOLD = 1.0
+LOG_INTERVAL = 5.0
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate_per_minute with one minute of burst.
+
+    reserve() always succeeds and returns how long the caller must wait, so
+    the same bucket can pace threads and asyncio tasks alike.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+
+    def reserve(self, amount, now):
+        """Take amount (capped at capacity), returning the wait in seconds"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        self.tokens -= min(amount, self.capacity)
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute pacing for one provider"""
+
+    def __init__(self, name, rpm=None, tpm=None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.lock = Lock()
+        self.last_log_time = 0
+
+    @property
+    def charges_tokens(self):
+        return self.token_bucket is not None
+
+    def reserve(self, tokens=0):
+        """Reserve one request and estimated tokens, returning the wait in seconds"""
+        with self.lock:
+            now = time.monotonic()
+            request_wait = self.request_bucket.reserve(1, now) if self.request_bucket else 0.0
+            token_wait = self.token_bucket.reserve(tokens, now) if self.token_bucket else 0.0
+
+            wait = max(request_wait, token_wait)
+            should_log = wait > LOG_WAIT_THRESHOLD and now - self.last_log_time >= LOG_INTERVAL
+            if should_log:
+                self.last_log_time = now
+
+        if should_log:
+            limit = "RPM" if request_wait >= token_wait else "TPM"
+            app_logger.info(f"Rate limiter: pacing {self.name} for {wait:.1f}s ({limit} limit)")
+        return wait
+
+# (base_url, api model) -> ProviderRateLimiter
+_limiters = {}
+_limiters_lock = Lock()
+
+def get_rate_limiter(model):
+    """Shared limiter for the model's provider, or None if its config sets no rpm/tpm"""
+    config = get_model_config(model)
+    if not config or not (config.get("rpm") or config.get("tpm")):
+        return None
+
+    key = (config.get("base_url"), config.get("model"))
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        # Rebuild when the config file changed the limits
+        if limiter is None or (limiter.rpm, limiter.tpm) != (config.get("rpm"), config.get("tpm")):
+            limiter = ProviderRateLimiter(model, config.get("rpm"), config.get("tpm"))
+            _limiters[key] = limiter
+            app_logger.info(f"Rate limiter for {model}: rpm={limiter.rpm}, tpm={limiter.tpm}")
+        return limiter
@@ -0,0 +1,51 @@
+from threading import Lock
+from config.log_config import app_logger
+from llmWrapper.circuit_breaker import is_connection_failure
+from llmWrapper.concurrency_controller import classify_outcome
+
+# Retries earned per segment sent, and retries available from the start
+DEFAULT_RETRY_RATIO = 0.5
+DEFAULT_MIN_RETRIES = 50
+
+def is_transport_failure(result, success):
+    """True for the failures the budget pays retries of: unreachable endpoint, timeout, 5xx or 429"""
+    return is_connection_failure(result, success) or classify_outcome(result, success) == "throttled"
+
+class RetryBudget:
+    """
+    Per-job cap on requests retried after transport failures.
+
+    Every segment sent for the first time deposits ratio retries; every retry
+    after a transport failure withdraws one. Once the balance is spent, such
+    failures are final instead of retried, so an outage cannot turn into an
+    unbounded number of wasted calls. Retries of responses that failed
+    validation are not charged.
+    """
+
+    def __init__(self, ratio=DEFAULT_RETRY_RATIO, min_retries=DEFAULT_MIN_RETRIES):
+        self.ratio = ratio
+        self.balance = float(min_retries)
+        self.lock = Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self, requests=1):
+        with self.lock:
+            self.balance += self.ratio * requests
+
+    def try_spend(self):
+        """Take one retry from the budget; False once it is spent"""
+        with self.lock:
+            if self.balance >= 1:
+                self.balance -= 1
+                self.retries += 1
+                return True
+            self.denied += 1
+            first_denial = self.denied == 1
+        if first_denial:
+            app_logger.warning(f"Retry budget spent after {self.retries} retries, failing further connection errors without retry")
+        return False
+
+    def log_stats(self):
+        if self.retries or self.denied:
+            app_logger.info(f"Retry budget: {self.retries} retries used, {self.denied} denied, {self.balance:.0f} left")
@@ -0,0 +1,179 @@
+import re
+import json
+import time
+from config.log_config import app_logger
+from textProcessing.calculation_tokens import num_tokens_from_string
+
+THINK_BLOCK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+class IncrementalJSONParser:
+    """
+    Incrementally parse the top-level JSON object of a streamed response.
+
+    Text before the first "{" (code fences, <think> blocks) is skipped and
+    not kept; StreamStats holds the full response.
+    Completed top-level key/value pairs are available in pairs as soon as
+    they arrive, and complete turns True once the object closes.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.raw_pos = 0
+        self.in_think = False
+        self.text = None  # response text from the opening brace on
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.pair_start = None
+        self.pairs = {}
+        self.complete = False
+
+    def feed(self, chunk):
+        """Consume a chunk; returns True once the top-level object is complete"""
+        if self.complete or not chunk:
+            return self.complete
+
+        if self.text is None:
+            self.raw += chunk
+            if not self._find_start():
+                return False
+        else:
+            self.text += chunk
+
+        self._scan()
+        return self.complete
+
+    def _find_start(self):
+        """Find the opening brace outside <think> blocks, scanning only new text"""
+        # Text before raw_pos holds no brace, so it can be dropped
+        self.raw = self.raw[self.raw_pos:]
+        self.raw_pos = 0
+        raw = self.raw
+        while True:
+            if self.in_think:
+                end = raw.find("</think>", self.raw_pos)
+                if end < 0:
+                    # Keep room for a closing tag split across chunks
+                    self.raw_pos = max(self.raw_pos, len(raw) - len("</think>"))
+                    return False
+                self.in_think = False
+                self.raw_pos = end + len("</think>")
+
+            think = raw.find("<think>", self.raw_pos)
+            brace = raw.find("{", self.raw_pos)
+            if brace >= 0 and (think < 0 or brace < think):
+                self.text = raw[brace:]
+                return True
+            if think >= 0:
+                self.in_think = True
+                self.raw_pos = think + len("<think>")
+                continue
+
+            self.raw_pos = max(self.raw_pos, len(raw) - len("<think>"))
+            return False
+
+    def _scan(self):
+        text = self.text
+        while self.pos < len(text):
+            char = text[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self.pair_start = self.pos + 1
+            elif char in "}]":
+                if self.depth == 1:
+                    self._add_pair(self.pos)
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    self.pos += 1
+                    return
+            elif char == "," and self.depth == 1:
+                self._add_pair(self.pos)
+                self.pair_start = self.pos + 1
+
+            self.pos += 1
+
+    def _add_pair(self, end):
+        pair = self.text[self.pair_start:end].strip()
+        if not pair:
+            return
+        try:
+            self.pairs.update(json.loads("{" + pair + "}"))
+        except json.JSONDecodeError:
+            app_logger.debug(f"Skipping unparsable streamed pair: {pair[:80]}")
+
+    def object_text(self):
+        """The complete top-level object, or None if it has not closed"""
+        return self.text[:self.pos] if self.complete else None
+
+class StreamStats:
+    """Time-to-first-token and throughput for one streamed request"""
+
+    def __init__(self, label):
+        self.label = label
+        self.start_time = time.time()
+        self.first_token_time = None
+        self.chunks = []
+
+    def on_content(self, content):
+        if self.first_token_time is None:
+            self.first_token_time = time.time()
+        self.chunks.append(content)
+
+    def log(self, stopped_early=False, interrupted=False):
+        end_time = time.time()
+        if self.first_token_time is None:
+            app_logger.info(f"Stream {self.label}: no content after {end_time - self.start_time:.2f}s")
+            return
+
+        text = "".join(self.chunks)
+        try:
+            tokens = num_tokens_from_string(text)
+        except Exception:
+            tokens = len(text) // 4
+        ttft = self.first_token_time - self.start_time
+        generation_time = max(end_time - self.first_token_time, 1e-6)
+        status = ", stopped at end of JSON" if stopped_early else ""
+        status += ", interrupted" if interrupted else ""
+        app_logger.info(
+            f"Stream {self.label}: TTFT {ttft:.2f}s, {tokens} tokens in {end_time - self.start_time:.2f}s "
+            f"({tokens / generation_time:.1f} tokens/s){status}"
+        )
+
+def finish_stream(parser, stats, error=None, stopped_early=False, on_interrupted=None):
+    """
+    Turn a finished or broken stream into (translation_result, success_status).
+
+    Complete objects are returned as received. When the stream broke off,
+    keys that already arrived are kept so only the missing ones are retried,
+    and on_interrupted is called with the error so the cut connection still
+    counts as a failed request. Returns None if nothing usable was received,
+    so the caller can report the error.
+    """
+    stats.log(stopped_early=stopped_early, interrupted=error is not None)
+
+    if parser.complete:
+        return parser.object_text(), True
+
+    if parser.pairs:
+        app_logger.warning(f"Stream ended early, keeping {len(parser.pairs)} received keys")
+        if error is not None and on_interrupted:
+            on_interrupted(error)
+        return json.dumps(parser.pairs, ensure_ascii=False), True
+
+    if error is not None:
+        return None
+    # No JSON object at all; hand back the plain text
+    return THINK_BLOCK_PATTERN.sub("", "".join(stats.chunks)).strip(), True
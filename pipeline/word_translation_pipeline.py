@@ -6,12 +6,16 @@ from lxml import etree
 from zipfile import ZipFile, ZIP_DEFLATED
 from .skip_pipeline import should_translate
 from config.log_config import app_logger
+from textProcessing.streaming_pipeline import StreamingItemList
 from textProcessing.text_separator import safe_convert_to_int
 import shutil
 import tempfile
 
-def extract_word_content_to_json(file_path):
-    """Extract translatable content from Word document to JSON"""
+def extract_word_content_to_json(file_path, on_item=None):
+    """
+    Extract translatable content from Word document to JSON.
+    on_item, if given, is called with each item as soon as it is extracted.
+    """
     temp_dir = None
     try:
         # Create temporary directory for processing
@@ -82,7 +86,7 @@ def extract_word_content_to_json(file_path):
         if styles_xml:
             styles_info = parse_styles_xml(styles_xml, namespaces)
 
-        content_data = []
+        content_data = StreamingItemList(on_item) if on_item else []
         item_id = 0
         
         # Extract translatable content from numbering.xml first
@@ -0,0 +1,20 @@
+"""Token count cache bounds"""
+from textProcessing.calculation_tokens import TokenCountCache
+
+
+def test_cache_evicts_least_recent_by_characters():
+    cache = TokenCountCache(max_chars=10, max_text=10)
+    cache.put(("enc", "aaaa"), 1)
+    cache.put(("enc", "bbbb"), 1)
+    assert cache.get(("enc", "aaaa")) == 1
+    cache.put(("enc", "cccc"), 1)
+    assert cache.get(("enc", "bbbb")) is None
+    assert cache.get(("enc", "aaaa")) == 1
+    assert cache.chars == 8
+
+
+def test_cache_skips_long_texts():
+    cache = TokenCountCache(max_chars=100, max_text=5)
+    cache.put(("enc", "a" * 6), 2)
+    assert cache.get(("enc", "a" * 6)) is None
+    assert cache.chars == 0
@@ -0,0 +1,70 @@
+"""Sentence and clause splitters, pinned to the output of the original splitters, and segment planning"""
+import json
+import pytest
+from textProcessing.text_separator import (
+    split_into_sentences, split_long_sentence, split_by_sentences_and_combine,
+    make_segment_builder, PLANNER_BIN_PACKING
+)
+
+LEGAL_CLAUSE = "The Party shall pay, within thirty days, the full amount; failing which: interest accrues, and so on, until paid"
+CJK_CLAUSE = "甲方应当，在本合同期限内，支付全部款项；否则：按日计息、直至付清"
+
+@pytest.mark.parametrize("text, expected", [
+    ("First sentence. Second one!  Third? No ending",
+     ["First sentence. ", "Second one!  ", "Third? ", "No ending"]),
+    ('他说："好的。"然后离开了！（注释）再见。',
+     ['他说："好的。"', "然后离开了！", "（注释）再见。"]),
+    ("Dr. Smith arrived.\nNext line; last part",
+     ["Dr. ", "Smith arrived.", "\nNext line; ", "last part"]),
+    ('Quoted "end." Then (aside.) more >> text.',
+     ['Quoted "end." ', "Then (aside.) ", "more >> text."]),
+    ("", []),
+    ("   ", []),
+])
+def test_split_into_sentences(text, expected):
+    assert split_into_sentences(text) == expected
+
+@pytest.mark.parametrize("sentence, max_tokens, expected", [
+    ("short, sentence", 50, ["short, sentence"]),
+    (LEGAL_CLAUSE, 24,
+     ["The Party shall pay, ", "within thirty days, ", "the full amount; fail", "ing which: ",
+      "interest accrues, and", " so on, ", "until paid"]),
+    (CJK_CLAUSE, 20,
+     ["甲方应当，在", "本合同期限内", "，", "支付全部款项", "；", "否则：按日计", "息、", "直至付清"]),
+    # No clause punctuation: falls back to fixed character slices
+    ("no punctuation at all in this rather long stretch of words that keeps going", 5,
+     ["no p", "unct", "uati", "on a", "t al", "l in", " thi", "s ra", "ther", " lon",
+      "g st", "retc", "h of", " wor", "ds t", "hat ", "keep", "s go", "ing"]),
+])
+def test_split_long_sentence(sentence, max_tokens, expected):
+    assert split_long_sentence(sentence, max_tokens) == expected
+
+@pytest.mark.parametrize("text, max_tokens, expected", [
+    ("One. Two. Three is longer, with clauses, and more clauses, and then some more words here. Four.", 16,
+     ["One. Two. ", "Three is longe", "r, ", "with clauses, ", "and more claus", "es, ",
+      "and then some ", "more words her", "e. ", "Four."]),
+    ("One. Two. Three. Four. Five.", 4,
+     ["One", ". ", "Two", ". ", "Thr", "ee.", " ", "Fou", "r. ", "Fiv", "e."]),
+    # Doubled punctuation is collapsed before splitting
+    ("Hello!! World.. Again,, yes", 100, ["Hello! World. Again, yes"]),
+])
+def test_split_by_sentences_and_combine(text, max_tokens, expected):
+    assert split_by_sentences_and_combine(text, max_tokens) == expected
+
+def test_pieces_cover_the_text():
+    text = "Section 12.3: the Party shall, pursuant to Section 4, pay USD 2,000 (the \"Fee\")；甲方应当在本合同期限内付款。" * 40
+    for max_tokens in (8, 64, 768):
+        pieces = [part for sentence in split_into_sentences(text) for part in split_long_sentence(sentence, max_tokens)]
+        assert "".join(pieces) == text
+
+def test_bin_packing_keeps_document_order_around_oversized_lines():
+    builder = make_segment_builder(PLANNER_BIN_PACKING, 60)
+    lines = ["short line one", "short line two", "a long paragraph, " * 30, "short line three"]
+    segments = []
+    for count_split, value in enumerate(lines, start=1):
+        segments.extend(builder.add(count_split, value))
+    segments.extend(builder.finish())
+
+    first_lines = [int(next(iter(json.loads(segment.removeprefix("```json\n").removesuffix("\n```"))))) for segment, _, _ in segments]
+    assert first_lines == sorted(first_lines)
+    assert first_lines[0] == 1 and first_lines[-1] == 4
@@ -0,0 +1,24 @@
+"""Translation memory eviction"""
+from textProcessing.translation_memory import TranslationMemory
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_entries=20)
+    memory.store_many([(f"old {i}", f"alt {i}") for i in range(20)], "en", "zh", "m", "f")
+    memory.lookup_many(["old 0"], "en", "zh", "m", "f")
+    memory.store_many([("new", "neu")], "en", "zh", "m", "f")
+
+    count = memory.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    assert count < 20
+    assert memory.entry_count == count
+    found = memory.lookup_many(["old 0", "old 1", "new"], "en", "zh", "m", "f")
+    assert found == {"old 0": "alt 0", "new": "neu"}
+    memory.close()
+
+
+def test_replaced_entries_do_not_evict(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_entries=5)
+    for _ in range(3):
+        memory.store_many([(f"text {i}", f"v {i}") for i in range(5)], "en", "zh", "m", "f")
+    assert len(memory.lookup_many([f"text {i}" for i in range(5)], "en", "zh", "m", "f")) == 5
+    memory.close()
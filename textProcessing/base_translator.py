@@ -2,30 +2,57 @@ import os
 import shutil
 import json
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 from config.log_config import app_logger
 from .calculation_tokens import num_tokens_from_string
 
-from llmWrapper.llm_wrapper import translate_text, interruptible_sleep
+from llmWrapper.llm_wrapper import translate_text, translate_text_async, interruptible_sleep
+from llmWrapper.http_clients import set_pool_size, close_async_clients
+from llmWrapper.model_config import get_model_limit
+from llmWrapper.concurrency_controller import AdaptiveConcurrencyController
+from llmWrapper.retry_budget import RetryBudget, DEFAULT_RETRY_RATIO, DEFAULT_MIN_RETRIES, is_transport_failure
+from llmWrapper.offline_translation import parse_local_model, warm_up_local_model
+from llmWrapper.ollama_options import ollama_parallel_slots
+from llmWrapper.output_budget import OutputBudget
 from textProcessing.text_separator import (
-    stream_segment_json, split_text_by_token_limit,
-    deduplicate_translation_content, create_deduped_json_for_translation, 
-    restore_translations_from_deduped
+    stream_segment_json, split_text_by_token_limit, load_glossary_matcher,
+    make_segment_builder, segment_token_budget, PLANNER_GREEDY,
+    deduplicate_translation_content, restore_translations_from_deduped
 )
 from config.load_prompt import load_prompt
-from .translation_checker import process_translation_results, clean_json, check_and_sort_translations
+from config.load_system_config import load_system_config
+from .result_writer import ResultWriter
+from .job_store import JobStore, JOB_DB_NAME, STAGE_EXTRACTED, STAGE_DEDUPED, STAGE_SPLIT
+from .streaming_pipeline import ExtractionStream, SegmentBatch
+from .retry_scheduler import RetryQueue
+from .translation_memory import get_translation_memory, make_fingerprint, file_fingerprint
+from .translation_checker import (
+    process_translation_results, clean_json, check_and_sort_translations,
+    save_json
+)
 
-# File path constants
+# File path constants; the pipelines read src.json and dst_translated.json, everything else is in the job store
 SRC_JSON_PATH = "src.json"
-SRC_DEDUPED_JSON_PATH = "src_deduped.json"
-SRC_SPLIT_JSON_PATH = "src_deduped_split.json"
-RESULT_SPLIT_JSON_PATH = "dst_translated_split.json"
-FAILED_JSON_PATH = "dst_translated_failed.json"
 RESULT_JSON_PATH = "dst_translated.json"
 MAX_PREVIOUS_TOKENS = 128
 
+# Per-segment retry limits
+MAX_SEGMENT_RETRY_TIME = 3600  # 1 hour
+MAX_EMPTY_RETRIES = 1
+
+DEFAULT_ASYNC_CONCURRENCY = 256
+
+# How often the dispatch loop polls for new segments, due retries and the stop flag
+STREAM_POLL_INTERVAL = 0.05  # seconds
+
 class DocumentTranslator:
+    # Subclasses whose extract_content_to_json accepts on_item can translate while extracting
+    supports_streaming_extraction = False
+
     def __init__(self, input_file_path, model, use_online, api_key, src_lang, dst_lang, continue_mode, max_token, max_retries, thread_count, glossary_path):
         self.input_file_path = input_file_path
         self.model = model
@@ -36,27 +63,66 @@ class DocumentTranslator:
         self.api_key = api_key
         self.max_retries = max_retries
         self.continue_mode = continue_mode
-        self.translated_failed = True
         self.glossary_path = glossary_path
         self.num_threads = thread_count
         self.lock = Lock()
+        self.writer = ResultWriter()
         self.check_stop_requested = None
         self.last_ui_update_time = 0
 
+        # Optional asyncio engine for online providers
+        system_config = load_system_config()
+        self.use_async_engine = bool(use_online and system_config.get("async_engine", False))
+        self.async_concurrency = system_config.get("async_max_concurrency", DEFAULT_ASYNC_CONCURRENCY)
+        # Translate lines that differ only in numbers, dates and codes once, as a template
+        self.template_dedup = bool(system_config.get("template_dedup", False))
+        # Start translating the first segments while the rest of the document is still being extracted
+        self.streaming_pipeline = bool(system_config.get("streaming_pipeline", False))
+        # "greedy" packs lines in document order; "bin_packing" fills requests closer to max_token
+        self.segment_planner = system_config.get("segment_planner", PLANNER_GREEDY)
+        # Also write the job store tables as the old intermediate JSON files, for debugging
+        self.export_job_json = bool(system_config.get("export_job_json", False))
+        self.event_loop = None
+
+        # Stream responses so parsing can stop as soon as the JSON object closes
+        self.stream_responses = system_config.get("stream_responses", False)
+
+        # Respect the provider's concurrency limit from the model config
+        max_concurrency = get_model_limit(model, "max_concurrency") if use_online else None
+        if max_concurrency:
+            self.num_threads = min(self.num_threads, max_concurrency)
+            self.async_concurrency = min(self.async_concurrency, max_concurrency)
+
+        # Threads beyond the Ollama server's parallel slots would only queue on the server
+        if not use_online and model and parse_local_model(model)[0] == "ollama":
+            slots = ollama_parallel_slots()
+            if slots and slots < self.num_threads:
+                app_logger.info(f"Using {slots} threads to match the Ollama server's parallel slots")
+                self.num_threads = slots
+
+        # Size shared keep-alive pools to this job's concurrency
+        set_pool_size(self.async_concurrency if self.use_async_engine else self.num_threads)
+
+        # Thread count / async concurrency is the upper bound; the controller finds the working level
+        self.concurrency_controller = AdaptiveConcurrencyController(
+            self.async_concurrency if self.use_async_engine else self.num_threads
+        )
+
         # Setup file paths
         filename = os.path.splitext(os.path.basename(input_file_path))[0]
         self.file_dir = os.path.join("temp", filename)
         
         # File paths
         self.src_json_path = os.path.join(self.file_dir, SRC_JSON_PATH)
-        self.src_deduped_json_path = os.path.join(self.file_dir, SRC_DEDUPED_JSON_PATH)
-        self.src_split_json_path = os.path.join(self.file_dir, SRC_SPLIT_JSON_PATH)
-        self.result_split_json_path = os.path.join(self.file_dir, RESULT_SPLIT_JSON_PATH)
-        self.failed_json_path = os.path.join(self.file_dir, FAILED_JSON_PATH)
         self.result_json_path = os.path.join(self.file_dir, RESULT_JSON_PATH)
-        
-        # Deduplication mapping
-        self.count_src_to_deduped_map = None
+
+        # Per-job database for items, dedup map, split chunks, results and failures; opened by process()
+        self.job_db_path = os.path.join(self.file_dir, JOB_DB_NAME)
+        self.job_store = None
+
+        # In-memory translation status (count_split -> split item)
+        self.split_items = None
+        self.status_table = {}
         
         os.makedirs(self.file_dir, exist_ok=True)
 
@@ -64,13 +130,39 @@ class DocumentTranslator:
         self.system_prompt, self.user_prompt, self.previous_prompt, self.previous_text_default, self.glossary_prompt = load_prompt(src_lang, dst_lang)
         self.previous_content = self.previous_text_default
 
+        # Failed lines are re-submitted in flight, bisected up to max_retries times
+        segment_budget = segment_token_budget(max_token, self.system_prompt, self.user_prompt, self.previous_prompt)
+        self.retry_queue = RetryQueue(max_retries, segment_budget)
+        # Local requests share one context size, sized to the job's segments; completion
+        # limits per request from the source text are opt-in ("output_budget")
+        self.output_budget = OutputBudget(src_lang, dst_lang, system_config.get("output_budget", False))
+        if not use_online:
+            self.output_budget.size_context(max_token, segment_budget)
+        # Every retried request of a run is paid from this budget, renewed per run
+        self.retry_budget_ratio = system_config.get("retry_budget_ratio", DEFAULT_RETRY_RATIO)
+        self.retry_budget_min = system_config.get("retry_budget_min", DEFAULT_MIN_RETRIES)
+        self.retry_budget = RetryBudget(self.retry_budget_ratio, self.retry_budget_min)
+
+        # Cross-document translation memory
+        self.translation_memory = get_translation_memory()
+        self.memory_fingerprint = make_fingerprint(
+            self.system_prompt, self.user_prompt, self.glossary_prompt,
+            file_fingerprint(self.glossary_path)
+        )
+
+        # Glossary automaton, shared with other jobs on the same file and reused by every segmentation round
+        self.glossary_matcher = load_glossary_matcher(self.glossary_path, src_lang, dst_lang)
+
     def check_for_stop(self):
         """Check if translation should stop"""
         if self.check_stop_requested and callable(self.check_stop_requested):
             self.check_stop_requested()
 
-    def extract_content_to_json(self):
-        """Extract document content to JSON - to be implemented by subclass"""
+    def extract_content_to_json(self, progress_callback=None):
+        """
+        Extract document content to JSON - to be implemented by subclass.
+        Subclasses with supports_streaming_extraction also take on_item, called with each item as it is extracted.
+        """
         raise NotImplementedError
 
     def write_translated_json_to_file(self, json_path, translated_json_path):
@@ -92,11 +184,15 @@ class DocumentTranslator:
 
     def translate_content(self, progress_callback):
         self.check_for_stop()
+
+        # Reuse translations from previous jobs
+        self._apply_translation_memory()
+
         app_logger.info("Segmenting JSON content...")
         
         # Get segments to translate
         all_segments = stream_segment_json(
-            self.src_split_json_path,
+            self.split_items,
             self.max_token,
             self.system_prompt,
             self.user_prompt,
@@ -104,15 +200,17 @@ class DocumentTranslator:
             self.src_lang,
             self.dst_lang,
             self.glossary_path,
-            self.continue_mode
+            glossary_matcher=self.glossary_matcher,
+            planner=self.segment_planner
         )
         
-        if not all_segments and not self.continue_mode:
-            app_logger.warning("No segments were generated.")
+        if not all_segments:
+            if not self.continue_mode and not self.translation_memory:
+                app_logger.warning("No segments were generated.")
             return
 
         total_current_batch = len(all_segments)
-        app_logger.info(f"Translating {total_current_batch} segments using {self.num_threads} threads...")
+        app_logger.info(f"Translating {total_current_batch} segments using {self._engine_description()}...")
 
         # Progress calculation
         total_segments = 0
@@ -122,17 +220,8 @@ class DocumentTranslator:
         # Calculate progress for continue mode
         if self.continue_mode:
             try:
-                if os.path.exists(self.src_split_json_path):
-                    with open(self.src_split_json_path, 'r', encoding='utf-8') as f:
-                        source_content = json.load(f)
-                        total_segments = len(source_content)
-                else:
-                    total_segments = total_current_batch
-                
-                if os.path.exists(self.result_split_json_path):
-                    with open(self.result_split_json_path, 'r', encoding='utf-8') as f:
-                        translated_content = json.load(f)
-                        completed_count = len(translated_content)
+                total_segments = len(self.split_items) or total_current_batch
+                completed_count = self.job_store.results.count()
                 
                 if total_segments > 0:
                     completed_ratio = completed_count / total_segments
@@ -151,361 +240,405 @@ class DocumentTranslator:
         else:
             total_segments = total_current_batch
         
-        def process_segment(segment_data):
-            """Process a single segment with retry logic"""
-            segment, segment_progress, current_glossary_terms = segment_data
-            
-            # Retry limits
-            max_retry_time = 3600  # 1 hour
-            max_empty_retries = 1  # 1 retry for empty results
-            start_time = time.time()
-            retry_count = 0
-            empty_result_count = 0
-            
-            while True:
-                self.check_for_stop()
-                retry_count += 1
-                
-                try:
-                    with self.lock:
-                        current_previous = self.previous_content
-                    
-                    # Translate with stop callback
-                    translated_text, success = translate_text(
-                        segment, current_previous, self.model, self.use_online, self.api_key,
-                        self.system_prompt, self.user_prompt, self.previous_prompt, self.glossary_prompt, 
-                        current_glossary_terms, check_stop_callback=self.check_for_stop
-                    )
-                    
-                    # Handle failure
-                    if not success:
-                        elapsed_time = time.time() - start_time
-                        remaining_time = max_retry_time - elapsed_time
-                        
-                        if remaining_time <= 0:
-                            app_logger.error(f"Segment translation failed after 1 hour ({retry_count} attempts)")
-                            self._mark_segment_as_failed(segment)
-                            return None
-                        
-                        app_logger.warning(f"Segment translation failed (attempt {retry_count})")
-                        interruptible_sleep(min(1, remaining_time), self.check_for_stop)
-                        continue
-                    
-                    # Handle empty result
-                    if not translated_text:
-                        empty_result_count += 1
-                        if empty_result_count > max_empty_retries:
-                            app_logger.error(f"Segment returned empty result {max_empty_retries} times")
-                            self._mark_segment_as_failed(segment)
-                            return None
-                        
-                        app_logger.warning(f"Segment returned empty result (attempt {empty_result_count}/{max_empty_retries})")
-                        interruptible_sleep(1, self.check_for_stop)
-                        continue
-                    
-                    # Process successful translation
-                    with self.lock:
-                        translation_results = process_translation_results(
-                            segment, translated_text,
-                            self.src_split_json_path, self.result_split_json_path, self.failed_json_path,
-                            self.src_lang, self.dst_lang
-                        )
-                        
-                        if translation_results:
-                            self.previous_content = self._update_previous_content(
-                                translation_results, self.previous_content, MAX_PREVIOUS_TOKENS
-                            )
-                            return translation_results
-                        else:
-                            empty_result_count += 1
-                            if empty_result_count > max_empty_retries:
-                                app_logger.warning(f"Failed to process results {max_empty_retries} times")
-                                self._mark_segment_as_failed(segment)
-                                return None
-                            
-                            app_logger.warning("Failed to process translation results")
-                            interruptible_sleep(1, self.check_for_stop)
-                            continue
-                
-                except Exception as e:
-                    elapsed_time = time.time() - start_time
-                    remaining_time = max_retry_time - elapsed_time
-                    
-                    if remaining_time <= 0:
-                        app_logger.error(f"Error processing segment after 1 hour: {e}")
-                        self._mark_segment_as_failed(segment)
-                        return None
-                    
-                    app_logger.warning(f"Error processing segment: {e}")
-                    interruptible_sleep(min(1, remaining_time), self.check_for_stop)
-                    continue
+        if not self.continue_mode:
+            self.update_ui_safely(progress_callback, 0.0, f"Translating...")
+
+        def on_segment_done(result, current_batch_completed):
+            # Retried pieces join the batch as they are scheduled
+            batch_total = total_current_batch + self.retry_queue.scheduled
+
+            # Update progress
+            if self.continue_mode:
+                current_batch_progress = current_batch_completed / batch_total
+                batch_contribution = remaining_ratio * current_batch_progress
+                overall_progress = (1.0 - remaining_ratio) + batch_contribution
+                app_logger.info(f"Progress: {overall_progress:.2%}")
+                self.update_ui_safely(
+                    progress_callback, 
+                    overall_progress, 
+                    f"Translating..."
+                )
+            else:
+                p = current_batch_completed / batch_total
+                app_logger.info(f"Progress: {p:.2%}")
+                self.update_ui_safely(progress_callback, p, f"Translating...")
 
-        # Translate segments in parallel
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            futures = []
-            for seg in all_segments:
-                future = executor.submit(process_segment, seg)
-                futures.append(future)
-            
-            if not self.continue_mode:
-                self.update_ui_safely(progress_callback, 0.0, f"Translating...")
-            
-            current_batch_completed = 0
-            
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    app_logger.error(f"Segment translation error: {e}")
-                
-                current_batch_completed += 1
-                
-                # Update progress
-                if self.continue_mode:
-                    current_batch_progress = current_batch_completed / total_current_batch
-                    batch_contribution = remaining_ratio * current_batch_progress
-                    overall_progress = (1.0 - remaining_ratio) + batch_contribution
-                    app_logger.info(f"Progress: {overall_progress:.2%}")
-                    self.update_ui_safely(
-                        progress_callback, 
-                        overall_progress, 
-                        f"Translating..."
-                    )
-                else:
-                    p = current_batch_completed / total_current_batch
-                    app_logger.info(f"Progress: {p:.2%}")
-                    self.update_ui_safely(progress_callback, p, f"Translating...")
+        self._translate_segments(all_segments, on_segment_done)
 
-    def retranslate_failed_content(self, retry_count, max_retries, progress_callback, last_try=False):
+    def _use_streaming_pipeline(self):
+        """Streaming needs a fresh job and per-item dedup; template dedup looks at the whole document first"""
+        return (
+            self.streaming_pipeline and self.supports_streaming_extraction
+            and not self.continue_mode and not self.template_dedup
+        )
+
+    def translate_content_streaming(self, progress_callback):
+        """Extract, deduplicate, split and translate in one pass, starting on the first segment"""
         self.check_for_stop()
-        app_logger.info(f"Retrying failed translations...{retry_count}/{max_retries}")
-        
-        if not os.path.exists(self.failed_json_path):
-            app_logger.info("No failed segments to retranslate")
-            return False
 
-        # Read failed list
-        with open(self.failed_json_path, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                if not data:
-                    app_logger.info("No failed segments to retranslate")
-                    return False
-            except json.JSONDecodeError:
-                app_logger.error("Failed to decode JSON")
-                return False
-
-        # Get failed segments
-        all_failed_segments = stream_segment_json(
-            self.failed_json_path,
-            self.max_token,
-            self.system_prompt,
-            self.user_prompt,
-            self.previous_prompt,
-            self.src_lang,
-            self.dst_lang,
-            self.glossary_path,
-            self.continue_mode
+        # The status table and split_items table grow as split items arrive
+        self.split_items = []
+        self.status_table = {}
+        memory_hits = [0]
+        if self.translation_memory:
+            self.translation_memory.reset_stats()
+
+        def on_split_items(items):
+            self.job_store.add_split_items(items)
+            with self.lock:
+                self.split_items.extend(items)
+                for item in items:
+                    self.status_table[int(item["count_split"])] = item
+
+            records = self._memory_records(items)
+            if not records:
+                return items
+            save_json(self.job_store.results, records, self.writer)
+            self._mark_translated(records)
+            memory_hits[0] += len(records)
+            reused = {record["count_split"] for record in records}
+            return [item for item in items if item["count_split"] not in reused]
+
+        def on_finished(source_items, deduplicator):
+            self.job_store.save_source_items(source_items)
+            self.job_store.save_deduped(deduplicator.deduped_data, deduplicator.count_src_to_deduped_map)
+            self.job_store.mark_stage(STAGE_SPLIT)
+
+        segment_builder = make_segment_builder(
+            self.segment_planner,
+            segment_token_budget(self.max_token, self.system_prompt, self.user_prompt, self.previous_prompt),
+            glossary_matcher=self.glossary_matcher
+        )
+        stream = ExtractionStream(
+            lambda on_item: self.extract_content_to_json(None, on_item=on_item),
+            segment_builder, on_split_items, on_finished
         )
-        
-        if not all_failed_segments:
-            app_logger.info("All text has been translated")
-            return False
 
-        # Last try - process line by line
-        if last_try and all_failed_segments:
-            app_logger.info("Last try: processing each line individually")
-            
-            processed_segments = []
-            total_lines = 0
-            
-            # Count total lines
-            for segment, _, _ in all_failed_segments:
-                try:
-                    segment_content = clean_json(segment)
-                    segment_json = json.loads(segment_content)
-                    total_lines += len(segment_json)
-                except (json.JSONDecodeError, ValueError) as e:
-                    app_logger.warning(f"Error parsing segment: {e}")
-                    total_lines += 1
-            
-            app_logger.info(f"Total lines to process: {total_lines}")
-            current_line = 0
-            
-            # Split segments into individual lines
-            for segment, segment_progress, current_glossary_terms in all_failed_segments:
-                try:
-                    segment_content = clean_json(segment)
-                    segment_json = json.loads(segment_content)
-                    
-                    for key, value in segment_json.items():
-                        single_line_json = {key: value}
-                        single_line_segment = f"```json\n{json.dumps(single_line_json, ensure_ascii=False, indent=4)}\n```"
-                        
-                        current_line += 1
-                        line_progress = current_line / total_lines if total_lines > 0 else 0
-                        
-                        # Filter glossary terms
-                        line_glossary_terms = []
-                        if current_glossary_terms:
-                            line_glossary_terms = [term for term in current_glossary_terms if term[0] in value]
-                        
-                        processed_segments.append((single_line_segment, line_progress, line_glossary_terms))
-                        
-                except (json.JSONDecodeError, ValueError) as e:
-                    app_logger.warning(f"Error parsing segment: {e}")
-                    current_line += 1
-                    processed_segments.append((segment, current_line / total_lines if total_lines > 0 else 0, current_glossary_terms))
-            
-            if processed_segments:
-                all_failed_segments = processed_segments
-                app_logger.info(f"Processing {len(processed_segments)} individual lines")
-        
-        # Clear failed list
-        with self.lock:
-            with open(self.failed_json_path, 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False, indent=4)
-        
-        total = len(all_failed_segments)
-        retry_desc = "Final translation attempt" if last_try else "Retrying translation"
-        app_logger.info(f"{retry_desc} {total} segments using {self.num_threads} threads...")
+        app_logger.info(f"Streaming extraction into translation using {self._engine_description()}...")
+        self.update_ui_safely(progress_callback, 0.0, "Translating...")
 
-        def process_failed_segment(segment_data, last_try=False):
-            """Process failed segment with retry logic"""
-            segment, segment_progress, current_glossary_terms = segment_data
-            
-            # Retry limits
-            max_retry_time = 3600  # 1 hour
-            max_empty_retries = 1  # 1 retry
-            start_time = time.time()
-            retry_count = 0
-            empty_result_count = 0
-            
-            while True:
-                self.check_for_stop()
-                retry_count += 1
-                
-                try:
-                    with self.lock:
-                        current_previous = self.previous_content
-                    
-                    # Translate
-                    translated_text, success = translate_text(
-                        segment, current_previous, self.model, self.use_online, self.api_key,
-                        self.system_prompt, self.user_prompt, self.previous_prompt, self.glossary_prompt, 
-                        current_glossary_terms, check_stop_callback=self.check_for_stop
-                    )
+        def on_segment_done(result, completed):
+            # The total is only known once extraction finishes
+            total = max(stream.segment_count + self.retry_queue.scheduled, 1)
+            p = completed / total
+            desc = "Translating..." if stream.finished else "Extracting and translating..."
+            app_logger.info(f"Progress: {p:.2%}")
+            self.update_ui_safely(progress_callback, p, desc)
 
-                    # Handle failure
-                    if not success:
-                        elapsed_time = time.time() - start_time
-                        remaining_time = max_retry_time - elapsed_time
-                        
-                        if remaining_time <= 0:
-                            app_logger.error(f"Failed segment translation failed after 1 hour")
-                            self._mark_segment_as_failed(segment)
-                            return None
-                        
-                        app_logger.warning(f"Failed segment translation failed (attempt {retry_count})")
-                        interruptible_sleep(min(1, remaining_time), self.check_for_stop)
-                        continue
-                    
-                    # Handle empty result
-                    if not translated_text:
-                        empty_result_count += 1
-                        if empty_result_count > max_empty_retries:
-                            app_logger.error(f"Failed segment returned empty result")
-                            self._mark_segment_as_failed(segment)
-                            return None
-                        
-                        app_logger.warning(f"Failed segment returned empty result")
-                        interruptible_sleep(1, self.check_for_stop)
-                        continue
-                    
-                    # Process successful translation
-                    with self.lock:
-                        translation_results = process_translation_results(
-                            segment, translated_text,
-                            self.src_split_json_path, self.result_split_json_path,
-                            self.failed_json_path, self.src_lang, self.dst_lang,
-                            last_try=last_try
-                        )
-                        
-                        if translation_results:
-                            self.previous_content = self._update_previous_content(
-                                translation_results, self.previous_content, MAX_PREVIOUS_TOKENS
-                            )
-                            app_logger.debug(f"Successfully processed segment")
-                            return translation_results
-                        else:
-                            empty_result_count += 1
-                            app_logger.warning(f"Failed to process translation results")
-                            
-                            if empty_result_count > max_empty_retries:
-                                app_logger.warning(f"Failed to process results")
-                                self._mark_segment_as_failed(segment)
-                                return None
-                            
-                            interruptible_sleep(1, self.check_for_stop)
-                            continue
-                
-                except Exception as e:
-                    elapsed_time = time.time() - start_time
-                    remaining_time = max_retry_time - elapsed_time
-                    
-                    if remaining_time <= 0:
-                        app_logger.error(f"Error processing failed segment: {e}")
-                        self._mark_segment_as_failed(segment)
-                        return None
-                    
-                    app_logger.warning(f"Error processing failed segment: {e}")
-                    interruptible_sleep(min(1, remaining_time), self.check_for_stop)
-                    continue
+        try:
+            stream.start()
+            completed = self._translate_segment_stream(stream, on_segment_done)
+        finally:
+            stream.close()
+
+        if self.translation_memory:
+            self.translation_memory.log_stats()
+        if memory_hits[0]:
+            app_logger.info(f"Reused {memory_hits[0]} translations from translation memory")
+        if not completed and not memory_hits[0]:
+            app_logger.warning("No segments were generated.")
 
-        # Process failed segments in parallel
+    def _engine_description(self):
+        if self.use_async_engine:
+            return f"asyncio engine (up to {self.async_concurrency} concurrent requests)"
+        return f"up to {self.num_threads} threads"
+
+    def _translate_segments(self, segments, on_segment_done):
+        """Translate segments concurrently, calling on_segment_done(result, completed) as each finishes"""
+        return self._translate_segment_stream(SegmentBatch(segments), on_segment_done)
+
+    def _dispatch_timeout(self):
+        """How long the dispatch loop may block: one poll interval, or less if a retry is due sooner"""
+        delay = self.retry_queue.next_delay()
+        return STREAM_POLL_INTERVAL if delay is None else min(STREAM_POLL_INTERVAL, delay)
+
+    def _translate_segment_stream(self, stream, on_segment_done):
+        """
+        Translate segments as the stream produces them, re-submitting failed lines
+        from the retry queue once their backoff elapses. Returns how many attempts finished.
+        """
+        self.retry_queue.clear()
+        self.retry_budget = RetryBudget(self.retry_budget_ratio, self.retry_budget_min)
+        if self.use_async_engine:
+            # One loop per job so pooled async clients survive between runs
+            if self.event_loop is None:
+                self.event_loop = asyncio.new_event_loop()
+            try:
+                return self.event_loop.run_until_complete(self._translate_segment_stream_async(stream, on_segment_done))
+            finally:
+                self.concurrency_controller.log_stats()
+                self.retry_budget.log_stats()
+
+        completed = 0
+        done_queue = queue.Queue()
         with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            futures = []
-            for seg in all_failed_segments:
-                future = executor.submit(process_failed_segment, seg, last_try)
-                futures.append(future)
-            
-            self.update_ui_safely(progress_callback, 0.0, f"{retry_desc}...")
-            
-            completed = 0
-            failed_count = 0
-            
-            for future in as_completed(futures):
+            pending = set()
+
+            def submit(seg, depth=0, line_limit=None):
+                future = executor.submit(self._process_segment, seg, depth, line_limit)
+                pending.add(future)
+                future.add_done_callback(done_queue.put)
+
+            finished = False
+            try:
+                while not finished or pending or self.retry_queue:
+                    self.check_for_stop()
+                    if not finished:
+                        segments, finished = stream.get_segments(STREAM_POLL_INTERVAL)
+                        for seg in segments:
+                            submit(seg)
+                    for seg, depth, line_limit in self.retry_queue.pop_ready():
+                        submit(seg, depth, line_limit)
+
+                    try:
+                        future = done_queue.get(timeout=self._dispatch_timeout() if finished else 0)
+                    except queue.Empty:
+                        continue
+
+                    while True:
+                        pending.discard(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            app_logger.error(f"Segment translation error: {e}")
+                            result = None
+
+                        completed += 1
+                        on_segment_done(result, completed)
+                        try:
+                            future = done_queue.get_nowait()
+                        except queue.Empty:
+                            break
+            finally:
+                # Workers see the stop flag themselves; drop what has not started
+                for future in pending:
+                    future.cancel()
+
+        self.concurrency_controller.log_stats()
+        self.retry_budget.log_stats()
+        self.output_budget.log_stats()
+        return completed
+
+    async def _translate_segment_stream_async(self, stream, on_segment_done):
+        """Async counterpart of _translate_segment_stream, bounded by a semaphore on one event loop"""
+        semaphore = asyncio.Semaphore(self.async_concurrency)
+
+        async def run_segment(seg, depth, line_limit):
+            async with semaphore:
+                return await self._process_segment_async(seg, depth, line_limit)
+
+        tasks = []
+        pending = set()
+        done_queue = asyncio.Queue()
+        stop_watcher = asyncio.create_task(self._cancel_on_stop(tasks))
+
+        def submit(seg, depth=0, line_limit=None):
+            task = asyncio.create_task(run_segment(seg, depth, line_limit))
+            tasks.append(task)
+            pending.add(task)
+            task.add_done_callback(done_queue.put_nowait)
+
+        finished = False
+        completed = 0
+        try:
+            while not finished or pending or self.retry_queue:
+                if not finished:
+                    segments, finished = stream.get_segments()
+                    for seg in segments:
+                        submit(seg)
+                for seg, depth, line_limit in self.retry_queue.pop_ready():
+                    submit(seg, depth, line_limit)
+
                 try:
-                    result = future.result()
-                    if result is None:
-                        failed_count += 1
-                        app_logger.debug(f"Segment processing failed")
-                except Exception as e:
-                    failed_count += 1
-                    app_logger.error(f"Failed segment error: {e}")
-                
-                completed += 1
-                p = completed / total
-                app_logger.info(f"Progress: {p:.2%}")
-                self.update_ui_safely(
-                    progress_callback, 
-                    p, 
-                    f"{retry_desc}...{retry_count+1}/{max_retries}"
-                )
+                    task = await asyncio.wait_for(done_queue.get(), self._dispatch_timeout())
+                except asyncio.TimeoutError:
+                    self.check_for_stop()
+                    continue
 
-        self.update_ui_safely(progress_callback, 1.0, f"{retry_desc} completed")
-        
-        # Check if any segments remain failed
+                while True:
+                    pending.discard(task)
+                    try:
+                        result = task.result()
+                    except asyncio.CancelledError:
+                        # Tasks are only cancelled by the stop watcher
+                        self.check_for_stop()
+                        raise
+                    except Exception as e:
+                        app_logger.error(f"Segment translation error: {e}")
+                        result = None
+
+                    completed += 1
+                    on_segment_done(result, completed)
+                    try:
+                        task = done_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+        finally:
+            stop_watcher.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(stop_watcher, *tasks, return_exceptions=True)
+        return completed
+
+    def _close_event_loop(self):
+        """Close pooled async clients and the job's event loop"""
+        if self.event_loop is None:
+            return
         try:
-            if os.path.exists(self.failed_json_path):
-                with open(self.failed_json_path, 'r', encoding='utf-8') as f:
-                    remaining_failed = json.load(f)
-                    if remaining_failed:
-                        return True
-        except Exception as e:
-            app_logger.error(f"Error checking failed list: {e}")
-        
-        return False
+            self.event_loop.run_until_complete(close_async_clients())
+        finally:
+            self.event_loop.close()
+            self.event_loop = None
+
+    async def _cancel_on_stop(self, tasks):
+        """Poll the stop flag and cancel in-flight requests when it is set"""
+        while True:
+            try:
+                self.check_for_stop()
+            except Exception:
+                app_logger.info("Stop requested, cancelling pending translation tasks")
+                for task in tasks:
+                    task.cancel()
+                return
+            await asyncio.sleep(0.1)
+
+    def _attempt_state(self, segment_data, depth, line_limit):
+        _, _, glossary_terms = segment_data
+        # A segment's first attempt earns transport retries for the job
+        if depth == 0:
+            self.retry_budget.deposit()
+        return {
+            "start_time": time.time(), "retry_count": 0, "empty_result_count": 0,
+            "depth": depth, "line_limit": line_limit, "glossary_terms": glossary_terms
+        }
+
+    def _process_segment(self, segment_data, depth=0, line_limit=None):
+        """
+        Process a single segment with retry logic. depth counts how often its lines
+        already failed; line_limit is the size limit of the piece (None for a full segment).
+        """
+        segment, segment_progress, current_glossary_terms = segment_data
+        state = self._attempt_state(segment_data, depth, line_limit)
+
+        while True:
+            self.check_for_stop()
+            state["retry_count"] += 1
+
+            try:
+                with self.lock:
+                    current_previous = self.previous_content
+
+                # Translate with stop callback
+                translated_text, success = translate_text(
+                    segment, current_previous, self.model, self.use_online, self.api_key,
+                    self.system_prompt, self.user_prompt, self.previous_prompt, self.glossary_prompt, 
+                    current_glossary_terms, check_stop_callback=self.check_for_stop,
+                    concurrency_controller=self.concurrency_controller, stream=self.stream_responses,
+                    retry_budget=self.retry_budget, output_budget=self.output_budget
+                )
+                results, retry_delay = self._handle_attempt(segment, translated_text, success, state)
+            except Exception as e:
+                results, retry_delay = None, self._handle_attempt_error(segment, e, state)
+
+            if retry_delay is None:
+                return results
+            interruptible_sleep(retry_delay, self.check_for_stop)
+
+    async def _process_segment_async(self, segment_data, depth=0, line_limit=None):
+        """Async counterpart of _process_segment"""
+        segment, segment_progress, current_glossary_terms = segment_data
+        state = self._attempt_state(segment_data, depth, line_limit)
+
+        while True:
+            state["retry_count"] += 1
+
+            try:
+                with self.lock:
+                    current_previous = self.previous_content
+
+                translated_text, success = await translate_text_async(
+                    segment, current_previous, self.model, self.api_key,
+                    self.system_prompt, self.user_prompt, self.previous_prompt, self.glossary_prompt,
+                    current_glossary_terms, concurrency_controller=self.concurrency_controller,
+                    stream=self.stream_responses, retry_budget=self.retry_budget
+                )
+                results, retry_delay = self._handle_attempt(segment, translated_text, success, state)
+            except Exception as e:
+                results, retry_delay = None, self._handle_attempt_error(segment, e, state)
+
+            if retry_delay is None:
+                return results
+            await asyncio.sleep(retry_delay)
+
+    def _handle_attempt(self, segment, translated_text, success, state):
+        """
+        Validate and persist one translation attempt; failed lines go to the retry queue.
+        Returns (results, retry_delay); retry_delay is None once the segment is done.
+        """
+        # Handle failure
+        if not success:
+            # Connection errors, 5xx and 429 are retried from the job's retry budget
+            if is_transport_failure(translated_text, success) and not self.retry_budget.try_spend():
+                self._mark_segment_as_failed(segment, state, retry=False)
+                return None, None
+
+            remaining_time = MAX_SEGMENT_RETRY_TIME - (time.time() - state["start_time"])
+            if remaining_time <= 0:
+                app_logger.error(f"Segment translation failed after 1 hour ({state['retry_count']} attempts)")
+                self._mark_segment_as_failed(segment, state)
+                return None, None
+
+            app_logger.warning(f"Segment translation failed (attempt {state['retry_count']})")
+            return None, min(1, remaining_time)
+
+        # Handle empty result
+        if not translated_text:
+            state["empty_result_count"] += 1
+            if state["empty_result_count"] > MAX_EMPTY_RETRIES:
+                app_logger.error(f"Segment returned empty result {MAX_EMPTY_RETRIES} times")
+                self._mark_segment_as_failed(segment, state)
+                return None, None
+
+            app_logger.warning(f"Segment returned empty result (attempt {state['empty_result_count']}/{MAX_EMPTY_RETRIES})")
+            return None, 1
+
+        # Process successful translation (persistence is queued to the writer)
+        translation_results = process_translation_results(
+            segment, translated_text,
+            self.job_store.results, self.job_store.failures,
+            self.src_lang, self.dst_lang,
+            last_try=self.retry_queue.is_last_try(state["depth"]),
+            mark_translated_callback=self._commit_translations,
+            writer=self.writer,
+            first_try=state["depth"] == 0,
+            failed_callback=lambda records: self._retry_or_fail(segment, records, state)
+        )
+
+        if translation_results:
+            self._commit_previous_content(translation_results)
+            return translation_results, None
+
+        # Every line failed and has been handed to the retry queue
+        app_logger.warning("Failed to process translation results")
+        return None, None
+
+    def _handle_attempt_error(self, segment, error, state):
+        """Handle an exception from one attempt, returning the retry delay or None"""
+        remaining_time = MAX_SEGMENT_RETRY_TIME - (time.time() - state["start_time"])
+        if remaining_time <= 0:
+            app_logger.error(f"Error processing segment after 1 hour: {error}")
+            self._mark_segment_as_failed(segment, state)
+            return None
+
+        app_logger.warning(f"Error processing segment: {error}")
+        return min(1, remaining_time)
+
+    def _commit_previous_content(self, translation_results):
+        """Compute new context outside the lock, then swap it in"""
+        new_previous = self._update_previous_content(translation_results, None, MAX_PREVIOUS_TOKENS)
+        if new_previous is not None:
+            with self.lock:
+                self.previous_content = new_previous
 
     def _update_previous_content(self, translated_text_dict, previous_content, max_tokens):
         """Update context with recent translations"""
@@ -522,7 +655,8 @@ class DocumentTranslator:
         if len(valid_items) > 3:
             valid_items = valid_items[-3:]
         
-        total_tokens = sum(num_tokens_from_string(v) for _, v in valid_items)
+        item_tokens = [num_tokens_from_string(v) for _, v in valid_items]
+        total_tokens = sum(item_tokens)
         
         if total_tokens > max_tokens and len(valid_items) == 1:
             app_logger.info(f"Single paragraph exceeds token limit: {total_tokens} > {max_tokens}")
@@ -532,10 +666,7 @@ class DocumentTranslator:
             final_items = []
             current_tokens = 0
             
-            for item in reversed(valid_items):
-                k, v = item
-                v_tokens = num_tokens_from_string(v)
-                
+            for item, v_tokens in zip(reversed(valid_items), reversed(item_tokens)):
                 if current_tokens + v_tokens > max_tokens:
                     if not final_items:
                         app_logger.info(f"Cannot fit any paragraph within token limit")
@@ -555,9 +686,101 @@ class DocumentTranslator:
         
         return new_content
     
+    def _load_status_table(self):
+        """Load split items once and index translation status by count_split"""
+        # translated_status comes from the results table, so it is never behind the results
+        self.split_items = self.job_store.load_split_items()
+        self.status_table = {int(item["count_split"]): item for item in self.split_items}
+
+    def _apply_translation_memory(self):
+        """Mark items found in translation memory as translated"""
+        if not self.translation_memory:
+            return
+        if self.split_items is None:
+            self._load_status_table()
+
+        self.translation_memory.reset_stats()
+        records = self._memory_records(self.split_items)
+        self.translation_memory.log_stats()
+
+        if records:
+            save_json(self.job_store.results, records, self.writer)
+            self._mark_translated(records)
+            self.writer.flush()
+            app_logger.info(f"Reused {len(records)} translations from translation memory")
+
+    def _memory_records(self, items):
+        """Result records for untranslated split items found in translation memory"""
+        if not self.translation_memory:
+            return []
+
+        pending = [
+            item for item in items
+            if isinstance(item, dict)
+            and not item.get("translated_status", False)
+            and item.get("value", "").strip()
+        ]
+        if not pending:
+            return []
+
+        found = self.translation_memory.lookup_many(
+            [item["value"].strip() for item in pending],
+            self.src_lang, self.dst_lang, self.model, self.memory_fingerprint
+        )
+
+        records = []
+        for item in pending:
+            value = item["value"].strip()
+            if value in found:
+                records.append({
+                    "count_split": int(item["count_split"]),
+                    "original": value,
+                    "translated": found[value]
+                })
+        return records
+
+    def _commit_translations(self, records, validated=True):
+        """Record saved translations in status table, and validated ones in translation memory"""
+        self._mark_translated(records)
+
+        # Last-try results are accepted unchecked; keep them out of the memory later jobs reuse
+        if self.translation_memory and validated:
+            pairs = [
+                (record["original"], record["translated"])
+                for record in records
+                if record["translated"].strip() != str(record["original"]).strip()
+            ]
+            if pairs:
+                self.writer.call(
+                    self.translation_memory.store_many, pairs,
+                    self.src_lang, self.dst_lang, self.model, self.memory_fingerprint
+                )
+
+    def _mark_translated(self, records):
+        """Update in-memory status; the results table is the persistent record"""
+        with self.lock:
+            if self.split_items is None:
+                self._load_status_table()
+
+            for record in records:
+                item = self.status_table.get(int(record["count_split"]))
+                if item is not None:
+                    item["translated_status"] = True
+
+    def _open_job_store(self):
+        if self.job_store is None:
+            self.job_store = JobStore(self.job_db_path)
+        return self.job_store
+
+    def _close_job_store(self):
+        if self.job_store is not None:
+            self.job_store.close()
+            self.job_store = None
+
     def _clear_temp_folder(self):
         """Clear temp folder"""
         temp_folder = "temp"
+        self._close_job_store()
         try:
             if os.path.exists(temp_folder):
                 app_logger.info("Clearing temp folder...")
@@ -567,143 +790,145 @@ class DocumentTranslator:
         finally:
             os.makedirs(temp_folder, exist_ok=True)
     
-    def _mark_segment_as_failed(self, segment):
-        """Mark segment as failed"""
+    def _retry_or_fail(self, segment, records, state):
+        """Queue failed lines for a smaller attempt, or record them as failed once retries run out"""
+        depth = state["depth"]
+        if self.retry_queue.can_retry(depth):
+            line_limit = state["line_limit"]
+            if line_limit is None:
+                line_limit = len(json.loads(clean_json(segment)))
+            pieces = self.retry_queue.schedule(records, state["glossary_terms"], depth + 1, line_limit)
+            app_logger.info(f"Retrying {len(records)} failed lines as {pieces} segments (retry {depth + 1}/{self.max_retries})")
+        else:
+            save_json(self.job_store.failures, records, self.writer)
+
+    def _mark_segment_as_failed(self, segment, state, retry=True):
+        """Mark every line of a segment as failed; retry=False skips the retry queue"""
         app_logger.debug(f"Marking segment as failed")
-        
-        # Ensure file exists
-        if not os.path.exists(self.failed_json_path):
-            try:
-                with open(self.failed_json_path, "w", encoding="utf-8") as f:
-                    json.dump([], f)
-                app_logger.debug(f"Created failed segments file")
-            except Exception as e:
-                app_logger.error(f"Error creating failed segments file: {e}")
-                return
 
-        # Update file with locking
         try:
-            with open(self.failed_json_path, "r+", encoding="utf-8") as f:
-                try:
-                    failed_segments = json.load(f)
-                except json.JSONDecodeError:
-                    failed_segments = []
-                    app_logger.warning("Failed segments file was corrupted")
+            clean_segment = clean_json(segment)
+            segment_dict = json.loads(clean_segment)
+        except json.JSONDecodeError as e:
+            app_logger.error(f"Failed to decode JSON segment: {e}")
+            return
 
-                try:
-                    clean_segment = clean_json(segment)
-                    segment_dict = json.loads(clean_segment)
-                except json.JSONDecodeError as e:
-                    app_logger.error(f"Failed to decode JSON segment: {e}")
-                    return
-                    
-                for count_split, value in segment_dict.items():
-                    failed_segments.append({
-                        "count_split": int(count_split), 
-                        "value": value.strip()
-                    })
-                    
-                f.seek(0)
-                f.truncate()
-                json.dump(failed_segments, f, ensure_ascii=False, indent=4)
-                app_logger.debug(f"Saved {len(segment_dict)} items to failed list")
-                
+        try:
+            failed_segments = [
+                {"count_split": int(count_split), "value": value.strip()}
+                for count_split, value in segment_dict.items()
+            ]
+            if retry:
+                self._retry_or_fail(segment, failed_segments, state)
+            else:
+                app_logger.warning(
+                    f"Retry budget spent: {len(failed_segments)} lines left untranslated after connection errors"
+                )
+                save_json(self.job_store.failures, failed_segments, self.writer)
+            app_logger.debug(f"Marked {len(segment_dict)} items as failed")
         except Exception as e:
             app_logger.error(f"Error updating failed segments: {e}")
     
     def process(self, file_name, file_extension, progress_callback=None):
         """Main processing method"""
-        
+        try:
+            return self._process(file_name, file_extension, progress_callback)
+        finally:
+            # A stopped job must not keep the database open, or the next job cannot clear temp
+            self._close_job_store()
+
+    def _process(self, file_name, file_extension, progress_callback):
+        streaming = self._use_streaming_pipeline()
+
+        # Load the local model while the document is extracted
+        if not self.use_online and self.model:
+            warm_up_local_model(self.model, self.output_budget.context_window)
+
         # Continue mode
         if self.continue_mode:
-            app_logger.info("Continue mode: checking existing files...")
+            app_logger.info("Continue mode: checking job store...")
+            job_store = self._open_job_store()
             
-            # Check source JSON
-            if not os.path.exists(self.src_json_path):
-                app_logger.info("Source JSON not found, extracting content...")
-                self.extract_content_to_json(progress_callback)
+            # Check extracted items
+            if not job_store.has_stage(STAGE_EXTRACTED):
+                if not os.path.exists(self.src_json_path):
+                    app_logger.info("Source JSON not found, extracting content...")
+                    self.extract_content_to_json(progress_callback)
+                job_store.import_source_json(self.src_json_path)
             
-            # Check deduped files
-            if not os.path.exists(self.src_deduped_json_path):
-                app_logger.info("Deduped files not found, deduplicating...")
+            # Check deduplication
+            if not job_store.has_stage(STAGE_DEDUPED):
+                app_logger.info("Deduplicated items not found, deduplicating...")
                 self.update_ui_safely(progress_callback, 0, "Preparing deduplicated content...")
-                
-                deduped_data, self.count_src_to_deduped_map = deduplicate_translation_content(self.src_json_path)
-                create_deduped_json_for_translation(deduped_data, self.src_deduped_json_path)
-            else:
-                # Reconstruct mapping
-                deduped_data, self.count_src_to_deduped_map = deduplicate_translation_content(self.src_json_path)
+                deduplicate_translation_content(job_store, self.template_dedup)
             
-            # Check split files
-            if not os.path.exists(self.src_split_json_path):
-                app_logger.info("Split files not found, splitting content...")
+            # Check split items
+            if not job_store.has_stage(STAGE_SPLIT):
+                app_logger.info("Split items not found, splitting content...")
                 self.update_ui_safely(progress_callback, 0, "Splitting content...")
-                split_text_by_token_limit(self.src_deduped_json_path)
-            
-            # Create result file if missing
-            if not os.path.exists(self.result_split_json_path):
-                with open(self.result_split_json_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=4)
+                split_text_by_token_limit(job_store)
             
             # Calculate progress
             try:
-                with open(self.src_split_json_path, 'r', encoding='utf-8') as f:
-                    total_segments = len(json.load(f))
-                with open(self.result_split_json_path, 'r', encoding='utf-8') as f:
-                    completed_segments = len(json.load(f))
+                total_segments = job_store.split_count()
+                completed_segments = job_store.results.count()
                 
                 if total_segments > 0:
                     progress = completed_segments / total_segments
                     self.update_ui_safely(progress_callback, progress, f"Continuing from {progress:.1%}...")
                     app_logger.info(f"Continue mode: {completed_segments}/{total_segments} segments ({progress:.1%})")
-            except Exception as e:
+            except sqlite3.Error as e:
                 app_logger.warning(f"Could not calculate progress: {e}")
         else:
             # Fresh start
             self._clear_temp_folder()
+            self._open_job_store()
 
-            app_logger.info("Extracting content...")
-            self.update_ui_safely(progress_callback, 0, "Extracting text...")
-            self.extract_content_to_json(progress_callback)
+        if streaming:
+            # Extraction, dedup and split run inside translate_content_streaming
+            app_logger.info("Extracting and translating content...")
+        else:
+            if not self.continue_mode:
+                app_logger.info("Extracting content...")
+                self.update_ui_safely(progress_callback, 0, "Extracting text...")
+                self.extract_content_to_json(progress_callback)
+                self.job_store.import_source_json(self.src_json_path)
 
-            app_logger.info("Deduplicating content...")
-            self.update_ui_safely(progress_callback, 0, "Removing duplicates...")
-            deduped_data, self.count_src_to_deduped_map = deduplicate_translation_content(self.src_json_path)
-            create_deduped_json_for_translation(deduped_data, self.src_deduped_json_path)
-            
-            app_logger.info("Splitting content...")
-            self.update_ui_safely(progress_callback, 0, "Splitting text...")
-            split_text_by_token_limit(self.src_deduped_json_path)
+                app_logger.info("Deduplicating content...")
+                self.update_ui_safely(progress_callback, 0, "Removing duplicates...")
+                deduplicate_translation_content(self.job_store, self.template_dedup)
+                
+                app_logger.info("Splitting content...")
+                self.update_ui_safely(progress_callback, 0, "Splitting text...")
+                split_text_by_token_limit(self.job_store)
         
-        # Main translation
-        app_logger.info("Starting translation...")
-        self.update_ui_safely(progress_callback, 0, "Translating content...")
-        self.translate_content(progress_callback)
-
-        # Retry failed translations
-        retry_count = 0
-        while retry_count < self.max_retries and self.translated_failed:
-            is_last_try = (retry_count == self.max_retries - 1)
-            self.translated_failed = self.retranslate_failed_content(
-                retry_count, 
-                self.max_retries, 
-                progress_callback, 
-                last_try=is_last_try
-            )
-            retry_count += 1
+            # Load translation status table
+            self._load_status_table()
+
+        try:
+            # Main translation
+            app_logger.info("Starting translation...")
+            self.update_ui_safely(progress_callback, 0, "Translating content...")
+            # Failed lines are retried in flight, so one pass finishes every retry
+            if streaming:
+                self.translate_content_streaming(progress_callback)
+            else:
+                self.translate_content(progress_callback)
+        finally:
+            # Persist queued results for continue mode
+            self.writer.close()
+            self._close_event_loop()
 
         # Post-processing
         self.update_ui_safely(progress_callback, 0, "Checking results...")
-        missing_counts = check_and_sort_translations(self.src_split_json_path, self.result_split_json_path)
+        missing_counts = check_and_sort_translations(self.job_store)
 
         # Restore to original structure
         self.update_ui_safely(progress_callback, 0, "Restoring structure...")
         app_logger.info("Restoring translations...")
-        restore_translations_from_deduped(
-            self.result_split_json_path,
-            self.count_src_to_deduped_map,
-            self.src_json_path
-        )
+        restore_translations_from_deduped(self.job_store, self.result_json_path)
+        if self.export_job_json:
+            self.job_store.export_json(self.file_dir)
 
         # Write output
         app_logger.info("Writing output...")
@@ -717,4 +942,4 @@ class DocumentTranslator:
         result_folder = "result" 
         base_name = os.path.basename(file_name)
         final_output_path = os.path.join(result_folder, f"{base_name}_translated{file_extension}")
-        return final_output_path, missing_counts
\ No newline at end of file
+        return final_output_path, missing_counts
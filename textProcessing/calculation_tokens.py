@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import time
 import base64
+import pickle
+import hashlib
 from pathlib import Path
+import regex
 import tiktoken
-from typing import Optional
+from typing import Optional, List, Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from config.log_config import app_logger
 import traceback
 
 def get_application_path() -> Path:
@@ -19,15 +27,84 @@ def get_application_path() -> Path:
             current_dir = current_dir.parent
         raise RuntimeError("Could not find project root directory containing models/tiktoken")
 
+# cl100k_base pre-tokenizer pattern; BPE merges never cross its matches
+PAT_STR = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?[\p{L}]+|[\p{N}]|[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+
 # Global cached encoder
 _cached_encoder: Optional[tiktoken.Encoding] = None
+_encoder_lock = Lock()
+
+# Bump when the cache layout changes
+RANKS_CACHE_VERSION = 1
+
+def _ranks_cache_path(encoder_file: Path) -> Path:
+   """Precompiled ranks cache stored next to the .tiktoken file."""
+   return encoder_file.with_name(f"{encoder_file.stem}.ranks.pickle")
+
+def _parse_mergeable_ranks(contents: bytes) -> Dict[bytes, int]:
+   """Decode the base64 BPE ranks file."""
+   return {
+       base64.b64decode(token): int(rank)
+       for token, rank in (line.split() for line in contents.splitlines() if line)
+   }
+
+def _load_ranks_cache(cache_file: Path, source_hash: str) -> Optional[Dict[bytes, int]]:
+   """Load cached ranks if the cache was built from the same source file."""
+   try:
+       with open(cache_file, "rb") as f:
+           cache = pickle.load(f)
+       if cache.get("version") == RANKS_CACHE_VERSION and cache.get("source_hash") == source_hash:
+           return cache["mergeable_ranks"]
+       app_logger.info(f"Tokenizer cache {cache_file.name} is stale, rebuilding")
+   except FileNotFoundError:
+       pass
+   except Exception as e:
+       app_logger.warning(f"Ignoring unreadable tokenizer cache {cache_file}: {e}")
+   return None
+
+def _save_ranks_cache(cache_file: Path, source_hash: str, mergeable_ranks: Dict[bytes, int]) -> None:
+   """Write the ranks cache atomically; a read-only install just skips it."""
+   temp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+   try:
+       with open(temp_file, "wb") as f:
+           pickle.dump({
+               "version": RANKS_CACHE_VERSION,
+               "source_hash": source_hash,
+               "mergeable_ranks": mergeable_ranks
+           }, f, protocol=pickle.HIGHEST_PROTOCOL)
+       os.replace(temp_file, cache_file)
+   except OSError as e:
+       app_logger.debug(f"Could not write tokenizer cache {cache_file}: {e}")
+       try:
+           os.remove(temp_file)
+       except OSError:
+           pass
+
+def load_mergeable_ranks(encoder_file: Path) -> Dict[bytes, int]:
+   """Load BPE ranks from the precompiled cache, rebuilding it when the source file changed."""
+   with open(encoder_file, "rb") as f:
+       contents = f.read()
+   source_hash = hashlib.sha256(contents).hexdigest()
+   cache_file = _ranks_cache_path(encoder_file)
+
+   mergeable_ranks = _load_ranks_cache(cache_file, source_hash)
+   if mergeable_ranks is None:
+       mergeable_ranks = _parse_mergeable_ranks(contents)
+       _save_ranks_cache(cache_file, source_hash, mergeable_ranks)
+   return mergeable_ranks
 
 def get_encoder(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
    """Get encoder with caching and manual loading for PyInstaller compatibility."""
-   global _cached_encoder
-   
    if _cached_encoder is not None:
        return _cached_encoder
+   # Callers arriving during the startup warm-up wait for it instead of loading twice
+   with _encoder_lock:
+       if _cached_encoder is not None:
+           return _cached_encoder
+       return _create_encoder(encoding_name)
+
+def _create_encoder(encoding_name: str) -> tiktoken.Encoding:
+   global _cached_encoder
    
    # Load encoder file manually
    encoder_file = get_application_path() / "models" / "tiktoken" / f"{encoding_name}.tiktoken"
@@ -36,14 +113,7 @@ def get_encoder(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
        raise FileNotFoundError(f"Tiktoken encoder file not found: {encoder_file}")
 
    try:
-       # Read and parse BPE ranks manually
-       with open(encoder_file, "r", encoding="utf-8") as f:
-           contents = f.read()
-       
-       mergeable_ranks = {
-           base64.b64decode(token): int(rank)
-           for token, rank in (line.split() for line in contents.splitlines() if line)
-       }
+       mergeable_ranks = load_mergeable_ranks(encoder_file)
    except Exception as e:
        raise RuntimeError(f"Failed to read and parse BPE file {encoder_file}: {e}")
 
@@ -56,13 +126,11 @@ def get_encoder(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
        "<|endofprompt|>": 100276
    }
    
-   pat_str = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?[\p{L}]+|[\p{N}]|[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
-
    # Create encoder instance
    try:
        _cached_encoder = tiktoken.Encoding(
            name=encoding_name,
-           pat_str=pat_str,
+           pat_str=PAT_STR,
            mergeable_ranks=mergeable_ranks,
            special_tokens=special_tokens
        )
@@ -70,15 +138,150 @@ def get_encoder(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
    except Exception as e:
        raise RuntimeError(f"Failed to create tiktoken.Encoding object: {e}")
 
+def warm_up_encoder(encoding_name: str = "cl100k_base") -> Thread:
+   """Load the encoder in a background thread so the first job does not pay for it."""
+   def warm_up():
+       start_time = time.perf_counter()
+       try:
+           get_encoder(encoding_name)
+           app_logger.debug(f"Tokenizer ready in {time.perf_counter() - start_time:.2f}s")
+       except Exception as e:
+           app_logger.warning(f"Tokenizer warm-up failed: {e}")
+
+   thread = Thread(target=warm_up, name="tokenizer-warm-up", daemon=True)
+   thread.start()
+   return thread
+
+# LRU of token counts, bounded by the characters it holds; segmentation, context
+# trimming and rate limiting count the same strings repeatedly
+TOKEN_CACHE_CHARS = 16 * 1024 * 1024
+# Whole prompts and responses rarely repeat, so long strings are counted but not kept
+MAX_CACHED_TEXT = 4096
+BATCH_THREADS = min(8, os.cpu_count() or 1)
+# Thread start-up only pays off for large batches
+MIN_PARALLEL_BATCH = 256
+
+class TokenCountCache:
+   """Thread-safe LRU map of (encoding, text) -> token count, bounded by total text length."""
+
+   def __init__(self, max_chars: int = TOKEN_CACHE_CHARS, max_text: int = MAX_CACHED_TEXT):
+       self.max_chars = max_chars
+       self.max_text = max_text
+       self.chars = 0
+       self.data: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+       self.lock = Lock()
+       self.hits = 0
+       self.misses = 0
+
+   def get(self, key: Tuple[str, str]) -> Optional[int]:
+       with self.lock:
+           count = self.data.get(key)
+           if count is None:
+               self.misses += 1
+               return None
+           self.data.move_to_end(key)
+           self.hits += 1
+           return count
+
+   def put(self, key: Tuple[str, str], count: int) -> None:
+       if len(key[1]) > self.max_text:
+           return
+       with self.lock:
+           if key not in self.data:
+               self.chars += len(key[1])
+           self.data[key] = count
+           self.data.move_to_end(key)
+           while self.chars > self.max_chars:
+               (_, text), _ = self.data.popitem(last=False)
+               self.chars -= len(text)
+
+   def clear(self) -> None:
+       with self.lock:
+           self.data.clear()
+           self.chars = 0
+           self.hits = 0
+           self.misses = 0
+
+_token_cache = TokenCountCache()
+_pre_tokenizer = regex.compile(PAT_STR)
+
 def num_tokens_from_string(text: str, encoding_name: str = "cl100k_base") -> int:
    """Calculate the number of tokens in text."""
    if not isinstance(text, str):
        text = str(text)
    
-   encoder = get_encoder(encoding_name)
-   token_count = len(encoder.encode(text))
+   key = (encoding_name, text)
+   token_count = _token_cache.get(key)
+   if token_count is None:
+       encoder = get_encoder(encoding_name)
+       token_count = len(encoder.encode(text))
+       _token_cache.put(key, token_count)
    return token_count
 
+def num_tokens_batch(texts: List[str], encoding_name: str = "cl100k_base", num_threads: int = BATCH_THREADS) -> List[int]:
+   """Count tokens for many strings at once; cache misses are encoded in parallel."""
+   texts = [text if isinstance(text, str) else str(text) for text in texts]
+   counts: Dict[str, int] = {}
+   missing = []
+   
+   for text in dict.fromkeys(texts):
+       cached = _token_cache.get((encoding_name, text))
+       if cached is None:
+           missing.append(text)
+       else:
+           counts[text] = cached
+   
+   if missing:
+       encoder = get_encoder(encoding_name)
+       count_chunk = lambda chunk: [len(encoder.encode(text)) for text in chunk]
+       if num_threads > 1 and len(missing) >= MIN_PARALLEL_BATCH:
+           # Like encode_batch, but one contiguous chunk per thread instead of one task
+           # per string, which costs more than encoding a short string
+           chunk_size = -(-len(missing) // num_threads)
+           chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+           with ThreadPoolExecutor(max_workers=num_threads) as executor:
+               lengths = [length for part in executor.map(count_chunk, chunks) for length in part]
+       else:
+           lengths = count_chunk(missing)
+       for text, length in zip(missing, lengths):
+           counts[text] = length
+           _token_cache.put((encoding_name, text), length)
+   
+   return [counts[text] for text in texts]
+
+# Trailing pre-tokens that later text can still merge with or re-split
+UNSTABLE_PIECES = 3
+
+class IncrementalTokenCounter:
+   """
+   Exact token count of a string built by appending pieces.
+
+   Pre-tokens before the last few can no longer change, so their tokens are
+   counted once and only the tail is re-encoded on each append.
+   """
+
+   def __init__(self, encoding_name: str = "cl100k_base"):
+       self.encoder = get_encoder(encoding_name)
+       self.stable_tokens = 0
+       self.tail = ""
+       self.tokens = 0
+
+   def append(self, text: str) -> int:
+       """Append text and return the token count of everything appended so far."""
+       pieces = _pre_tokenizer.findall(self.tail + text)
+       if len(pieces) > UNSTABLE_PIECES:
+           stable = pieces[:-UNSTABLE_PIECES]
+           self.stable_tokens += sum(len(self.encoder.encode_ordinary(piece)) for piece in stable)
+           pieces = pieces[-UNSTABLE_PIECES:]
+       self.tail = "".join(pieces)
+       self.tokens = self.stable_tokens + len(self.encoder.encode_ordinary(self.tail))
+       return self.tokens
+
+   def reset(self) -> None:
+       self.stable_tokens = 0
+       self.tail = ""
+       self.tokens = 0
+
 if __name__ == "__main__":
    try:
        print("--- Tiktoken Loader Test ---")
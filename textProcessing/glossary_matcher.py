@@ -0,0 +1,111 @@
+from collections import deque
+from config.log_config import app_logger
+
+# Transition keys pack (state, character) into one int; code points fit in 21 bits
+CHAR_BITS = 21
+
+class GlossaryMatcher:
+    """
+    Aho-Corasick automaton over the source terms of a glossary.
+
+    Built once per job; find_terms scans a text in O(text length + matches)
+    and keeps leftmost-longest, non-overlapping occurrences, so a term nested
+    inside a longer matched term is not reported.
+    """
+
+    def __init__(self, glossary_entries):
+        # Later entries win for duplicate source terms, as in a dict built from the CSV rows
+        self.terms = {}
+        for src_term, dst_term in glossary_entries:
+            self.terms[src_term] = dst_term
+        self.term_list = list(self.terms.items())
+
+        self.transitions = {}   # (state << CHAR_BITS) | ord(char) -> state
+        self.fail = [0]
+        self.depth = [0]
+        self.term_at = [-1]     # index into term_list ending at the state, or -1
+        self.output_link = [0]  # nearest proper suffix state that ends a term
+        self._build()
+
+    def __len__(self):
+        return len(self.term_list)
+
+    def _build(self):
+        children = [[]]
+        for index, (src_term, _) in enumerate(self.term_list):
+            if not src_term:
+                continue
+            state = 0
+            for char in src_term:
+                key = (state << CHAR_BITS) | ord(char)
+                next_state = self.transitions.get(key)
+                if next_state is None:
+                    next_state = len(self.fail)
+                    self.transitions[key] = next_state
+                    self.fail.append(0)
+                    self.depth.append(self.depth[state] + 1)
+                    self.term_at.append(-1)
+                    self.output_link.append(0)
+                    children.append([])
+                    children[state].append((ord(char), next_state))
+                state = next_state
+            self.term_at[state] = index
+
+        # Breadth-first so every fail target is finished before it is used
+        queue = deque(child for _, child in children[0])
+        while queue:
+            state = queue.popleft()
+            for code, child in children[state]:
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ((fallback << CHAR_BITS) | code) not in self.transitions:
+                    fallback = self.fail[fallback]
+                target = self.transitions.get((fallback << CHAR_BITS) | code, 0)
+                self.fail[child] = target if target != child else 0
+                fail_state = self.fail[child]
+                self.output_link[child] = fail_state if self.term_at[fail_state] >= 0 else self.output_link[fail_state]
+
+    def find_terms(self, text):
+        """Glossary (src, dst) pairs found in text, longest first, each term once"""
+        if not self.term_list or not text:
+            return []
+
+        transitions, fail, depth = self.transitions, self.fail, self.depth
+        term_at, output_link = self.term_at, self.output_link
+        # Longest term starting at each position, as its end state
+        longest = [0] * len(text)
+        state = 0
+        for position, char in enumerate(text):
+            code = ord(char)
+            next_state = transitions.get((state << CHAR_BITS) | code)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = transitions.get((state << CHAR_BITS) | code)
+            state = next_state or 0
+
+            match = state if term_at[state] >= 0 else output_link[state]
+            while match:
+                start = position - depth[match] + 1
+                if depth[match] > depth[longest[start]]:
+                    longest[start] = match
+                match = output_link[match]
+
+        found = set()
+        start = 0
+        while start < len(text):
+            match = longest[start]
+            if match:
+                found.add(term_at[match])
+                start += depth[match]
+            else:
+                start += 1
+
+        return [self.term_list[index] for index in sorted(found, key=lambda index: (-len(self.term_list[index][0]), index))]
+
+def compile_glossary(glossary_entries):
+    """Compile glossary entries into a matcher, or None for an empty glossary"""
+    if not glossary_entries:
+        return None
+    matcher = GlossaryMatcher(glossary_entries)
+    app_logger.info(f"Compiled glossary: {len(matcher)} terms, {len(matcher.fail)} automaton states")
+    return matcher
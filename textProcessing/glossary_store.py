@@ -0,0 +1,129 @@
+import io
+import csv
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from config.log_config import app_logger
+from .glossary_matcher import compile_glossary
+
+GLOSSARY_ENCODINGS = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'gb18030', 'big5', 'latin1', 'shift-jis', 'cp949']
+# Distinct glossary files kept parsed in memory
+GLOSSARY_CACHE_SIZE = 16
+
+class GlossaryTable:
+    """
+    One parsed glossary CSV with every language column indexed.
+
+    The first row holds language codes. Entries and compiled matchers are
+    built lazily per language pair and shared by all jobs.
+    """
+
+    def __init__(self, rows, encoding):
+        self.encoding = encoding
+        self.rows = rows[1:]
+        # Later columns win for duplicate codes, as before
+        self.columns = {code.strip().lower(): index for index, code in enumerate(rows[0])}
+        self.lock = Lock()
+        self.entries_by_pair = {}
+        self.matchers_by_pair = {}
+
+    def entries(self, src_lang, dst_lang):
+        """(source_term, target_term) pairs for a language pair, [] if a column is missing"""
+        pair = (src_lang.strip().lower(), dst_lang.strip().lower())
+        with self.lock:
+            entries = self.entries_by_pair.get(pair)
+            if entries is None:
+                entries = self._build_entries(*pair)
+                self.entries_by_pair[pair] = entries
+            return entries
+
+    def _build_entries(self, src_code, dst_code):
+        src_idx = self.columns.get(src_code)
+        dst_idx = self.columns.get(dst_code)
+        if src_idx is None or dst_idx is None:
+            return []
+
+        entries = []
+        for row in self.rows:
+            if len(row) > max(src_idx, dst_idx):
+                source_term = row[src_idx].strip()
+                target_term = row[dst_idx].strip()
+                if source_term and target_term:
+                    entries.append((source_term, target_term))
+        return entries
+
+    def matcher(self, src_lang, dst_lang):
+        """Compiled GlossaryMatcher for a language pair, or None if it has no entries"""
+        pair = (src_lang.strip().lower(), dst_lang.strip().lower())
+        with self.lock:
+            if pair in self.matchers_by_pair:
+                return self.matchers_by_pair[pair]
+        entries = self.entries(src_lang, dst_lang)
+        matcher = compile_glossary(entries)
+        with self.lock:
+            return self.matchers_by_pair.setdefault(pair, matcher)
+
+def parse_glossary(content):
+    """Decode CSV bytes with the first encoding that works, returning a GlossaryTable or None"""
+    for encoding in GLOSSARY_ENCODINGS:
+        try:
+            text = content.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        if text.startswith("\ufeff"):
+            # BOM: this is utf-8-sig
+            continue
+
+        try:
+            rows = list(csv.reader(io.StringIO(text, newline="")))
+        except csv.Error as e:
+            app_logger.warning(f"Error loading glossary with {encoding}: {e}")
+            continue
+        if rows and rows[0]:
+            return GlossaryTable(rows, encoding)
+    return None
+
+class GlossaryStore:
+    """Parsed glossary CSVs cached by file content hash"""
+
+    def __init__(self, max_entries=GLOSSARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.tables = OrderedDict()  # sha256 -> GlossaryTable or None
+
+    def get(self, glossary_path):
+        """Get the parsed table for a CSV file, or None if it is missing or unreadable"""
+        try:
+            with open(glossary_path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            app_logger.warning(f"Could not read glossary {glossary_path}: {e}")
+            return None
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        with self.lock:
+            if content_hash in self.tables:
+                self.tables.move_to_end(content_hash)
+                return self.tables[content_hash]
+
+        table = parse_glossary(content)
+        if table is None:
+            app_logger.warning(f"Could not parse glossary {glossary_path}")
+        else:
+            app_logger.info(
+                f"Loaded glossary {glossary_path}: {len(table.rows)} rows, "
+                f"languages {', '.join(table.columns)}, encoding {table.encoding}"
+            )
+
+        with self.lock:
+            self.tables[content_hash] = table
+            while len(self.tables) > self.max_entries:
+                self.tables.popitem(last=False)
+        return table
+
+# Process-wide store shared by all jobs
+glossary_store = GlossaryStore()
+
+def get_glossary_table(glossary_path):
+    """Get the cached GlossaryTable for glossary_path, or None"""
+    return glossary_store.get(glossary_path)
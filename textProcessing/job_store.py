@@ -0,0 +1,270 @@
+import os
+import json
+import sqlite3
+from threading import Lock
+from config.log_config import app_logger
+
+JOB_DB_NAME = "job.db"
+
+# Stages recorded once their tables are complete, so continue mode can skip them
+STAGE_EXTRACTED = "extracted"
+STAGE_DEDUPED = "deduped"
+STAGE_SPLIT = "split"
+
+# Debug exports written by JobStore.export_json
+EXPORT_FILES = {
+    "deduped": "src_deduped.json",
+    "split": "src_deduped_split.json",
+    "results": "dst_translated_split.json",
+    "failures": "dst_translated_failed.json",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stages (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS source_items (
+    position INTEGER PRIMARY KEY,
+    count_src,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deduped_items (
+    count_deduped INTEGER PRIMARY KEY,
+    template INTEGER NOT NULL DEFAULT 0,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dedup_map (
+    count_src PRIMARY KEY,
+    count_deduped INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS split_items (
+    count_split INTEGER PRIMARY KEY,
+    count_deduped INTEGER,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_split_items_deduped ON split_items (count_deduped);
+CREATE TABLE IF NOT EXISTS results (
+    count_split INTEGER PRIMARY KEY,
+    original TEXT,
+    translated TEXT
+);
+CREATE TABLE IF NOT EXISTS failures (
+    count_split INTEGER PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _dumps(item):
+    return json.dumps(item, ensure_ascii=False)
+
+class RecordTable:
+    """
+    Records keyed by count_split: translation results or failures.
+    keep_first makes repeated count_splits keep the first record instead of the last.
+    """
+
+    def __init__(self, store, name, columns, keep_first=False):
+        self.store = store
+        self.name = name
+        self.columns = columns
+        self.keep_first = keep_first
+
+    def append(self, records):
+        """Write records in one transaction"""
+        rows = []
+        for record in records:
+            try:
+                rows.append((int(record["count_split"]),) + tuple(record.get(column) for column in self.columns))
+            except (KeyError, ValueError, TypeError):
+                app_logger.warning(f"Skipping {self.name} record without a valid count_split: {record}")
+        if not rows:
+            return
+
+        verb = "INSERT OR IGNORE" if self.keep_first else "INSERT OR REPLACE"
+        placeholders = ", ".join("?" * (len(self.columns) + 1))
+        self.store.executemany(
+            f"{verb} INTO {self.name} (count_split, {', '.join(self.columns)}) VALUES ({placeholders})", rows
+        )
+
+    def load(self):
+        """All records ordered by count_split"""
+        rows = self.store.query(f"SELECT count_split, {', '.join(self.columns)} FROM {self.name} ORDER BY count_split")
+        return [dict(zip(("count_split",) + self.columns, row)) for row in rows]
+
+    def count(self):
+        return self.store.query(f"SELECT COUNT(*) FROM {self.name}")[0][0]
+
+    def clear(self):
+        self.store.execute(f"DELETE FROM {self.name}")
+
+class JobStore:
+    """
+    Per-job SQLite database holding every intermediate of a translation job:
+    extracted items, the dedup map, split chunks, results and failures.
+
+    One connection is shared by the job's threads behind a lock; each write
+    is its own transaction, so a crash never leaves a half-written stage.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=1000")
+        # Results are the job's progress; keep them across power loss like the old fsynced journal
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self.results = RecordTable(self, "results", ("original", "translated"))
+        self.failures = RecordTable(self, "failures", ("value",), keep_first=True)
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            with self.conn:
+                self.conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(sql, rows)
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def has_stage(self, name):
+        return bool(self.query("SELECT 1 FROM stages WHERE name = ?", (name,)))
+
+    def mark_stage(self, name):
+        self.execute("INSERT OR IGNORE INTO stages (name) VALUES (?)", (name,))
+
+    # Extracted items
+
+    def save_source_items(self, items):
+        """Replace the extracted items and mark extraction complete"""
+        rows = [
+            (position, item.get("count_src", item.get("count")) if isinstance(item, dict) else None, _dumps(item))
+            for position, item in enumerate(items)
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM source_items")
+                self.conn.executemany("INSERT INTO source_items (position, count_src, item) VALUES (?, ?, ?)", rows)
+                self.conn.execute("INSERT OR IGNORE INTO stages (name) VALUES (?)", (STAGE_EXTRACTED,))
+
+    def import_source_json(self, src_json_path):
+        """Load an extractor's src.json into the store"""
+        with open(src_json_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        self.save_source_items(items)
+        return items
+
+    def load_source_items(self):
+        return [json.loads(row[0]) for row in self.query("SELECT item FROM source_items ORDER BY position")]
+
+    # Deduplication
+
+    def save_deduped(self, deduped_data, count_src_to_deduped_map):
+        """Replace the deduplicated items and count_src -> count_deduped map"""
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM deduped_items")
+                self.conn.execute("DELETE FROM dedup_map")
+                self.conn.executemany(
+                    "INSERT INTO deduped_items (count_deduped, template, item) VALUES (?, ?, ?)",
+                    [(item["count_deduped"], int(bool(item.get("template"))), _dumps(item)) for item in deduped_data]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO dedup_map (count_src, count_deduped) VALUES (?, ?)",
+                    list(count_src_to_deduped_map.items())
+                )
+                self.conn.execute("INSERT OR IGNORE INTO stages (name) VALUES (?)", (STAGE_DEDUPED,))
+
+    def load_deduped_items(self):
+        return [json.loads(row[0]) for row in self.query("SELECT item FROM deduped_items ORDER BY count_deduped")]
+
+    def load_dedup_map(self):
+        return dict(self.query("SELECT count_src, count_deduped FROM dedup_map"))
+
+    def template_deduped(self):
+        """count_deduped values sent as placeholder templates"""
+        return {row[0] for row in self.query("SELECT count_deduped FROM deduped_items WHERE template = 1")}
+
+    # Split chunks
+
+    def add_split_items(self, items):
+        """Append split items (streaming extraction adds them in batches)"""
+        self.executemany(
+            "INSERT OR REPLACE INTO split_items (count_split, count_deduped, item) VALUES (?, ?, ?)",
+            [(int(item["count_split"]), item.get("count_deduped"), _dumps(item)) for item in items]
+        )
+
+    def save_split_items(self, items):
+        """Replace the split items and mark splitting complete"""
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM split_items")
+                self.conn.executemany(
+                    "INSERT INTO split_items (count_split, count_deduped, item) VALUES (?, ?, ?)",
+                    [(int(item["count_split"]), item.get("count_deduped"), _dumps(item)) for item in items]
+                )
+                self.conn.execute("INSERT OR IGNORE INTO stages (name) VALUES (?)", (STAGE_SPLIT,))
+
+    def load_split_items(self):
+        """Split items with translated_status taken from the results table"""
+        rows = self.query(
+            "SELECT s.item, r.count_split IS NOT NULL FROM split_items s "
+            "LEFT JOIN results r ON r.count_split = s.count_split ORDER BY s.count_split"
+        )
+        items = []
+        for item_json, translated in rows:
+            item = json.loads(item_json)
+            item["translated_status"] = bool(translated)
+            items.append(item)
+        return items
+
+    def split_count(self):
+        return self.query("SELECT COUNT(*) FROM split_items")[0][0]
+
+    def untranslated_split_items(self):
+        """(count_split, value) of split items without a result"""
+        rows = self.query(
+            "SELECT s.count_split, s.item FROM split_items s "
+            "LEFT JOIN results r ON r.count_split = s.count_split "
+            "WHERE r.count_split IS NULL ORDER BY s.count_split"
+        )
+        return [(count_split, json.loads(item_json).get("value", "")) for count_split, item_json in rows]
+
+    def translations_by_deduped(self):
+        """count_deduped -> translated chunks in count_split order"""
+        translations = {}
+        rows = self.query(
+            "SELECT s.count_deduped, r.translated FROM split_items s "
+            "JOIN results r ON r.count_split = s.count_split "
+            "WHERE s.count_deduped IS NOT NULL AND r.translated != '' ORDER BY s.count_split"
+        )
+        for count_deduped, translated in rows:
+            translations.setdefault(count_deduped, []).append(translated)
+        return translations
+
+    def export_json(self, file_dir):
+        """Write the tables as the pretty-printed JSON files of earlier versions, for debugging"""
+        exports = {
+            "deduped": self.load_deduped_items(),
+            "split": self.load_split_items(),
+            "results": self.results.load(),
+            "failures": self.failures.load(),
+        }
+        for name, data in exports.items():
+            with open(os.path.join(file_dir, EXPORT_FILES[name]), "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+        app_logger.info(f"Exported job tables to {file_dir}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,114 @@
+import queue
+import threading
+from config.log_config import app_logger
+
+
+class ResultWriter:
+    """
+    Dedicated writer thread for translation results.
+
+    Worker threads enqueue job store appends and other callbacks and return
+    immediately. Consecutive appends to the same table are batched into a
+    single transaction.
+    """
+
+    def __init__(self, name="result-writer"):
+        self.name = name
+        self.queue = queue.Queue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.start_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+
+    def append(self, table, records):
+        """Queue records for a job store table"""
+        if not records:
+            return
+        self._ensure_started()
+        self.queue.put(("append", table, list(records)))
+
+    def call(self, func, *args):
+        """Queue a callable to run on the writer thread"""
+        self._ensure_started()
+        self.queue.put(("call", func, args))
+
+    def flush(self):
+        """Block until every queued write has been persisted"""
+        if self.thread is None:
+            return
+        self.queue.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            batch = [task]
+
+            # Drain whatever else is waiting
+            while task is not None:
+                try:
+                    task = self.queue.get_nowait()
+                    batch.append(task)
+                except queue.Empty:
+                    break
+
+            stop = self._process_batch(batch)
+
+            for _ in batch:
+                self.queue.task_done()
+
+            if stop:
+                return
+
+    def _process_batch(self, batch):
+        """Write a batch in order, merging consecutive appends per table"""
+        pending_table = None
+        pending_records = []
+        stop = False
+
+        def write_pending():
+            if pending_table is None:
+                return
+            try:
+                pending_table.append(pending_records)
+            except Exception as e:
+                app_logger.error(f"Error writing results to {pending_table.name}: {e}")
+
+        for task in batch:
+            if task is None:
+                stop = True
+                continue
+
+            if task[0] == "append":
+                _, table, records = task
+                if table is not pending_table:
+                    write_pending()
+                    pending_table = table
+                    pending_records = []
+                pending_records.extend(records)
+            else:
+                write_pending()
+                pending_table = None
+                pending_records = []
+
+                _, func, args = task
+                try:
+                    func(*args)
+                except Exception as e:
+                    app_logger.error(f"Error in result writer: {e}")
+
+        write_pending()
+        return stop
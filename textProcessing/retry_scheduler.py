@@ -0,0 +1,157 @@
+import heapq
+import math
+import random
+import time
+from itertools import count
+from threading import Lock
+from .calculation_tokens import num_tokens_from_string
+from .text_separator import create_segment_output
+
+# Backoff before a retry at depth d: 2**(d-1) * base, half of it jittered, capped
+RETRY_BASE_DELAY = 0.5  # seconds
+RETRY_MAX_DELAY = 30.0  # seconds
+
+def retry_delay(depth, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Exponential backoff with equal jitter, so failures of one burst do not retry in lockstep"""
+    delay = min(max_delay, base_delay * 2 ** max(depth - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def retry_line_limit(line_limit, depth, max_depth):
+    """Lines per retried piece: half the failing segment's limit, one line on the last try"""
+    if depth >= max_depth:
+        return 1
+    return max(1, math.ceil(line_limit / 2))
+
+def split_for_retry(lines, line_limit):
+    """Split failed lines into as few pieces of at most line_limit lines as possible, evenly sized"""
+    piece_count = math.ceil(len(lines) / line_limit)
+    size, extra = divmod(len(lines), piece_count)
+    pieces = []
+    start = 0
+    for index in range(piece_count):
+        end = start + size + (1 if index < extra else 0)
+        pieces.append(lines[start:end])
+        start = end
+    return pieces
+
+class RetryPiece:
+    """Failed lines to be sent again as one segment"""
+
+    def __init__(self, lines, depth, line_limit, glossary_terms, tokens):
+        self.lines = lines  # [(count_split, value)] in count_split order
+        self.depth = depth
+        self.line_limit = line_limit
+        self.glossary_terms = glossary_terms
+        self.tokens = tokens
+
+    def can_merge(self, other, token_budget):
+        return (
+            self.depth == other.depth
+            and len(self.lines) + len(other.lines) <= min(self.line_limit, other.line_limit)
+            and (token_budget is None or self.tokens + other.tokens <= token_budget)
+        )
+
+    def merge(self, other):
+        self.lines = sorted(self.lines + other.lines)
+        self.line_limit = min(self.line_limit, other.line_limit)
+        self.glossary_terms = list(dict.fromkeys(self.glossary_terms + other.glossary_terms))
+        self.tokens += other.tokens
+
+    def segment_data(self):
+        """(segment, progress, glossary_terms) tuple, as built by SegmentBuilder"""
+        segment_dict = {str(count_split): value for count_split, value in self.lines}
+        # Keep only the glossary terms that still occur in this piece
+        terms = [term for term in self.glossary_terms if any(term[0] in value for value in segment_dict.values())]
+        return (create_segment_output(segment_dict), 0, terms)
+
+class RetryQueue:
+    """
+    Failed lines waiting to be re-submitted while the rest of the job is still running.
+
+    Workers call schedule() with the records that failed validation; the dispatch
+    loop takes pieces whose backoff has elapsed from pop_ready(). Each retry halves
+    the line limit of the segment that failed, so a whole failing segment is tried
+    as halves, then quarters, and single lines only on the last try. A piece that
+    comes due takes along queued pieces of the same depth while they fit, so lines
+    failing in different segments still share requests. Safe to use from worker threads.
+    """
+
+    def __init__(self, max_depth, token_budget=None):
+        self.max_depth = max_depth
+        self.token_budget = token_budget
+        self.lock = Lock()
+        self.heap = []  # (ready_at, sequence, RetryPiece)
+        self.sequence = count()
+        # Retry segments handed out so far, for progress totals
+        self.scheduled = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def clear(self):
+        with self.lock:
+            self.heap.clear()
+            self.scheduled = 0
+
+    def can_retry(self, depth):
+        """True if lines that failed at this depth get another attempt"""
+        return depth < self.max_depth
+
+    def is_last_try(self, depth):
+        """The final attempt accepts any non-empty translation"""
+        return 0 < self.max_depth <= depth
+
+    def schedule(self, records, glossary_terms, depth, line_limit):
+        """
+        Queue failed records ({"count_split", "value"}) of a segment with line_limit
+        lines for an attempt at depth. Returns the number of pieces queued.
+        """
+        lines = sorted(
+            {int(record["count_split"]): record["value"] for record in records}.items()
+        )
+        if not lines:
+            return 0
+        line_limit = retry_line_limit(line_limit, depth, self.max_depth)
+        pieces = [
+            RetryPiece(piece_lines, depth, line_limit, list(glossary_terms or []),
+                       sum(num_tokens_from_string(value) for _, value in piece_lines))
+            for piece_lines in split_for_retry(lines, line_limit)
+        ]
+        ready_at = time.monotonic() + retry_delay(depth)
+
+        with self.lock:
+            for piece in pieces:
+                heapq.heappush(self.heap, (ready_at, next(self.sequence), piece))
+        return len(pieces)
+
+    def pop_ready(self):
+        """(segment_data, depth, line_limit) of pieces whose backoff has elapsed, filled up with queued pieces"""
+        if not self.heap:
+            return []
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                piece = heapq.heappop(self.heap)[2]
+                # Waiting pieces go out early rather than as separate requests later
+                kept = []
+                for entry in self.heap:
+                    if piece.can_merge(entry[2], self.token_budget):
+                        piece.merge(entry[2])
+                    else:
+                        kept.append(entry)
+                if len(kept) < len(self.heap):
+                    heapq.heapify(kept)
+                    self.heap = kept
+                ready.append(piece)
+            self.scheduled += len(ready)
+        return [(piece.segment_data(), piece.depth, piece.line_limit) for piece in ready]
+
+    def next_delay(self):
+        """Seconds until the next queued piece is due, or None if the queue is empty"""
+        if not self.heap:
+            return None
+        with self.lock:
+            if not self.heap:
+                return None
+            return max(0.0, self.heap[0][0] - time.monotonic())
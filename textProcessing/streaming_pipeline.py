@@ -0,0 +1,156 @@
+import queue
+from threading import Thread, Event
+from config.log_config import app_logger
+from .calculation_tokens import num_tokens_from_string
+from .text_separator import ContentDeduplicator, split_item
+
+# Split items handed to on_split_items at a time, so translation memory is queried in batches
+STAGE_BATCH_SIZE = 32
+
+_END_OF_STREAM = object()
+
+class ExtractionAborted(Exception):
+    """Raised inside the extractor once the consumer has stopped listening"""
+
+class StreamingItemList(list):
+    """List that hands every appended item to a callback, so extractors can stream unchanged"""
+
+    def __init__(self, on_item):
+        super().__init__()
+        self.on_item = on_item
+
+    def append(self, item):
+        super().append(item)
+        self.on_item(item)
+
+class SegmentBatch:
+    """Segments known up front, behind the same get_segments interface as ExtractionStream"""
+
+    def __init__(self, segments):
+        self.segments = list(segments)
+        self.segment_count = len(self.segments)
+        self.finished = False
+
+    def get_segments(self, timeout=0):
+        if self.finished:
+            return [], True
+        self.finished = True
+        segments, self.segments = self.segments, []
+        return segments, True
+
+class ExtractionStream:
+    """
+    Runs extraction on a worker thread and pushes each item through
+    dedup -> split -> on_split_items -> segmenting as soon as it is extracted.
+
+    extract(on_item) must call on_item for every extracted item, in document order.
+    on_split_items(items) receives new split items and returns those that still
+    need translating. on_finished(source_items, deduplicator) runs on the worker
+    thread after extraction, before the stream reports that it has finished.
+    """
+
+    def __init__(self, extract, segment_builder, on_split_items, on_finished=None, max_split_tokens=256):
+        self.extract = extract
+        self.segment_builder = segment_builder
+        self.on_split_items = on_split_items
+        self.on_finished = on_finished
+        self.max_split_tokens = max_split_tokens
+
+        self.source_items = []
+        self.deduplicator = ContentDeduplicator()
+        self.next_count_split = 1
+        self.pending_split_items = []
+        self.extracted_count = 0
+        self.segment_count = 0
+
+        self.segments = queue.Queue()
+        self.aborted = Event()
+        self.error = None
+        self.finished = False
+        self.thread = Thread(target=self._run, name="extraction-stream", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop the extractor at its next item; safe to call after it finished"""
+        self.aborted.set()
+
+    def _run(self):
+        try:
+            self.extract(self._on_item)
+            self._flush_split_items()
+            self._put_segments(self.segment_builder.finish())
+            _, fill = self.segment_builder.fill_stats()
+            app_logger.info(
+                f"Streaming extraction: {self.extracted_count} items -> {len(self.deduplicator.deduped_data)} unique "
+                f"-> {self.next_count_split - 1} split items -> {self.segment_count} segments ({fill:.0%} average fill)"
+            )
+            if self.on_finished:
+                self.on_finished(self.source_items, self.deduplicator)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.segments.put(_END_OF_STREAM)
+
+    def _on_item(self, item):
+        if self.aborted.is_set():
+            raise ExtractionAborted("Translation stopped during extraction")
+        self.extracted_count += 1
+        self.source_items.append(item)
+
+        deduped_item = self.deduplicator.add(item)
+        if deduped_item is None:
+            return
+
+        value = deduped_item.get("value", "")
+        tokens = num_tokens_from_string(value) if value else 0
+        item_index = len(self.deduplicator.deduped_data) - 1
+        split_items = split_item(deduped_item, item_index, tokens, self.max_split_tokens, self.next_count_split)
+        self.next_count_split += len(split_items)
+
+        self.pending_split_items.extend(split_items)
+        if len(self.pending_split_items) >= STAGE_BATCH_SIZE:
+            self._flush_split_items()
+
+    def _flush_split_items(self):
+        if not self.pending_split_items:
+            return
+        split_items, self.pending_split_items = self.pending_split_items, []
+
+        for item in self.on_split_items(split_items):
+            value = item.get("value", "").strip()
+            if value:
+                self._put_segments(self.segment_builder.add(item["count_split"], value))
+
+    def _put_segments(self, segments):
+        for segment in segments:
+            self.segment_count += 1
+            self.segments.put(segment)
+
+    def get_segments(self, timeout=0):
+        """
+        Wait up to timeout seconds for segments and return (segments, finished).
+        Once the stream finishes, an extraction error is raised here.
+        """
+        if self.finished:
+            return [], True
+
+        segments = []
+        try:
+            segment = self.segments.get(timeout=timeout) if timeout else self.segments.get_nowait()
+            while True:
+                if segment is _END_OF_STREAM:
+                    self.finished = True
+                    break
+                segments.append(segment)
+                segment = self.segments.get_nowait()
+        except queue.Empty:
+            pass
+
+        if self.finished:
+            self.thread.join()
+            if self.error is not None:
+                raise self.error
+        return segments, self.finished
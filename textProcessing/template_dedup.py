@@ -0,0 +1,63 @@
+import re
+from collections import Counter, defaultdict
+
+# Non-translatable tokens, most specific first
+MASKED_TOKEN_PATTERN = re.compile(
+    r"https?://[^\s\"'<>]*[^\s\"'<>.,;:!?)]"                    # URLs
+    r"|[\w.+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+"               # e-mail addresses
+    r"|(?<![A-Za-z0-9])(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}"          # dates: 2024-05-01, 01/05/2024
+    r"|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})(?![A-Za-z0-9])"
+    r"|(?<![A-Za-z0-9:])\d{1,2}:\d{2}(?::\d{2})?(?![A-Za-z0-9:])"  # times
+    r"|(?<![A-Za-z0-9_-])[A-Z]{1,6}[-_/]?\d[A-Za-z0-9_/-]*"       # codes: INV-10023, SKU42, A1
+    r"|(?<![A-Za-z0-9_.,-])[-+]?\d+(?:[.,]\d+)*%?(?![A-Za-z0-9_])"  # numbers: 10023, 1,234.56, 15%
+)
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\d+)\}\}")
+
+def extract_template(text):
+    """
+    Replace non-translatable tokens with {{1}}, {{2}}, ...
+
+    Returns (template, tokens), or None if nothing was masked, nothing
+    translatable is left, or the text already contains placeholder syntax.
+    """
+    if not isinstance(text, str) or "{{" in text:
+        return None
+
+    tokens = []
+
+    def mask(match):
+        tokens.append(match.group())
+        return f"{{{{{len(tokens)}}}}}"
+
+    template = MASKED_TOKEN_PATTERN.sub(mask, text)
+    if not tokens or not any(char.isalpha() for char in PLACEHOLDER_PATTERN.sub("", template)):
+        return None
+    return template, tokens
+
+def find_shared_templates(values):
+    """Map each value to its template when two or more distinct values share that template"""
+    values_by_template = defaultdict(set)
+    for value in values:
+        extracted = extract_template(value)
+        if extracted:
+            values_by_template[extracted[0]].add(value)
+
+    return {
+        value: template
+        for template, template_values in values_by_template.items()
+        if len(template_values) > 1
+        for value in template_values
+    }
+
+def placeholders_preserved(original, translated):
+    """True if the translation keeps every placeholder of the original, each as often"""
+    original_placeholders = Counter(PLACEHOLDER_PATTERN.findall(original))
+    if not original_placeholders:
+        return True
+    return original_placeholders == Counter(PLACEHOLDER_PATTERN.findall(translated))
+
+def fill_template(translated_template, tokens):
+    """Put the original tokens back into a translated template; None if placeholders were lost"""
+    if Counter(PLACEHOLDER_PATTERN.findall(translated_template)) != Counter(str(index) for index in range(1, len(tokens) + 1)):
+        return None
+    return PLACEHOLDER_PATTERN.sub(lambda match: tokens[int(match.group(1)) - 1], translated_template)
@@ -4,8 +4,9 @@ import copy
 import os
 import re
 import shutil
-import csv
-from .calculation_tokens import num_tokens_from_string
+from .calculation_tokens import num_tokens_from_string, num_tokens_batch, IncrementalTokenCounter
+from .glossary_store import get_glossary_table
+from .template_dedup import find_shared_templates, extract_template, fill_template
 from config.log_config import app_logger
 
 def safe_convert_to_int(value):
@@ -76,52 +77,16 @@ def safe_convert_to_int(value):
     return 0
 
 def load_glossary(glossary_path, src_lang, dst_lang):
-    """Load glossary from CSV file with multiple encodings"""
-    encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'gb18030', 'big5', 'latin1', 'shift-jis', 'cp949']
-    
-    for encoding in encodings:
-        try:
-            with open(glossary_path, 'r', encoding=encoding) as csv_file:
-                csv_reader = csv.reader(csv_file)
-                
-                # First row contains language codes
-                lang_codes = next(csv_reader, None)
-                if not lang_codes:
-                    continue
-                    
-                # Find column indices
-                src_idx = None
-                dst_idx = None
-                
-                for i, code in enumerate(lang_codes):
-                    if code.strip().lower() == src_lang.strip().lower():
-                        src_idx = i
-                    if code.strip().lower() == dst_lang.strip().lower():
-                        dst_idx = i
-                
-                if src_idx is None or dst_idx is None:
-                    continue
-                
-                # Read entries
-                entries = []
-                for row in csv_reader:
-                    if len(row) > max(src_idx, dst_idx):
-                        source_term = row[src_idx].strip()
-                        target_term = row[dst_idx].strip()
-                        
-                        if source_term and target_term:
-                            entries.append((source_term, target_term))
-                
-                if entries:
-                    return entries
-                
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            app_logger.warning(f"Error loading glossary with {encoding}: {e}")
-            continue
-    
-    return []
+    """Load (source, target) glossary entries for a language pair from the shared glossary store"""
+    table = get_glossary_table(glossary_path)
+    return list(table.entries(src_lang, dst_lang)) if table else []
+
+def load_glossary_matcher(glossary_path, src_lang, dst_lang):
+    """Get the shared compiled matcher for a glossary CSV and language pair, or None"""
+    if not (src_lang and dst_lang and glossary_path and os.path.exists(glossary_path)):
+        return None
+    table = get_glossary_table(glossary_path)
+    return table.matcher(src_lang, dst_lang) if table else None
 
 def format_glossary_for_prompt(glossary_entries, text):
     """Format glossary entries for prompt"""
@@ -140,58 +105,8 @@ def format_glossary_for_prompt(glossary_entries, text):
     formatted_glossary = "Glossary:\n" + "\n".join(glossary_lines)
     return formatted_glossary
 
-def find_terms_with_hashtable(text, glossary_entries):
-    """Find glossary terms in text using hash table"""
-    term_dict = {src: dst for src, dst in glossary_entries}
-    found_terms = set()
-    results = []
-    
-    # Sort by length (longest first)
-    sorted_terms = sorted(term_dict.keys(), key=len, reverse=True)
-    
-    for term in sorted_terms:
-        if term in text and term not in found_terms:
-            found_terms.add(term)
-            results.append((term, term_dict[term]))
-    
-    return results
-
-def stream_segment_json(json_file_path, max_token, system_prompt, user_prompt, previous_prompt, src_lang=None, dst_lang=None, glossary_path=None, continue_mode=False):
-    """Process JSON in segments"""
-    # Load glossary
-    glossary_entries = []
-    if src_lang and dst_lang and glossary_path and os.path.exists(glossary_path):
-        glossary_entries = load_glossary(glossary_path, src_lang, dst_lang)
-    
-    # Handle file path
-    if continue_mode and not os.path.exists(json_file_path):
-        raise FileNotFoundError(f"Source file not found: {json_file_path}")
-    
-    # Create working copy
-    file_dir = os.path.dirname(json_file_path)
-    file_name = os.path.basename(json_file_path)
-    base_name, ext = os.path.splitext(file_name)
-    working_copy_path = os.path.join(file_dir, f"{base_name}_translating{ext}")
-    
-    if not os.path.exists(working_copy_path):
-        if os.path.exists(json_file_path):
-            shutil.copy2(json_file_path, working_copy_path)
-        else:
-            raise FileNotFoundError(f"Source file not found: {json_file_path}")
-    
-    # Load data
-    with open(working_copy_path, "r", encoding="utf-8") as json_file:
-        cell_data = json.load(json_file)
-
-    if not cell_data:
-        if os.path.exists(working_copy_path):
-            os.remove(working_copy_path)
-        raise ValueError("Empty data")
-
-    # Calculate max count_split for progress
-    max_count_split = max((safe_convert_to_int(cell.get("count_split", cell.get("count", 0))) for cell in cell_data), default=0)
-    
-    # Calculate token limits
+def segment_token_budget(max_token, system_prompt, user_prompt, previous_prompt):
+    """Tokens left for segment text once the prompts are counted"""
     prompt_base_token_count = sum(
         num_tokens_from_string(json.dumps(prompt, ensure_ascii=False))
         for prompt in [system_prompt, user_prompt, previous_prompt]
@@ -202,87 +117,222 @@ def stream_segment_json(json_file_path, max_token, system_prompt, user_prompt, p
     
     if segment_available_tokens <= 0:
         segment_available_tokens = max(100, max_token // 2)
-    
-    # Pre-segment all data
-    all_segments = []
-    current_segment_dict = {}
-    current_token_count = 0
-    current_glossary_terms = []
-    
-    for i, cell in enumerate(cell_data):
-        count_split = cell.get("count_split", cell.get("count"))
-        value = cell.get("value", "").strip()
-        
-        # Skip translated content in continue mode
-        if continue_mode and cell.get("translated_status", False):
-            continue
-            
-        if count_split is None or not value:
-            continue
-        
-        # Create line entry
+    return segment_available_tokens
+
+# Segment planners selectable with the "segment_planner" config key
+PLANNER_GREEDY = "greedy"
+PLANNER_BIN_PACKING = "bin_packing"
+# Segments' worth of consecutive lines the bin-packing planner may reorder at once
+PACKING_WINDOW_SEGMENTS = 16
+
+class SegmentBuilder:
+    """
+    Packs lines into segments up to a token budget, one line at a time.
+    add() and finish() return the (segment, progress, glossary_terms) tuples that are complete.
+    """
+
+    def __init__(self, segment_available_tokens, max_count_split=0, glossary_matcher=None):
+        self.segment_available_tokens = segment_available_tokens
+        self.max_count_split = max_count_split
+        self.glossary_matcher = glossary_matcher
+        self.current_segment_dict = {}
+        self.current_token_count = 0
+        # Ordered set of (src, dst) pairs for the segment being built
+        self.current_glossary_terms = {}
+        # Tokens of every segment returned so far, for fill statistics
+        self.segment_tokens = []
+
+    def _segment(self, segment_dict, glossary_terms, tokens):
+        self.segment_tokens.append(tokens)
+        progress = calculate_progress(segment_dict, self.max_count_split)
+        return (create_segment_output(segment_dict), progress, list(glossary_terms))
+
+    def fill_stats(self):
+        """(segment count, average share of the token budget used)"""
+        if not self.segment_tokens:
+            return 0, 0.0
+        average = sum(self.segment_tokens) / len(self.segment_tokens)
+        return len(self.segment_tokens), average / self.segment_available_tokens
+
+    def add(self, count_split, value, line_tokens=None):
+        """Add a stripped, non-empty line"""
+        segments = []
         line_dict = {str(count_split): value}
-        line_json = json.dumps(line_dict, ensure_ascii=False)
-        line_tokens = num_tokens_from_string(line_json)
+        if line_tokens is None:
+            line_tokens = num_tokens_from_string(json.dumps(line_dict, ensure_ascii=False))
         
         # Find glossary terms
-        segment_glossary_terms = []
-        if glossary_entries:
-            found_terms = find_terms_with_hashtable(value, glossary_entries)
-            segment_glossary_terms = found_terms
+        segment_glossary_terms = self.glossary_matcher.find_terms(value) if self.glossary_matcher else []
         
         # Handle single line exceeding limit
-        if line_tokens > segment_available_tokens:
-            if current_segment_dict:
-                progress = calculate_progress(current_segment_dict, max_count_split)
-                segment_output = create_segment_output(current_segment_dict)
-                all_segments.append((segment_output, progress, current_glossary_terms))
-                
-                current_segment_dict = {}
-                current_token_count = 0
-                current_glossary_terms = []
+        if line_tokens > self.segment_available_tokens:
+            if self.current_segment_dict:
+                segments.append(self._segment(self.current_segment_dict, self.current_glossary_terms, self.current_token_count))
+                self.current_segment_dict = {}
+                self.current_token_count = 0
+                self.current_glossary_terms = {}
             
             # Split large text
-            chunks = split_by_sentences_and_combine(value, segment_available_tokens)
+            chunks = split_by_sentences_and_combine(value, self.segment_available_tokens)
             
             for chunk in chunks:
                 chunk_dict = {str(count_split): chunk}
                 chunk_json = json.dumps(chunk_dict, ensure_ascii=False)
                 chunk_tokens = num_tokens_from_string(chunk_json)
                 
-                if chunk_tokens <= segment_available_tokens:
-                    segment_dict = chunk_dict
-                    progress = calculate_progress(segment_dict, max_count_split)
-                    segment_output = create_segment_output(segment_dict)
-                    all_segments.append((segment_output, progress, segment_glossary_terms))
+                if chunk_tokens <= self.segment_available_tokens:
+                    segments.append(self._segment(chunk_dict, segment_glossary_terms, chunk_tokens))
         
         # Check if adding line exceeds limit
-        elif current_token_count + line_tokens > segment_available_tokens:
-            progress = calculate_progress(current_segment_dict, max_count_split)
-            segment_output = create_segment_output(current_segment_dict)
-            all_segments.append((segment_output, progress, current_glossary_terms))
-            
-            current_segment_dict = line_dict
-            current_token_count = line_tokens
-            current_glossary_terms = segment_glossary_terms
+        elif self.current_token_count + line_tokens > self.segment_available_tokens:
+            segments.append(self._segment(self.current_segment_dict, self.current_glossary_terms, self.current_token_count))
+            self.current_segment_dict = line_dict
+            self.current_token_count = line_tokens
+            self.current_glossary_terms = dict.fromkeys(segment_glossary_terms)
         else:
-            current_segment_dict.update(line_dict)
-            current_token_count += line_tokens
-            current_glossary_terms.extend([term for term in segment_glossary_terms 
-                                         if term not in current_glossary_terms])
-    
-    # Add last segment
-    if current_segment_dict:
-        progress = calculate_progress(current_segment_dict, max_count_split)
-        segment_output = create_segment_output(current_segment_dict)
-        all_segments.append((segment_output, progress, current_glossary_terms))
-    
-    # Clean up
-    try:
-        if os.path.exists(working_copy_path):
-            os.remove(working_copy_path)
-    except Exception as e:
-        app_logger.warning(f"Warning: Could not remove working copy: {e}")
+            self.current_segment_dict.update(line_dict)
+            self.current_token_count += line_tokens
+            self.current_glossary_terms.update(dict.fromkeys(segment_glossary_terms))
+        return segments
+
+    def finish(self):
+        """Return the last, partly filled segment"""
+        if not self.current_segment_dict:
+            return []
+        segment = self._segment(self.current_segment_dict, self.current_glossary_terms, self.current_token_count)
+        self.current_segment_dict = {}
+        self.current_token_count = 0
+        self.current_glossary_terms = {}
+        return [segment]
+
+class BinPackingSegmentBuilder(SegmentBuilder):
+    """
+    Packs lines first-fit-decreasing within windows of consecutive lines, so segments
+    fill the token budget evenly while each line stays among its neighbours.
+    Segments come out in document order of their first line, with lines in document order.
+    """
+
+    def __init__(self, segment_available_tokens, max_count_split=0, glossary_matcher=None, window_segments=PACKING_WINDOW_SEGMENTS):
+        super().__init__(segment_available_tokens, max_count_split, glossary_matcher)
+        self.window_tokens = segment_available_tokens * window_segments
+        self.window = []  # (count_split, value, tokens, carried)
+        self.window_token_count = 0
+
+    def add(self, count_split, value, line_tokens=None):
+        """Add a stripped, non-empty line"""
+        if line_tokens is None:
+            line_tokens = num_tokens_from_string(json.dumps({str(count_split): value}, ensure_ascii=False))
+
+        # Lines over the budget are split into their own segments, as by the greedy planner,
+        # after the lines before them so segments stay in document order
+        if line_tokens > self.segment_available_tokens:
+            return self._pack_window(final=True) + super().add(count_split, value, line_tokens)
+
+        self.window.append((count_split, value, line_tokens, False))
+        self.window_token_count += line_tokens
+        if self.window_token_count >= self.window_tokens:
+            return self._pack_window()
+        return []
+
+    def finish(self):
+        """Pack the lines of the last window"""
+        return self._pack_window(final=True)
+
+    def _pack_window(self, final=False):
+        # First fit decreasing; the stable sort keeps document order among equal sizes
+        bins = []  # [tokens, lines]
+        for line in sorted(self.window, key=lambda line: -line[2]):
+            for packed in bins:
+                if packed[0] + line[2] <= self.segment_available_tokens:
+                    packed[0] += line[2]
+                    packed[1].append(line)
+                    break
+            else:
+                bins.append([line[2], [line]])
+        self.window = []
+        self.window_token_count = 0
+
+        # The least filled bin waits for the next window to top it up, once per line
+        if not final and len(bins) > 1:
+            emptiest = min(bins, key=lambda packed: packed[0])
+            if not any(line[3] for line in emptiest[1]):
+                bins.remove(emptiest)
+                self.window = [line[:3] + (True,) for line in emptiest[1]]
+                self.window_token_count = emptiest[0]
+
+        for packed in bins:
+            packed[1].sort(key=lambda line: safe_convert_to_int(line[0]))
+        bins.sort(key=lambda packed: safe_convert_to_int(packed[1][0][0]))
+
+        segments = []
+        for tokens, lines in bins:
+            glossary_terms = {}
+            if self.glossary_matcher:
+                for line in lines:
+                    glossary_terms.update(dict.fromkeys(self.glossary_matcher.find_terms(line[1])))
+            segment_dict = {str(line[0]): line[1] for line in lines}
+            segments.append(self._segment(segment_dict, glossary_terms, tokens))
+        return segments
+
+def make_segment_builder(planner, segment_available_tokens, max_count_split=0, glossary_matcher=None):
+    """SegmentBuilder for a "segment_planner" setting; unknown names fall back to greedy"""
+    if planner == PLANNER_BIN_PACKING:
+        return BinPackingSegmentBuilder(segment_available_tokens, max_count_split, glossary_matcher)
+    if planner != PLANNER_GREEDY:
+        app_logger.warning(f"Unknown segment planner '{planner}', using {PLANNER_GREEDY}")
+    return SegmentBuilder(segment_available_tokens, max_count_split, glossary_matcher)
+
+def stream_segment_json(cell_data, max_token, system_prompt, user_prompt, previous_prompt, src_lang=None, dst_lang=None, glossary_path=None, glossary_matcher=None, planner=PLANNER_GREEDY):
+    """Group split items into segments; pass a compiled glossary_matcher to reuse it across calls"""
+    # Load glossary
+    if glossary_matcher is None:
+        glossary_matcher = load_glossary_matcher(glossary_path, src_lang, dst_lang)
+
+    if not cell_data:
+        raise ValueError("Empty data")
+
+    # Calculate max count_split for progress
+    max_count_split = max((safe_convert_to_int(cell.get("count_split", cell.get("count", 0))) for cell in cell_data), default=0)
+    
+    segment_available_tokens = segment_token_budget(max_token, system_prompt, user_prompt, previous_prompt)
+    builder = make_segment_builder(planner, segment_available_tokens, max_count_split, glossary_matcher)
+    
+    # Collect pending lines and count their tokens in one batch
+    pending_lines = []
+    for cell in cell_data:
+        count_split = cell.get("count_split", cell.get("count"))
+        value = cell.get("value", "").strip()
+        
+        # Skip translated content (continue mode or translation memory hits)
+        if cell.get("translated_status", False):
+            continue
+            
+        if count_split is None or not value:
+            continue
+        
+        pending_lines.append((count_split, value, json.dumps({str(count_split): value}, ensure_ascii=False)))
+
+    line_token_counts = num_tokens_batch([line[2] for line in pending_lines])
+    
+    all_segments = []
+    for (count_split, value, _), line_tokens in zip(pending_lines, line_token_counts):
+        all_segments.extend(builder.add(count_split, value, line_tokens))
+    all_segments.extend(builder.finish())
+
+    requests, fill = builder.fill_stats()
+    if requests and not isinstance(builder, BinPackingSegmentBuilder):
+        app_logger.info(f"Greedy planner: {requests} requests, {fill:.0%} average fill")
+    elif requests:
+        # Plan greedily as well (without glossary lookups) so the log shows what packing saved
+        greedy = SegmentBuilder(segment_available_tokens, max_count_split)
+        for (count_split, value, _), line_tokens in zip(pending_lines, line_token_counts):
+            greedy.add(count_split, value, line_tokens)
+        greedy.finish()
+        greedy_requests, greedy_fill = greedy.fill_stats()
+        app_logger.info(
+            f"Bin-packing planner: {requests} requests, {fill:.0%} average fill "
+            f"(greedy: {greedy_requests} requests, {greedy_fill:.0%})"
+        )
     
     return all_segments
 
@@ -301,192 +351,145 @@ def calculate_progress(segment_dict, max_count_split):
     except (ValueError, TypeError):
         return 1.0
 
-def split_text_by_token_limit(file_path, max_tokens=256):
-    """Split text by token limit with sequential count_split"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
-    
-    result = []
-    next_count_split = 1  # Sequential counter
-    
-    for item_index, item in enumerate(json_data):
-        # Process all items
-        if not isinstance(item, dict):
-            # Create minimal structure
-            new_item = {
-                "count_src": item_index + 1,
-                "count_split": next_count_split,
-                "value": str(item) if item is not None else "",
-                "type": "text",
-                "translated_status": False,
-                "chunk": "1/1"
-            }
-            result.append(new_item)
-            next_count_split += 1
-            continue
-            
-        # Get count_src
-        count_src = item.get("count_src", item_index + 1)
+def split_item(item, item_index, tokens, max_tokens, next_count_split):
+    """Split one item into items numbered from next_count_split; tokens is the value's token count"""
+    if not isinstance(item, dict):
+        # Create minimal structure
+        return [{
+            "count_src": item_index + 1,
+            "count_split": next_count_split,
+            "value": str(item) if item is not None else "",
+            "type": "text",
+            "translated_status": False,
+            "chunk": "1/1"
+        }]
         
-        # Get text value
-        text = item.get("value", "")
+    # Get count_src
+    count_src = item.get("count_src", item_index + 1)
+    
+    # Get text value
+    text = item.get("value", "")
+    
+    # Within limit or empty
+    if tokens <= max_tokens:
+        new_item = copy.deepcopy(item)
+        new_item["count_src"] = count_src
+        new_item["count_split"] = next_count_split
+        new_item["translated_status"] = False
+        new_item["chunk"] = "1/1"
+        return [new_item]
+    
+    # Split long text
+    result = []
+    try:
+        chunks = split_by_sentences_and_combine(text, max_tokens)
+        chunks_count = len(chunks) if chunks else 1
         
-        # Process all items
-        tokens = num_tokens_from_string(text) if text else 0
+        # If no chunks, use original
+        if not chunks:
+            chunks = [text]
+            chunks_count = 1
         
-        # Within limit or empty
-        if tokens <= max_tokens:
+        for i, chunk_text in enumerate(chunks):
             new_item = copy.deepcopy(item)
             new_item["count_src"] = count_src
-            new_item["count_split"] = next_count_split
+            new_item["count_split"] = next_count_split + i
+            new_item["value"] = chunk_text
+            new_item["chunk"] = f"{i+1}/{chunks_count}"
             new_item["translated_status"] = False
-            new_item["chunk"] = "1/1"
             result.append(new_item)
-            next_count_split += 1
-        else:
-            # Split long text
-            try:
-                chunks = split_by_sentences_and_combine(text, max_tokens)
-                chunks_count = len(chunks) if chunks else 1
-                
-                # If no chunks, use original
-                if not chunks:
-                    chunks = [text]
-                    chunks_count = 1
-                
-                for i, chunk_text in enumerate(chunks):
-                    new_item = copy.deepcopy(item)
-                    new_item["count_src"] = count_src
-                    new_item["count_split"] = next_count_split
-                    new_item["value"] = chunk_text
-                    new_item["chunk"] = f"{i+1}/{chunks_count}"
-                    new_item["translated_status"] = False
-                    
-                    result.append(new_item)
-                    next_count_split += 1
-                    
-            except Exception as e:
-                # Keep original on error
-                app_logger.warning(f"Warning: Failed to split item {count_src}: {e}")
-                new_item = copy.deepcopy(item)
-                new_item["count_src"] = count_src
-                new_item["count_split"] = next_count_split
-                new_item["translated_status"] = False
-                new_item["chunk"] = "1/1"
-                result.append(new_item)
-                next_count_split += 1
-    
-    app_logger.info(f"Split result: {len(json_data)} -> {len(result)} items")
+            
+    except Exception as e:
+        # Keep original on error
+        app_logger.warning(f"Warning: Failed to split item {count_src}: {e}")
+        new_item = copy.deepcopy(item)
+        new_item["count_src"] = count_src
+        new_item["count_split"] = next_count_split
+        new_item["translated_status"] = False
+        new_item["chunk"] = "1/1"
+        result = [new_item]
+    return result
+
+def split_text_by_token_limit(job_store, max_tokens=256):
+    """Split deduplicated items by token limit with sequential count_split, saving them to the job store"""
+    json_data = job_store.load_deduped_items()
     
-    # Generate output path
-    file_name = os.path.basename(file_path)
-    file_base, file_ext = os.path.splitext(file_name)
-    output_file_path = os.path.join(os.path.dirname(file_path), f"{file_base}_split{file_ext}")
+    result = []
+    next_count_split = 1  # Sequential counter
+
+    # Count every value once, up front
+    texts = [item.get("value", "") if isinstance(item, dict) else "" for item in json_data]
+    non_empty = [index for index, text in enumerate(texts) if text]
+    token_counts = [0] * len(json_data)
+    for index, count in zip(non_empty, num_tokens_batch([texts[index] for index in non_empty])):
+        token_counts[index] = count
     
-    # Save
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=4)
+    for item_index, item in enumerate(json_data):
+        split_items = split_item(item, item_index, token_counts[item_index], max_tokens, next_count_split)
+        result.extend(split_items)
+        next_count_split += len(split_items)
     
-    return output_file_path
+    app_logger.info(f"Split result: {len(json_data)} -> {len(result)} items")
+    job_store.save_split_items(result)
+    return result
+
+# Sentence and clause delimiters, with the closing marks kept on the preceding piece
+SENTENCE_ENDINGS = "。！？!?.；;"
+SENTENCE_CLOSING_MARKS = "\"')）】]』》>"
+CLAUSE_PUNCTUATION = "，,；;：:、"
+CLAUSE_CLOSING_MARKS = "\"')）】]』"
+
+def _delimited_pieces_pattern(delimiters, closing_marks):
+    """Match text up to a delimiter plus closing marks and spaces, or the undelimited remainder"""
+    delimiters = "".join(re.escape(char) for char in delimiters)
+    closing_marks = "".join(re.escape(char) for char in closing_marks)
+    return re.compile(f"([^{delimiters}]*[{delimiters}][{closing_marks}]* *)|(.+)", re.DOTALL)
+
+SENTENCE_PATTERN = _delimited_pieces_pattern(SENTENCE_ENDINGS, SENTENCE_CLOSING_MARKS)
+CLAUSE_PATTERN = _delimited_pieces_pattern(CLAUSE_PUNCTUATION, CLAUSE_CLOSING_MARKS)
 
 def split_into_sentences(text):
     """Split text into sentences preserving formatting"""
-    sentence_endings = [
-        '。', '！', '？', '!', '?', '.', '；', ';'
-    ]
-    
-    quote_brackets = [
-        '"', '"', '"', "'", ''', ''', '）', ')', '）',
-        '】', ']', '』', '》', '>'
-    ]
-    
-    sentences = []
-    current_sentence = ""
-    
-    i = 0
-    while i < len(text):
-        char = text[i]
-        current_sentence += char
-        
-        if char in sentence_endings:
-            # Look ahead for quotes
-            j = i + 1
-            while j < len(text) and text[j] in quote_brackets:
-                current_sentence += text[j]
-                j += 1
-            
-            # Preserve spaces
-            while j < len(text) and text[j] == ' ':
-                current_sentence += text[j]
-                j += 1
-            
-            if current_sentence.strip():
-                sentences.append(current_sentence)
-            
-            current_sentence = ""
-            i = j - 1
-        
-        i += 1
-    
-    # Add remaining
-    if current_sentence.strip():
-        sentences.append(current_sentence)
-    
-    return sentences
+    return [match.group() for match in SENTENCE_PATTERN.finditer(text) if match.group().strip()]
 
 def split_long_sentence(sentence, max_tokens):
     """Split long sentence by punctuation"""
     if num_tokens_from_string(sentence) <= max_tokens:
         return [sentence]
     
-    internal_punctuation = [
-        '，', ',', '；', ';', '：', ':', '、'
-    ]
-    
-    trailing_marks = ['"', '"', '"', "'", ''', ''', '）', ')', '）', '】', ']', '』']
-    
+    # (text, tokens) per chunk; tokens is None when not counted yet
     chunks = []
-    current_chunk = ""
+    clauses = []
+    counter = IncrementalTokenCounter()
     current_tokens = 0
     
-    i = 0
-    while i < len(sentence):
-        char = sentence[i]
-        current_chunk += char
+    for match in CLAUSE_PATTERN.finditer(sentence):
+        clause = match.group()
+        clauses.append(clause)
         
-        if char in internal_punctuation:
-            # Look ahead for quotes
-            j = i + 1
-            while j < len(sentence) and sentence[j] in trailing_marks:
-                current_chunk += sentence[j]
-                j += 1
-            
-            # Preserve spaces
-            while j < len(sentence) and sentence[j] == ' ':
-                current_chunk += sentence[j]
-                j += 1
-            
-            chunk_tokens = num_tokens_from_string(current_chunk)
-            
-            if current_tokens + chunk_tokens > max_tokens and current_chunk.strip():
-                if current_chunk.strip():
-                    chunks.append(current_chunk)
-                current_chunk = ""
-                current_tokens = 0
-            else:
-                current_tokens = chunk_tokens
-            
-            i = j - 1
+        if match.group(1) is None:
+            # Trailing text without punctuation
+            break
         
-        i += 1
+        # Compared against the count at the previous clause boundary, as before
+        chunk_tokens = counter.append(clause)
+        if current_tokens + chunk_tokens > max_tokens:
+            chunks.append(("".join(clauses), chunk_tokens))
+            clauses = []
+            counter.reset()
+            current_tokens = 0
+        else:
+            current_tokens = chunk_tokens
     
+    current_chunk = "".join(clauses)
     if current_chunk.strip():
-        chunks.append(current_chunk)
+        chunks.append((current_chunk, None))
     
     # If still too long, split by character count
     final_chunks = []
-    for chunk in chunks:
-        chunk_tokens = num_tokens_from_string(chunk)
+    for chunk, chunk_tokens in chunks:
+        if chunk_tokens is None:
+            chunk_tokens = num_tokens_from_string(chunk)
         if chunk_tokens > max_tokens:
             chars_per_token = len(chunk) / chunk_tokens if chunk_tokens > 0 else 1
             chars_per_chunk = int(max_tokens * chars_per_token * 0.9)
@@ -518,8 +521,7 @@ def split_by_sentences_and_combine(text, max_tokens):
     current_chunk = ""
     current_tokens = 0
     
-    for sentence in sentences:
-        sentence_tokens = num_tokens_from_string(sentence)
+    for sentence, sentence_tokens in zip(sentences, num_tokens_batch(sentences)):
         
         # Single sentence exceeds limit
         if sentence_tokens > max_tokens:
@@ -546,52 +548,79 @@ def split_by_sentences_and_combine(text, max_tokens):
     
     return chunks
 
-def deduplicate_translation_content(src_json_path):
-    """Deduplicate content and maintain mapping"""
-    with open(src_json_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
-    
-    # Track unique content
-    content_to_deduped_count = {}  # content -> first count_deduped
-    count_src_to_deduped_map = {}  # count_src -> count_deduped
-    deduped_data = []
-    next_count_deduped = 1
-    
-    app_logger.info(f"Deduplicating {len(json_data)} items")
-    
-    for item in json_data:
+class ContentDeduplicator:
+    """
+    Deduplicates extracted items one at a time.
+    shared_templates maps values to the placeholder template they are sent as.
+    """
+
+    def __init__(self, shared_templates=None):
+        self.shared_templates = shared_templates or {}
+        self.content_to_deduped_count = {}  # (is_template, content) -> first count_deduped
+        self.count_src_to_deduped_map = {}  # count_src -> count_deduped
+        self.deduped_data = []
+
+    def add(self, item):
+        """Record an extracted item; returns its deduped item if the content is new, else None"""
         if not isinstance(item, dict):
-            continue
+            return None
             
         count_src = item.get("count_src", item.get("count"))
         value = item.get("value", "")
         item_type = item.get("type", "text")
         
         if count_src is None:
-            continue
+            return None
         
+        template = self.shared_templates.get(value)
+        content_key = (True, template) if template is not None else (False, value)
+        
+        deduped_item = None
         # Check if content exists
-        if value in content_to_deduped_count:
+        if content_key in self.content_to_deduped_count:
             # Use existing count_deduped
-            count_deduped = content_to_deduped_count[value]
+            count_deduped = self.content_to_deduped_count[content_key]
         else:
             # New unique content
-            count_deduped = next_count_deduped
-            content_to_deduped_count[value] = count_deduped
-            next_count_deduped += 1
+            count_deduped = len(self.deduped_data) + 1
+            self.content_to_deduped_count[content_key] = count_deduped
             
-            # Add to deduped data
             deduped_item = {
                 "count_src": count_src,
                 "count_deduped": count_deduped,
-                "value": value,
+                "value": value if template is None else template,
                 "type": item_type,
                 "translated_status": False
             }
-            deduped_data.append(deduped_item)
+            if template is not None:
+                deduped_item["template"] = True
+            self.deduped_data.append(deduped_item)
         
         # Record mapping
-        count_src_to_deduped_map[count_src] = count_deduped
+        self.count_src_to_deduped_map[count_src] = count_deduped
+        return deduped_item
+
+def deduplicate_translation_content(job_store, template_mode=False):
+    """
+    Deduplicate extracted items and save them with the count_src -> count_deduped map.
+    With template_mode, values that differ only in numbers, dates and codes
+    are sent once as a placeholder template (marked "template": True).
+    """
+    json_data = job_store.load_source_items()
+    
+    shared_templates = {}
+    if template_mode:
+        shared_templates = find_shared_templates(
+            item.get("value", "") for item in json_data if isinstance(item, dict)
+        )
+    
+    app_logger.info(f"Deduplicating {len(json_data)} items")
+    
+    deduplicator = ContentDeduplicator(shared_templates)
+    for item in json_data:
+        deduplicator.add(item)
+    deduped_data = deduplicator.deduped_data
+    count_src_to_deduped_map = deduplicator.count_src_to_deduped_map
     
     # Stats
     total_items = len(json_data)
@@ -599,73 +628,30 @@ def deduplicate_translation_content(src_json_path):
     duplicate_count = total_items - unique_items
     
     app_logger.info(f"Deduplication: {total_items} -> {unique_items} items")
+    if shared_templates:
+        template_count = sum(1 for item in deduped_data if item.get("template"))
+        app_logger.info(f"Template deduplication: {len(shared_templates)} distinct values share {template_count} templates")
     if duplicate_count > 0:
         app_logger.info(f"Removed {duplicate_count} duplicates ({duplicate_count/total_items*100:.1f}% reduction)")
     
+    job_store.save_deduped(deduped_data, count_src_to_deduped_map)
     return deduped_data, count_src_to_deduped_map
 
-def create_deduped_json_for_translation(deduped_data, output_path):
-    """Save deduplicated JSON"""
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(deduped_data, f, ensure_ascii=False, indent=4)
-    
-    app_logger.info(f"Created deduped file: {output_path} ({len(deduped_data)} items)")
-    return output_path
-
-def restore_translations_from_deduped(dst_translated_split_path, count_src_to_deduped_map, src_original_path):
-    """Restore translations to original structure
-    """
-    # Load translated results
-    with open(dst_translated_split_path, 'r', encoding='utf-8') as f:
-        translated_results = json.load(f)
+def restore_translations_from_deduped(job_store, output_path):
+    """Restore translations to the original structure and write them to output_path"""
+    count_src_to_deduped_map = job_store.load_dedup_map()
+    # count_deduped -> translated chunks, joined in count_split order below
+    translations_by_deduped = job_store.translations_by_deduped()
+    template_deduped = job_store.template_deduped()  # count_deduped values translated as placeholder templates
     
-    # Load the split file to get count_deduped -> count_split mapping
-    split_file_path = dst_translated_split_path.replace('dst_translated_split.json', 'src_deduped_split.json')
-    count_deduped_to_split_map = {}
-    
-    try:
-        with open(split_file_path, 'r', encoding='utf-8') as f:
-            split_data = json.load(f)
-            
-        # Build count_deduped -> count_split mapping
-        for item in split_data:
-            if not isinstance(item, dict):
-                continue
-            count_deduped = item.get("count_deduped")
-            count_split = item.get("count_split")
-            
-            if count_deduped is not None and count_split is not None:
-                if count_deduped not in count_deduped_to_split_map:
-                    count_deduped_to_split_map[count_deduped] = []
-                count_deduped_to_split_map[count_deduped].append(count_split)
-        
-        app_logger.info(f"Built count_deduped -> count_split mapping with {len(count_deduped_to_split_map)} entries")
-        
-    except Exception as e:
-        app_logger.warning("Attempting direct mapping as fallback")
+    app_logger.info(f"Found translations for {len(translations_by_deduped)} deduplicated items")
     
-    # Build count_split -> translation mapping
-    count_split_to_translation = {}
-    
-    for item in translated_results:
-        if not isinstance(item, dict):
-            continue
-            
-        count_split = item.get("count_split")
-        translated_text = item.get("translated", "")
-        
-        if count_split is not None and translated_text:
-            count_split_to_translation[count_split] = translated_text
-    
-    app_logger.info(f"Found {len(count_split_to_translation)} translations")
-    
-    # Load original data
-    with open(src_original_path, 'r', encoding='utf-8') as f:
-        original_data = json.load(f)
+    original_data = job_store.load_source_items()
     
     # Restore translations
     result = []
     missing_translations = 0
+    broken_templates = 0
     
     for item in original_data:
         if not isinstance(item, dict):
@@ -680,37 +666,33 @@ def restore_translations_from_deduped(dst_translated_split_path, count_src_to_de
         
         # Get translation through mapping chain: count_src -> count_deduped -> count_split -> translation
         translated_value = original_value  # Default to original
+        found_translation = False
         
         if count_src in count_src_to_deduped_map:
             count_deduped = count_src_to_deduped_map[count_src]
+            translations = translations_by_deduped.get(count_deduped)
             
-            # Check if we have count_split mapping
-            if count_deduped_to_split_map and count_deduped in count_deduped_to_split_map:
-                # Get all count_splits for this count_deduped
-                count_splits = count_deduped_to_split_map[count_deduped]
-                
-                # Combine translations from all splits
-                translations = []
-                for count_split in count_splits:
-                    if count_split in count_split_to_translation:
-                        translations.append(count_split_to_translation[count_split])
-                
-                if translations:
-                    # Join all translations (in case text was split)
-                    translated_value = "".join(translations)
-                else:
-                    missing_translations += 1
-                    app_logger.warning(f"No translation found for count_deduped: {count_deduped} (count_splits: {count_splits})")
+            if translations:
+                # Join all translations (in case text was split)
+                translated_value = "".join(translations)
+                found_translation = True
             else:
-                # Fallback: try using count_deduped as count_split directly
-                if count_deduped in count_split_to_translation:
-                    translated_value = count_split_to_translation[count_deduped]
-                else:
-                    missing_translations += 1
-                    app_logger.warning(f"No translation found for count_deduped: {count_deduped}")
+                missing_translations += 1
+                app_logger.warning(f"No translation found for count_deduped: {count_deduped}")
         else:
             app_logger.warning(f"No deduped mapping found for count_src: {count_src}")
         
+        # Put this item's own numbers, dates and codes back into the shared template translation
+        if found_translation and count_src_to_deduped_map[count_src] in template_deduped:
+            extracted = extract_template(original_value)
+            filled = fill_template(translated_value, extracted[1]) if extracted else None
+            if filled is None:
+                broken_templates += 1
+                app_logger.warning(f"Placeholders lost in template translation for count_src {count_src}, keeping original")
+                translated_value = original_value
+            else:
+                translated_value = filled
+        
         # Create result entry
         result.append({
             "count_src": count_src,
@@ -721,6 +703,8 @@ def restore_translations_from_deduped(dst_translated_split_path, count_src_to_de
     
     # Statistics
     app_logger.info(f"Restoration complete: {len(result)} items, {missing_translations} missing translations")
+    if broken_templates:
+        app_logger.warning(f"{broken_templates} template translations lost placeholders and were left untranslated")
     
     # Sort by count_src using safe conversion
     def get_count_key(item):
@@ -730,10 +714,7 @@ def restore_translations_from_deduped(dst_translated_split_path, count_src_to_de
     result = sorted(result, key=get_count_key)
     
     # Save result
-    dir_path = os.path.dirname(dst_translated_split_path)
-    output_path = os.path.join(dir_path, "dst_translated.json")
-    
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(result, f, ensure_ascii=False, indent=4)
     
-    return output_path
\ No newline at end of file
+    return output_path
@@ -1,11 +1,14 @@
 import json
-import os
 import re
 from config.log_config import app_logger
+from .template_dedup import placeholders_preserved
 from rich import box
 from rich import markup
 from rich.table import Table
 from rich.console import Console
+
+# Shared console so tables from worker threads do not interleave
+CONSOLE = Console(highlight=True, tab_size=4)
     
 
 def detect_language_characters(text, lang_code):
@@ -59,6 +62,10 @@ def is_translation_valid(original, translated, src_lang, dst_lang):
     # Basic checks
     if not translated or translated.strip() == "":
         return False
+
+    # Template placeholders must come back intact
+    if not placeholders_preserved(original, translated):
+        return False
  
     # Language validation
     non_latin_langs = ["zh", "zh-Hant", "ja", "ko", "ru", "th"]
@@ -80,15 +87,21 @@ def is_translation_valid(original, translated, src_lang, dst_lang):
     
     return True
 
-def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_PATH, RESULT_SPLIT_JSON_PATH, FAILED_JSON_PATH, src_lang, dst_lang, last_try=False):
+def process_translation_results(original_text, translated_text, results, failures, src_lang, dst_lang, last_try=False, mark_translated_callback=None, writer=None, first_try=True, failed_callback=None):
     """
-    Process translation results
+    Process translation results into the job store's results and failures tables
+
+    Safe to call from several worker threads at once. mark_translated_callback
+    receives the records that were saved and whether they passed validation
+    (last-try records are accepted unchecked), so the caller can update its
+    translation status table. When a ResultWriter is given, persistence is
+    queued to its thread instead of done inline. When failed_callback is given,
+    failed records go to it instead of the failures table, so the caller can
+    retry them right away.
     """
-    CONSOLE = Console(highlight=True, tab_size=4)
-    
     if not translated_text:
         app_logger.warning("No translated text received")
-        _mark_all_as_failed(original_text, FAILED_JSON_PATH)
+        _mark_all_as_failed(original_text, failures, writer, failed_callback)
         return {}
 
     successful_translations = []
@@ -103,7 +116,7 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
         original_json = json.loads(clean_json(original_text))
     except json.JSONDecodeError as e:
         app_logger.warning(f"Failed to parse original: {e}")
-        _mark_all_as_failed(original_text, FAILED_JSON_PATH)
+        _mark_all_as_failed(original_text, failures, writer, failed_callback)
         return {}
 
     # Parse translated
@@ -111,30 +124,13 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
         translated_json = json.loads(clean_json(translated_text))
     except json.JSONDecodeError as e:
         app_logger.warning(f"Failed to parse translated: {e}")
-        _mark_all_as_failed(original_text, FAILED_JSON_PATH)
+        _mark_all_as_failed(original_text, failures, writer, failed_callback)
         return {}
 
     # Check if all identical (not last try)
     if not last_try:
         if translated_json == original_json:
-            # Check if first try
-            existing_fail = []
-            try:
-                with open(FAILED_JSON_PATH, 'r', encoding='utf-8') as f:
-                    for item in json.load(f):
-                        existing_fail.append(item.get('count_split'))
-            except Exception:
-                pass
-            
-            orig_counts = []
-            for k in original_json.keys():
-                try:
-                    orig_counts.append(int(k))
-                except:
-                    orig_counts.append(k)
-            is_first_try = not set(orig_counts).issubset(set(existing_fail))
-            
-            if is_first_try:
+            if first_try:
                 app_logger.info("First attempt - displaying results")
                 fail_table = Table(
                     box=box.ASCII2,
@@ -150,9 +146,9 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
                 fail_table.add_column("Translated", style="yellow", overflow="fold")
                 for key, value in original_json.items():
                     fail_table.add_row(str(key), markup.escape(str(value)), markup.escape(str(value)))
-                Console(highlight=True, tab_size=4).print(fail_table)
+                CONSOLE.print(fail_table)
                 
-                _mark_all_as_failed(original_text, FAILED_JSON_PATH)
+                _mark_all_as_failed(original_text, failures, writer, failed_callback)
                 return { k: v for k, v in original_json.items() }
             else:
                 app_logger.warning("All translations identical - marking as failed")
@@ -170,8 +166,8 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
                 fail_table.add_column("Translated", style="yellow", overflow="fold")
                 for key, value in original_json.items():
                     fail_table.add_row(str(key), markup.escape(str(value)), markup.escape(str(value)))
-                Console(highlight=True, tab_size=4).print(fail_table)
-                _mark_all_as_failed(original_text, FAILED_JSON_PATH)
+                CONSOLE.print(fail_table)
+                _mark_all_as_failed(original_text, failures, writer, failed_callback)
                 return {}
 
     # Process each item
@@ -280,40 +276,16 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
         CONSOLE.print(failed_table)
  
     # Save successful translations
-    save_json(RESULT_SPLIT_JSON_PATH, successful_translations)
+    save_json(results, successful_translations, writer)
 
     # Save failed translations
     if failed_translations:
-        save_failed_json_without_duplicates(FAILED_JSON_PATH, failed_translations)
+        _save_failures(failures, failed_translations, writer, failed_callback)
     
-    # Update translation status in source file
-    if successful_count_splits:
+    # Update translation status
+    if successful_count_splits and mark_translated_callback:
         try:
-            with open(SRC_SPLIT_JSON_PATH, "r", encoding="utf-8") as f:
-                src_data = json.load(f)
-                
-            # Update status
-            updated_count = 0
-            for item in src_data:
-                # Use correct field name: count_split
-                count_split = item.get("count_split")
-                
-                # Ensure type matching
-                if count_split is not None:
-                    try:
-                        count_split_int = int(count_split)
-                        if count_split_int in successful_count_splits:
-                            item["translated_status"] = True
-                            updated_count += 1
-                    except (ValueError, TypeError):
-                        app_logger.warning(f"Invalid count_split: {count_split}")
-                
-            # Save updated file
-            with open(SRC_SPLIT_JSON_PATH, "w", encoding="utf-8") as f:
-                json.dump(src_data, f, ensure_ascii=False, indent=4)
-                
-            app_logger.info(f"Updated translation status for {updated_count} items")
-                
+            mark_translated_callback(successful_translations, validated=not last_try)
         except Exception as e:
             # Error table
             error_table = Table(
@@ -331,7 +303,7 @@ def process_translation_results(original_text, translated_text, SRC_SPLIT_JSON_P
     
     return result_dict
 
-def _mark_all_as_failed(original_text, FAILED_JSON_PATH):
+def _mark_all_as_failed(original_text, failures, writer=None, failed_callback=None):
     """Mark all segments as failed"""
     failed_segments = []
 
@@ -346,145 +318,42 @@ def _mark_all_as_failed(original_text, FAILED_JSON_PATH):
         app_logger.warning(f"Error parsing original: {e}")
         return
 
-    save_failed_json_without_duplicates(FAILED_JSON_PATH, failed_segments)
+    _save_failures(failures, failed_segments, writer, failed_callback)
     app_logger.warning("All segments marked as failed")
 
-def save_json(filepath, data):
-    """Save JSON data"""
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
-            except json.JSONDecodeError:
-                existing_data = []
+def _save_failures(failures, records, writer=None, failed_callback=None):
+    """Hand failed records to the caller's retry callback, or save them to the failures table"""
+    if failed_callback is not None:
+        failed_callback(records)
     else:
-        existing_data = []
-
-    existing_data.extend(data)
+        save_json(failures, records, writer)
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=4)
-
-def save_failed_json_without_duplicates(filepath, data):
-    """Save failed JSON without duplicates"""
-    # Load existing
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
-            except json.JSONDecodeError:
-                existing_data = []
+def save_json(table, data, writer=None):
+    """
+    Save records to a job store table, through the writer thread if given.
+    Duplicates are resolved by the table: results keep the latest record per
+    count_split, failures the first.
+    """
+    if writer is not None:
+        writer.append(table, data)
     else:
-        existing_data = []
-
-    # Track existing count_splits
-    existing_count_splits = set()
-    for item in existing_data:
-        count_split = item.get("count_split")
-        if count_split is not None:
-            try:
-                existing_count_splits.add(int(count_split))
-            except (ValueError, TypeError):
-                existing_count_splits.add(count_split)
-
-    # Add new items
-    for item in data:
-        count_split = item.get("count_split")
-        if count_split is not None:
-            try:
-                count_split_int = int(count_split)
-            except (ValueError, TypeError):
-                count_split_int = count_split
-            
-            if count_split_int not in existing_count_splits:
-                existing_data.append(item)
-                existing_count_splits.add(count_split_int)
+        table.append(data)
 
-    # Save
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=4)
-
-def check_and_sort_translations(SRC_SPLIT_JSON_PATH, RESULT_SPLIT_JSON_PATH):
+def check_and_sort_translations(job_store):
     """
-    Check missing translations and sort results
+    Fill split items that never got a translation with their original text.
+    Results are kept ordered by count_split in the store, so no sorting pass is needed.
     """
-    missing_count_splits = set()
-
-    if not os.path.exists(SRC_SPLIT_JSON_PATH) or not os.path.exists(RESULT_SPLIT_JSON_PATH):
-        app_logger.error("Source or result file not found")
-        return missing_count_splits
-
-    with open(SRC_SPLIT_JSON_PATH, "r", encoding="utf-8") as src_file:
-        try:
-            src_data = json.load(src_file)
-        except json.JSONDecodeError:
-            app_logger.error("Failed to load source JSON")
-            return missing_count_splits
-
-    with open(RESULT_SPLIT_JSON_PATH, "r", encoding="utf-8") as result_file:
-        try:
-            translated_data = json.load(result_file)
-        except json.JSONDecodeError:
-            app_logger.error("Failed to load translated JSON")
-            return missing_count_splits
-
-    # Get all source count_splits
-    src_count_splits = set()
-    src_dict = {}
-    
-    for item in src_data:
-        if isinstance(item, dict):
-            count_split = item.get("count_split")
-            if count_split is not None:
-                try:
-                    count_split_int = int(count_split)
-                    src_count_splits.add(count_split_int)
-                    src_dict[count_split_int] = item
-                except (ValueError, TypeError):
-                    pass
-    
-    # Get translated count_splits
-    translated_dict = {}
-    for item in translated_data:
-        if isinstance(item, dict):
-            count_split = item.get("count_split")
-            if count_split is not None:
-                try:
-                    count_split_int = int(count_split)
-                    translated_dict[count_split_int] = item
-                except (ValueError, TypeError):
-                    pass
-    
-    # Find missing
-    missing_count_splits = src_count_splits - set(translated_dict.keys())
+    untranslated = job_store.untranslated_split_items()
+    missing_count_splits = {count_split for count_split, _ in untranslated}
 
-    # Add missing translations
     if missing_count_splits:
         app_logger.warning(f"Missing translations for count_splits: {missing_count_splits}")
-        
-        for count_split in missing_count_splits:
-            if count_split in src_dict:
-                original_text = src_dict[count_split].get("value", "")
-                
-                # Create new entry
-                new_entry = {
-                    "count_split": count_split,
-                    "original": original_text,
-                    "translated": original_text  # Use original as translated
-                }
-                translated_data.append(new_entry)
+        job_store.results.append([
+            {"count_split": count_split, "original": value, "translated": value}  # Use original as translated
+            for count_split, value in untranslated
+        ])
     else:
         app_logger.info("No missing translations")
 
-    # Sort by count_split
-    sorted_data = sorted(translated_data, key=lambda x: int(x.get("count_split", 0)))
-
-    with open(RESULT_SPLIT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(sorted_data, f, ensure_ascii=False, indent=4)
-
-    app_logger.info("Translation results sorted")
-    return missing_count_splits
\ No newline at end of file
+    return missing_count_splits
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from threading import Lock
+from config.log_config import app_logger
+from config.load_system_config import load_system_config
+
+TM_DB_PATH = os.path.join("cache", "translation_memory.db")
+DEFAULT_MAX_ENTRIES = 200000
+
+# SQLite parameter limit is 999 on older builds
+LOOKUP_BATCH_SIZE = 500
+# Eviction frees this many extra entries, so the following stores skip the row count
+EVICT_SLACK = 1000
+
+def normalize_text(text):
+    """Normalize text for lookup: trim and collapse horizontal whitespace"""
+    return re.sub(r"[ \t　]+", " ", text.strip())
+
+def make_fingerprint(*parts):
+    """Hash prompt/glossary settings so changed settings miss the memory"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, ensure_ascii=False, sort_keys=True)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def file_fingerprint(file_path):
+    """Hash file content, empty string if missing"""
+    if not file_path or not os.path.exists(file_path):
+        return ""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class TranslationMemory:
+    """
+    Persistent cross-document translation memory.
+
+    Entries are keyed by a hash of normalized source text, language pair,
+    model and prompt/glossary fingerprint. Least recently used entries are
+    evicted once max_entries is exceeded. The row count is only re-read when
+    the stores since the last eviction could have reached the limit.
+    """
+
+    def __init__(self, db_path=TM_DB_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=1000")
+        # A cache can afford to lose the last commits on power loss
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                src_lang TEXT,
+                dst_lang TEXT,
+                model TEXT,
+                fingerprint TEXT,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+        self.conn.commit()
+        # Upper bound on the rows stored: replaced entries are counted as new
+        self.entry_count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(text, src_lang, dst_lang, model, fingerprint):
+        raw = "\x00".join([normalize_text(text), src_lang or "", dst_lang or "", model or "", fingerprint or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup_many(self, texts, src_lang, dst_lang, model, fingerprint):
+        """Return {text: translation} for texts found in memory"""
+        key_to_texts = {}
+        for text in texts:
+            key = self.make_key(text, src_lang, dst_lang, model, fingerprint)
+            key_to_texts.setdefault(key, []).append(text)
+
+        found = {}
+        keys = list(key_to_texts.keys())
+        now = time.time()
+
+        with self.lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, translated FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+
+                for key, translated in rows:
+                    for text in key_to_texts[key]:
+                        found[text] = translated
+
+                # Touch hits for LRU
+                if rows:
+                    self.conn.executemany(
+                        "UPDATE entries SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+            self.conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+
+        return found
+
+    def store_many(self, pairs, src_lang, dst_lang, model, fingerprint):
+        """Store (source, translated) pairs and evict least recently used entries"""
+        now = time.time()
+        rows = [
+            (self.make_key(source, src_lang, dst_lang, model, fingerprint),
+             source, translated, src_lang, dst_lang, model, fingerprint, now)
+            for source, translated in pairs
+            if source and translated
+        ]
+        if not rows:
+            return
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(key, source, translated, src_lang, dst_lang, model, fingerprint, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.entry_count += len(rows)
+            if self.entry_count > self.max_entries:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # Leave room for the next stores, up to a tenth of the memory
+            overflow += min(EVICT_SLACK, self.max_entries // 10)
+            evicted = self.conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            count -= evicted
+            app_logger.debug(f"Translation memory evicted {evicted} entries")
+        self.entry_count = count
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        app_logger.info(f"Translation memory: {self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Process-wide instance shared by all jobs
+_translation_memory = None
+_translation_memory_lock = Lock()
+
+def get_translation_memory():
+    """Get shared translation memory, or None unless enabled in system config"""
+    global _translation_memory
+
+    config = load_system_config()
+    if not config.get("translation_memory", False):
+        return None
+
+    with _translation_memory_lock:
+        if _translation_memory is None:
+            try:
+                _translation_memory = TranslationMemory(
+                    max_entries=config.get("translation_memory_max_entries", DEFAULT_MAX_ENTRIES)
+                )
+            except sqlite3.Error as e:
+                app_logger.warning(f"Translation memory unavailable: {e}")
+                return None
+        return _translation_memory
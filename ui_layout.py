@@ -498,15 +498,22 @@ def create_model_glossary_section(config, local_models, online_models, get_gloss
     
     with gr.Row(elem_id="model-glossary-row"):
         with gr.Column(scale=1):
-            model_choice = gr.Dropdown(
-                choices=local_models if not initial_default_online else online_models,
-                label="Models",
-                value=local_models[0] if not initial_default_online and local_models else (
-                    online_models[0] if initial_default_online and online_models else None
-                ),
-                visible=initial_show_model_selection,
-                allow_custom_value=True 
-            )
+            with gr.Row(equal_height=True):
+                model_choice = gr.Dropdown(
+                    choices=local_models if not initial_default_online else online_models,
+                    label="Models",
+                    value=local_models[0] if not initial_default_online and local_models else (
+                        online_models[0] if initial_default_online and online_models else None
+                    ),
+                    visible=initial_show_model_selection,
+                    allow_custom_value=True,
+                    scale=1
+                )
+                # Re-discovers local Ollama / LM Studio models
+                refresh_models_button = gr.Button(
+                    "🔄", size="sm", scale=0, min_width=40,
+                    visible=initial_show_model_selection and not initial_default_online
+                )
         
         with gr.Column(scale=1, visible=initial_show_glossary):
             glossary_choice = gr.Dropdown(
@@ -526,7 +533,7 @@ def create_model_glossary_section(config, local_models, online_models, get_gloss
             )
             glossary_upload_button = gr.Button("Upload Glossary", visible=False)
     
-    return (model_choice, glossary_choice, glossary_upload_row, 
+    return (model_choice, refresh_models_button, glossary_choice, glossary_upload_row, 
             glossary_upload_file, glossary_upload_button)
 
 